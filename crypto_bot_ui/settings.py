@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.middleware.MetricsMiddleware',  # Latency/query metrics, served on /metrics
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,7 +57,8 @@ ROOT_URLCONF = 'crypto_bot_ui.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also records render times for /metrics
+        'BACKEND': 'dashboard.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'dashboard' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,13 +77,43 @@ WSGI_APPLICATION = 'crypto_bot_ui.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# 'analytics' serves order history, CSV export and rollup reads (see
+# dashboard.db_routers) so long reads never hold up trade inserts or settings
+# saves. Locally it is the same SQLite file, opened query-only; WAL mode lets
+# it read while 'default' writes. In production point 'default' at Postgres
+# and 'analytics' at a streaming replica, e.g.
+#   'analytics': {'ENGINE': 'django.db.backends.postgresql', 'HOST': 'replica.internal',
+#                 'NAME': 'crypto_bot_ui', 'CONN_MAX_AGE': 60, 'TEST': {'MIRROR': 'default'}}
+# Connections are kept open for CONN_MAX_AGE seconds (checked before reuse).
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            # Writers take the lock up front and wait for it, instead of
+            # failing when a read transaction can't be upgraded
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'analytics': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': 'PRAGMA query_only=ON;',
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['dashboard.db_routers.AnalyticsRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,6 +171,78 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Trading Bot API Configuration
 BOT_API_URL = 'http://localhost:8002/api'
+BOT_API_TIMEOUT = 5  # seconds, default per-call timeout
+
+# Connection pool shared by AsyncBotAPIClient (per event loop)
+BOT_API_MAX_CONNECTIONS = 20
+BOT_API_MAX_KEEPALIVE = 10
+BOT_API_KEEPALIVE_EXPIRY = 30  # seconds an idle connection is kept open
+
+# /status and /stats responses are shared between requests for this long
+# (seconds); concurrent misses are coalesced into one upstream call
+BOT_API_CACHE_TTL = 2
+
+# Overall deadline (seconds) for the concurrent bot calls behind a page render
+BOT_API_PAGE_DEADLINE = 5
+
+# Circuit breaker: after this many consecutive connection errors/timeouts/5xx
+# the bot API is skipped (status/stats fall back to their last good payload,
+# marked stale) and probed every BOT_API_BREAKER_COOLDOWN seconds until it answers
+BOT_API_BREAKER_FAILURES = 3
+BOT_API_BREAKER_COOLDOWN = 5
+
+# Trading bot log viewer: lines kept in memory per tailed file, and the
+# largest ?lines= value api_logs will serve
+BOT_LOG_DIR = BASE_DIR.parent / 'crypto-trading-bot' / 'logs'
+BOT_LOG_TAIL_BUFFER = 1000
+BOT_LOG_MAX_LINES = 5000
+BOT_LOG_POLL_INTERVAL = 1  # seconds between checks for appended lines (ws/logs/)
+
+# Answer order history summaries from the hourly/daily TradeRollup table
+# (rebuild with `manage.py rebuild_rollups`)
+TRADE_ROLLUPS_ENABLED = True
+
+# Trade ingestion (`manage.py ingest_trades`): trades per bulk insert, and
+# seconds before a partial batch is written anyway
+TRADE_INGEST_BATCH_SIZE = 500
+TRADE_INGEST_FLUSH_INTERVAL = 1.0
+
+# Fill missing entry/exit prices, duration and net P&L of SELLs by pairing
+# them FIFO with earlier BUYs, at most every TRADE_PAIRING_INTERVAL seconds
+# while trades are ingested (history: `manage.py pair_trades --full`)
+TRADE_PAIRING_ENABLED = True
+TRADE_PAIRING_INTERVAL = 5.0
+
+# Trade analytics (/api/analytics/): results are cached per filter set until
+# trades are written, and for at most this many seconds
+TRADE_ANALYTICS_CACHE_TTL = 3600
+
+# Candle store behind /api/candles/: seconds before the newest candles are
+# refreshed from the bot, candles kept per symbol and timeframe, and the
+# most requested from the bot in one call
+CANDLE_CACHE_TTL = 10
+CANDLE_MAX_CANDLES = 5000
+CANDLE_MAX_FETCH = 1000
+
+# Dashboard WebSocket relay: price updates are conflated to at most one per
+# symbol every DASHBOARD_PRICE_INTERVAL seconds; a client with more than
+# DASHBOARD_SEND_QUEUE_LIMIT messages queued for DASHBOARD_SLOW_CLIENT_TIMEOUT
+# seconds is disconnected (see /api/relay-stats/). Messages stay queued while
+# the server holds more than DASHBOARD_SEND_BUFFER_LIMIT unsent bytes for it
+DASHBOARD_PRICE_INTERVAL = 0.25
+DASHBOARD_SEND_QUEUE_LIMIT = 1000
+DASHBOARD_SEND_BUFFER_LIMIT = 256 * 1024
+DASHBOARD_SLOW_CLIENT_TIMEOUT = 10
+
+# New dashboard connections are sent the status/stats snapshot kept from
+# bot broadcasts; the bot API is only asked when no broadcast has refreshed
+# it for this many seconds
+DASHBOARD_STATE_MAX_AGE = 60
+
+# manage.py route_events announces itself every DASHBOARD_ROUTER_HEARTBEAT
+# seconds; while none has been heard for three beats, each web process
+# relays the bot's broadcasts to topic subscribers itself
+DASHBOARD_ROUTER_HEARTBEAT = 5
 
 # Django Channels Configuration
 ASGI_APPLICATION = 'crypto_bot_ui.asgi.application'
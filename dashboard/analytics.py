@@ -0,0 +1,226 @@
+"""
+Trading performance analytics over closed trades, computed on NumPy columns
+"""
+from itertools import chain
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import NotSupportedError, transaction
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.functions import Cast, Coalesce
+
+SECONDS_PER_YEAR = 365.25 * 86400
+
+
+class EpochSeconds(Func):
+    """A datetime column as float seconds since the Unix epoch"""
+    arity = 1
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f'EpochSeconds is not implemented for {connection.vendor}')
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Django stores UTC timestamps as 'YYYY-MM-DD HH:MM:SS[.ffffff]' text.
+        # Whole seconds come from julianday() and the fraction is added
+        # separately, as julianday() alone is only good to about a millisecond.
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f'(ROUND((julianday(substr({sql}, 1, 19)) - 2440587.5) * 86400.0) + CAST(substr({sql}, 20) AS REAL))',
+            (*params, *params),
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template='EXTRACT(EPOCH FROM %(expressions)s)::double precision', **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)', **extra_context)
+
+
+def load_columns(trades_qs, chunk_size=20000):
+    """Closed trades (those with a net P&L) in ``trades_qs``, oldest first.
+
+    Returns float64 arrays: ``time`` in epoch seconds, ``pnl`` and
+    ``returns`` (profit_loss_pct as a fraction, 0 when missing). The
+    database converts every column to a float, so rows go straight into
+    one array without building Decimals or datetimes.
+    """
+    rows = (
+        trades_qs.filter(net_pnl__isnull=False)
+        .order_by('timestamp', 'id')
+        .values_list(
+            EpochSeconds('timestamp'),
+            Cast('net_pnl', FloatField()),
+            Coalesce(Cast('profit_loss_pct', FloatField()), Value(0.0)),
+        )
+    )
+    flat = np.fromiter(chain.from_iterable(rows.iterator(chunk_size=chunk_size)), dtype=np.float64)
+    columns = flat.reshape(-1, 3)
+    return {
+        'time': columns[:, 0].copy(),
+        'pnl': columns[:, 1].copy(),
+        'returns': columns[:, 2] / 100,
+    }
+
+
+def _number(value, places=4):
+    """JSON-safe float: rounded, None for NaN/infinity"""
+    value = float(value)
+    return round(value, places) if np.isfinite(value) else None
+
+
+def _runs(mask):
+    """Lengths of the runs of True in a boolean array, in order"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges[1::2] - edges[::2]
+
+
+def _sample(n, points):
+    """Indexes of at most ``points`` evenly spaced rows, keeping the first and last"""
+    if n <= points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, points).round().astype(np.int64))
+
+
+def _streaks(mask):
+    runs = _runs(mask)
+    return {
+        'longest': int(runs.max()) if len(runs) else 0,
+        'current': int(runs[-1]) if len(mask) and mask[-1] else 0,
+    }
+
+
+def compute_analytics(time, pnl, returns, window=20, points=500):
+    """Performance statistics for trades given as aligned arrays, oldest first.
+
+    ``time`` is epoch seconds, ``pnl`` the net P&L and ``returns`` the
+    return of each trade as a fraction. Sharpe and Sortino are per trade,
+    and annualized by the number of trades per year in the period.
+    Curves are cut down to at most ``points`` points, with times in epoch
+    milliseconds.
+    """
+    n = len(pnl)
+    wins = pnl > 0
+    losses = pnl < 0
+
+    equity = np.cumsum(pnl)
+    # Trading starts at 0, so a losing first trade is already a drawdown
+    peak = np.maximum.accumulate(np.maximum(equity, 0))
+    drawdown = peak - equity
+    index = np.arange(n)
+    # Trade that set the running peak (-1: the starting balance)
+    last_peak = np.maximum.accumulate(np.where(drawdown <= 0, index, -1))
+    underwater_trades = index - last_peak
+    underwater_seconds = time - time[np.maximum(last_peak, 0)] if n else time
+    worst = int(np.argmax(drawdown)) if n else 0
+
+    gross_profit = pnl[wins].sum()
+    gross_loss = -pnl[losses].sum()
+    std = returns.std(ddof=1) if n > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2)) if n else 0.0
+    mean_return = returns.mean() if n else 0.0
+    sharpe = mean_return / std if std else None
+    sortino = mean_return / downside if downside else None
+    years = (time[-1] - time[0]) / SECONDS_PER_YEAR if n > 1 else 0
+    annualize = np.sqrt(n / years) if years > 0 else None
+
+    # Rolling win rate over the last ``window`` trades, from trade ``window`` on
+    window = max(1, min(window, n)) if n else window
+    total_wins = np.concatenate(([0], np.cumsum(wins)))
+    rolling = (total_wins[window:] - total_wins[:-window]) / window if n else np.empty(0)
+    rolling_time = time[window - 1:] if n else time
+
+    curve = _sample(n, points)
+    rolling_curve = _sample(len(rolling), points)
+    return {
+        'trades': n,
+        'net_pnl': _number(equity[-1] if n else 0, 2),
+        'gross_profit': _number(gross_profit, 2),
+        'gross_loss': _number(gross_loss, 2),
+        'profit_factor': _number(gross_profit / gross_loss) if gross_loss else None,
+        'win_rate': _number(wins.mean() * 100, 2) if n else None,
+        'average_win': _number(pnl[wins].mean(), 2) if wins.any() else None,
+        'average_loss': _number(pnl[losses].mean(), 2) if losses.any() else None,
+        'expectancy': _number(pnl.mean(), 2) if n else None,
+        'expectancy_pct': _number(mean_return * 100) if n else None,
+        'sharpe': _number(sharpe) if sharpe is not None else None,
+        'sortino': _number(sortino) if sortino is not None else None,
+        'sharpe_annualized': _number(sharpe * annualize) if sharpe is not None and annualize else None,
+        'sortino_annualized': _number(sortino * annualize) if sortino is not None and annualize else None,
+        'max_drawdown': _number(drawdown[worst], 2) if n else 0.0,
+        'max_drawdown_at': int(time[worst] * 1000) if n else None,
+        'max_drawdown_trades': int(underwater_trades.max()) if n else 0,
+        'max_drawdown_seconds': _number(underwater_seconds.max(), 0) if n else 0.0,
+        'win_streak': _streaks(wins),
+        'loss_streak': _streaks(losses),
+        'rolling_window': window,
+        'equity_curve': {
+            'time': (time[curve] * 1000).round().astype(np.int64).tolist(),
+            'equity': equity[curve].round(2).tolist(),
+            'drawdown': drawdown[curve].round(2).tolist(),
+        },
+        'rolling_win_rate': {
+            'time': (rolling_time[rolling_curve] * 1000).round().astype(np.int64).tolist(),
+            'win_rate': (rolling[rolling_curve] * 100).round(2).tolist(),
+        },
+    }
+
+
+def cache_version():
+    """Current generation of the Trade table; one indexed read"""
+    from .models import TradeDataVersion
+
+    return TradeDataVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def invalidate(using=None):
+    """Start a new generation, so every cached result is recomputed.
+
+    Call it inside the transaction that writes trades: the new generation
+    becomes visible to other processes together with the trades.
+    """
+    from .models import TradeDataVersion
+
+    versions = TradeDataVersion.objects.db_manager(using)
+    if not versions.filter(pk=1).update(version=F('version') + 1):
+        versions.bulk_create([TradeDataVersion(pk=1, version=1)], ignore_conflicts=True)
+
+
+def invalidate_on_commit(using=None):
+    """invalidate() once the current transaction commits, however many trades it wrote.
+
+    For per-row writes (model saves and deletes), so a transaction saving
+    many trades bumps the shared version row once rather than per row.
+    Outside a transaction it bumps straight away.
+    """
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, '_trade_invalidation', None)
+    # Dropped from run_on_commit when its transaction or savepoint rolls back
+    if pending is not None and any(func is pending for _, func, _ in connection.run_on_commit):
+        return
+
+    def bump():
+        connection._trade_invalidation = None
+        invalidate(using)
+
+    connection._trade_invalidation = bump
+    transaction.on_commit(bump, using=using)
+
+
+def trade_analytics(trades_qs, window=20, points=500):
+    """compute_analytics() for the closed trades in ``trades_qs``.
+
+    Cached per filter set and trade generation (see invalidate()), for at
+    most TRADE_ANALYTICS_CACHE_TTL seconds.
+    """
+    filters = hashlib.md5(f'{trades_qs.query}|{window}|{points}'.encode()).hexdigest()
+    key = f'trade-analytics:{cache_version()}:{filters}'
+    return cache.get_or_set(
+        key,
+        lambda: compute_analytics(**load_columns(trades_qs), window=window, points=points),
+        getattr(settings, 'TRADE_ANALYTICS_CACHE_TTL', 3600),
+    )
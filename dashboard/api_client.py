@@ -1,9 +1,347 @@
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
 import requests
 from django.conf import settings
 import logging
 
+from . import metrics
+
 logger = logging.getLogger(__name__)
 
+# One pooled httpx.AsyncClient per event loop. Connections cannot be shared
+# across loops, and under WSGI each async view may run in its own loop, so
+# every client is closed (and dropped from here) when its loop shuts down.
+_async_http_clients = {}   # loop -> (client, closer task)
+
+
+async def _close_with_loop(loop, client):
+    """Wait until cancelled, then close ``client``.
+
+    asyncio.run() (and so async_to_sync() outside a server loop) cancels
+    the tasks still pending when it finishes, so the client's sockets are
+    closed before its loop is.
+    """
+    try:
+        await loop.create_future()
+    finally:
+        if _async_http_clients.get(loop, (None, None))[0] is client:
+            del _async_http_clients[loop]
+        await client.aclose()
+
+
+def get_async_http_client():
+    """Return the shared keep-alive AsyncClient for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client, closer = _async_http_clients.get(loop, (None, None))
+    if client is None or client.is_closed:
+        if closer is not None:
+            closer.cancel()
+        client = httpx.AsyncClient(
+            timeout=getattr(settings, 'BOT_API_TIMEOUT', 5),
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'BOT_API_MAX_CONNECTIONS', 20),
+                max_keepalive_connections=getattr(settings, 'BOT_API_MAX_KEEPALIVE', 10),
+                keepalive_expiry=getattr(settings, 'BOT_API_KEEPALIVE_EXPIRY', 30),
+            ),
+        )
+        _async_http_clients[loop] = (client, loop.create_task(_close_with_loop(loop, client)))
+    return client
+
+
+class _Flight:
+    """An upstream call that concurrent sync callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class ResponseCache:
+    """Short-TTL cache with request coalescing for bot API reads.
+
+    Concurrent misses for the same key share a single upstream call, whether
+    the callers are threads (sync views) or tasks (consumers, async views).
+    Failed lookups (``None``) are never stored, so the next request retries
+    the bot; until it answers, callers get the last good value marked stale
+    (``"stale": true`` and its age in ``"stale_seconds"``), or None if there
+    never was one.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}        # key -> (expires_at, value)
+        self._last_good = {}      # key -> (stored_at, value), kept past expiry
+        self._sync_flights = {}   # key -> _Flight
+        self._async_flights = weakref.WeakKeyDictionary()  # loop -> {key: asyncio.Task}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'BOT_API_CACHE_TTL', 2)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+
+    def _store(self, key, value):
+        if value is None:
+            return
+        now = time.monotonic()
+        self._last_good[key] = (now, value)
+        if self.ttl > 0:
+            self._entries[key] = (now + self.ttl, value)
+
+    def stale(self, key):
+        """The last good value for ``key`` marked as stale, or None"""
+        with self._lock:
+            entry = self._last_good.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if isinstance(value, dict):
+            value = {**value, 'stale': True, 'stale_seconds': round(time.monotonic() - stored_at, 1)}
+        return value
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for ``key`` or call ``fetch()`` once"""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            flight = self._sync_flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync_flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            return flight.value if flight.value is not None else self.stale(key)
+
+        try:
+            flight.value = fetch()
+            with self._lock:
+                self._store(key, flight.value)
+        finally:
+            with self._lock:
+                self._sync_flights.pop(key, None)
+            flight.done.set()
+        return flight.value if flight.value is not None else self.stale(key)
+
+    async def aget_or_fetch(self, key, fetch):
+        """Async variant of get_or_fetch; ``fetch`` is a coroutine function"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            flights = self._async_flights.setdefault(loop, {})
+            task = flights.get(key)
+            if task is None:
+                self.misses += 1
+                task = asyncio.ensure_future(fetch())
+                flights[key] = task
+                task.add_done_callback(
+                    lambda t: self._finish_async_flight(loop, key, t)
+                )
+            else:
+                self.coalesced += 1
+        # Shield so a cancelled caller doesn't cancel the call others await
+        value = await asyncio.shield(task)
+        return value if value is not None else self.stale(key)
+
+    def _finish_async_flight(self, loop, key, task):
+        with self._lock:
+            # Tasks hold their loop, so a loop's entry goes once it has none
+            flights = self._async_flights.get(loop, {})
+            flights.pop(key, None)
+            if not flights:
+                self._async_flights.pop(loop, None)
+            if not task.cancelled() and task.exception() is None:
+                self._store(key, task.result())
+
+    def invalidate(self, *keys):
+        """Drop cached entries (all of them when no keys are given).
+
+        Last good values are kept for stale fallbacks; use clear() to forget them.
+        """
+        with self._lock:
+            if keys:
+                for key in keys:
+                    self._entries.pop(key, None)
+            else:
+                self._entries.clear()
+
+    def clear(self):
+        """Drop cached entries and last good values"""
+        with self._lock:
+            self._entries.clear()
+            self._last_good.clear()
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.coalesced = 0
+
+
+# Shared by every client instance in the process
+bot_api_cache = ResponseCache()
+
+
+class BotAPIUnavailable(requests.exceptions.ConnectionError, httpx.TransportError):
+    """Raised without calling the bot while the circuit breaker is open.
+
+    Subclasses both clients' connection errors, so their existing error
+    handling (and fallbacks) apply unchanged.
+    """
+
+
+def is_outage(exc):
+    """True for failures that mean the bot is down rather than a bad request"""
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                        httpx.TransportError)):
+        return True
+    response = getattr(exc, 'response', None)
+    return response is not None and response.status_code >= 500
+
+
+def probe_bot():
+    """Default breaker probe: a short GET /status"""
+    response = requests.get(f"{settings.BOT_API_URL}/status", timeout=min(2, getattr(settings, 'BOT_API_TIMEOUT', 5)))
+    response.raise_for_status()
+
+
+class CircuitBreaker:
+    """Fail fast while the bot is down.
+
+    After ``failure_threshold`` consecutive outages (connection errors,
+    timeouts, 5xx) the circuit opens: calls raise BotAPIUnavailable at once
+    instead of waiting for a timeout each, and cached reads fall back to
+    their last good payload. A background thread calls ``probe`` every
+    ``cooldown`` seconds and closes the circuit when it succeeds. Shared by
+    the sync and async clients; all state changes happen under a lock.
+    """
+
+    def __init__(self, failure_threshold=None, cooldown=None, probe=probe_bot):
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self.probe = probe
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.is_open = False
+        self.opened_count = 0
+        self._prober = None
+
+    @property
+    def failure_threshold(self):
+        return self._failure_threshold or getattr(settings, 'BOT_API_BREAKER_FAILURES', 3)
+
+    @property
+    def cooldown(self):
+        if self._cooldown is not None:
+            return self._cooldown
+        return getattr(settings, 'BOT_API_BREAKER_COOLDOWN', 5)
+
+    def check(self):
+        """Raise BotAPIUnavailable if the circuit is open"""
+        if self.is_open:
+            raise BotAPIUnavailable('Bot API circuit open; skipping call')
+
+    def record_success(self):
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_failure(self, exc):
+        if not is_outage(exc) or isinstance(exc, BotAPIUnavailable):
+            return
+        with self._lock:
+            self.failures += 1
+            if self.is_open or self.failures < self.failure_threshold:
+                return
+            self.is_open = True
+            self.opened_count += 1
+            if self._prober is None or not self._prober.is_alive():
+                self._prober = threading.Thread(target=self._probe_until_closed, daemon=True,
+                                                name='bot-api-breaker-probe')
+                self._prober.start()
+        logger.warning(f"Bot API circuit opened after {self.failures} failures; probing every {self.cooldown}s")
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.cooldown)
+            try:
+                self.probe()
+            except Exception as e:
+                logger.debug(f"Bot API probe failed: {e}")
+                continue
+            self.close()
+            return
+
+    def close(self):
+        with self._lock:
+            was_open = self.is_open
+            self.is_open = False
+            self.failures = 0
+        if was_open:
+            logger.info("Bot API circuit closed; bot is reachable again")
+
+
+bot_api_breaker = CircuitBreaker()
+
+
+async def fetch_concurrently(calls, deadline=None):
+    """Run bot API calls concurrently under one overall deadline.
+
+    ``calls`` maps a name to ``(awaitable, fallback)``. Calls that fail or are
+    still running when the deadline expires yield their fallback, so callers
+    can render whatever came back in time.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'BOT_API_PAGE_DEADLINE', 5)
+    tasks = {name: asyncio.ensure_future(call) for name, (call, _) in calls.items()}
+    done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    results = {}
+    for name, task in tasks.items():
+        fallback = calls[name][1]
+        if task in done and task.exception() is None:
+            results[name] = task.result()
+        else:
+            if task in pending:
+                logger.warning(f"Bot API call '{name}' exceeded the {deadline}s page deadline")
+            results[name] = fallback
+    return results
+
 
 class BotAPIClient:
     """Client for communicating with the trading bot API"""
@@ -12,21 +350,40 @@ class BotAPIClient:
         self.base_url = settings.BOT_API_URL
         self.timeout = getattr(settings, 'BOT_API_TIMEOUT', 5)
     
-    def get_status(self):
-        """Get current bot status"""
+    def _request(self, method, path, **kwargs):
+        bot_api_breaker.check()
+        started = time.perf_counter()
         try:
-            response = requests.get(f"{self.base_url}/status", timeout=self.timeout)
+            response = requests.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
             response.raise_for_status()
+            bot_api_breaker.record_success()
+            return response
+        except Exception as e:
+            bot_api_breaker.record_failure(e)
+            metrics.bot_api_errors.inc(method, path)
+            raise
+        finally:
+            metrics.bot_api_latency.observe(time.perf_counter() - started, method, path)
+    
+    def get_status(self):
+        """Get current bot status (cached, see BOT_API_CACHE_TTL)"""
+        return bot_api_cache.get_or_fetch('status', self._fetch_status)
+
+    def _fetch_status(self):
+        try:
+            response = self._request('GET', '/status')
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Error getting bot status: {e}")
             return None
     
     def get_stats(self):
-        """Get trading statistics"""
+        """Get trading statistics (cached, see BOT_API_CACHE_TTL)"""
+        return bot_api_cache.get_or_fetch('stats', self._fetch_stats)
+
+    def _fetch_stats(self):
         try:
-            response = requests.get(f"{self.base_url}/stats", timeout=self.timeout)
-            response.raise_for_status()
+            response = self._request('GET', '/stats')
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Error getting bot stats: {e}")
@@ -35,8 +392,7 @@ class BotAPIClient:
     def get_recent_trades(self):
         """Get recent trades"""
         try:
-            response = requests.get(f"{self.base_url}/trades/recent", timeout=self.timeout)
-            response.raise_for_status()
+            response = self._request('GET', '/trades/recent')
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Error getting recent trades: {e}")
@@ -45,8 +401,8 @@ class BotAPIClient:
     def start_bot(self):
         """Start the trading bot"""
         try:
-            response = requests.post(f"{self.base_url}/bot/start", timeout=self.timeout)
-            response.raise_for_status()
+            self._request('POST', '/bot/start')
+            bot_api_cache.invalidate('status')
             logger.info("Bot started successfully")
             return True
         except requests.exceptions.RequestException as e:
@@ -56,8 +412,8 @@ class BotAPIClient:
     def stop_bot(self):
         """Stop the trading bot"""
         try:
-            response = requests.post(f"{self.base_url}/bot/stop", timeout=self.timeout)
-            response.raise_for_status()
+            self._request('POST', '/bot/stop')
+            bot_api_cache.invalidate('status')
             logger.info("Bot stopped successfully")
             return True
         except requests.exceptions.RequestException as e:
@@ -67,12 +423,126 @@ class BotAPIClient:
     def update_settings(self, settings_dict):
         """Update bot settings"""
         try:
-            response = requests.post(f"{self.base_url}/settings", 
-                                   json=settings_dict, 
-                                   timeout=self.timeout)
-            response.raise_for_status()
+            self._request('POST', '/settings', json=settings_dict)
             logger.info("Bot settings updated successfully")
             return True
         except requests.exceptions.RequestException as e:
             logger.error(f"Error updating bot settings: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+class AsyncBotAPIClient:
+    """Non-blocking client for the trading bot API.
+
+    Mirrors BotAPIClient for use in consumers and async views. Requests go
+    through a shared connection pool so they never block the event loop, and
+    every method accepts a per-call ``timeout`` override in seconds.
+    """
+
+    def __init__(self):
+        self.base_url = settings.BOT_API_URL
+        self.timeout = getattr(settings, 'BOT_API_TIMEOUT', 5)
+
+    async def _request(self, method, path, timeout=None, endpoint=None, **kwargs):
+        """Send a request; ``endpoint`` labels its metrics when ``path`` has ids in it"""
+        bot_api_breaker.check()
+        endpoint = endpoint or path
+        started = time.perf_counter()
+        try:
+            client = get_async_http_client()
+            response = await client.request(
+                method,
+                f"{self.base_url}{path}",
+                timeout=timeout if timeout is not None else self.timeout,
+                **kwargs,
+            )
+            response.raise_for_status()
+            bot_api_breaker.record_success()
+            return response
+        except Exception as e:
+            bot_api_breaker.record_failure(e)
+            metrics.bot_api_errors.inc(method, endpoint)
+            raise
+        finally:
+            metrics.bot_api_latency.observe(time.perf_counter() - started, method, endpoint)
+
+    async def get_status(self, timeout=None):
+        """Get current bot status (cached, see BOT_API_CACHE_TTL)"""
+        return await bot_api_cache.aget_or_fetch(
+            'status', lambda: self._fetch_status(timeout)
+        )
+
+    async def _fetch_status(self, timeout=None):
+        try:
+            response = await self._request('GET', '/status', timeout)
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error getting bot status: {e}")
+            return None
+
+    async def get_stats(self, timeout=None):
+        """Get trading statistics (cached, see BOT_API_CACHE_TTL)"""
+        return await bot_api_cache.aget_or_fetch(
+            'stats', lambda: self._fetch_stats(timeout)
+        )
+
+    async def _fetch_stats(self, timeout=None):
+        try:
+            response = await self._request('GET', '/stats', timeout)
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error getting bot stats: {e}")
+            return None
+
+    async def get_recent_trades(self, timeout=None):
+        """Get recent trades"""
+        try:
+            response = await self._request('GET', '/trades/recent', timeout)
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error getting recent trades: {e}")
+            return []
+
+    async def get_candles(self, symbol, timeframe, limit, timeout=None):
+        """Get the latest ``limit`` OHLCV candles (symbol as BTCUSDT); None on error"""
+        try:
+            response = await self._request(
+                'GET', f'/candles/{symbol}/{timeframe}', timeout,
+                endpoint='/candles/{symbol}/{timeframe}', params={'limit': limit},
+            )
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error getting {symbol} {timeframe} candles: {e}")
+            return None
+
+    async def start_bot(self, timeout=None):
+        """Start the trading bot"""
+        try:
+            await self._request('POST', '/bot/start', timeout)
+            bot_api_cache.invalidate('status')
+            logger.info("Bot started successfully")
+            return True
+        except httpx.HTTPError as e:
+            logger.error(f"Error starting bot: {e}")
+            return False
+
+    async def stop_bot(self, timeout=None):
+        """Stop the trading bot"""
+        try:
+            await self._request('POST', '/bot/stop', timeout)
+            bot_api_cache.invalidate('status')
+            logger.info("Bot stopped successfully")
+            return True
+        except httpx.HTTPError as e:
+            logger.error(f"Error stopping bot: {e}")
+            return False
+
+    async def update_settings(self, settings_dict, timeout=None):
+        """Update bot settings"""
+        try:
+            await self._request('POST', '/settings', timeout, json=settings_dict)
+            logger.info("Bot settings updated successfully")
+            return True
+        except httpx.HTTPError as e:
+            logger.error(f"Error updating bot settings: {e}")
+            return False
@@ -0,0 +1,300 @@
+"""
+Server-side OHLCV candle store with timeframe resampling
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from django.conf import settings
+import threading
+import time
+
+from .api_client import AsyncBotAPIClient, ResponseCache
+
+# Supported timeframes and their length in seconds
+TIMEFRAMES = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '4h': 4 * 60 * 60,
+    '1d': 24 * 60 * 60,
+    '1w': 7 * 24 * 60 * 60,
+}
+
+# Weekly candles open on Monday 00:00 UTC; the Unix epoch was a Thursday
+_WEEK_OFFSET = 4 * 24 * 60 * 60
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# Coalesces identical in-flight bot requests; results live in the store
+candle_fetches = ResponseCache(ttl=0)
+
+
+def normalize_timeframe(timeframe):
+    """Lower-case timeframe key ('1H' -> '1h'), or None if unsupported"""
+    timeframe = (timeframe or '').strip().lower()
+    return timeframe if timeframe in TIMEFRAMES else None
+
+
+def normalize_symbol(symbol):
+    """Bot-style symbol: 'BTC/USDT' -> 'BTCUSDT'"""
+    return (symbol or '').replace('/', '').upper()
+
+
+def bucket_start(timestamp, seconds):
+    """Open time (epoch seconds, UTC) of the candle holding ``timestamp``"""
+    offset = _WEEK_OFFSET if seconds == TIMEFRAMES['1w'] else 0
+    return (int(timestamp) - offset) // seconds * seconds + offset
+
+
+def _candle_row(candle):
+    timestamp = int(candle['time'])
+    if timestamp > 10 ** 11:
+        timestamp //= 1000  # milliseconds
+    return (timestamp,) + tuple(float(candle.get(field) or 0) for field in FIELDS)
+
+
+class CandleSeries:
+    """Candles for one symbol and timeframe, held in parallel typed arrays.
+
+    Open times are kept sorted in an ``array('q')`` and each OHLCV field in an
+    ``array('d')``, about 48 bytes per candle. Range queries are two bisects
+    on the times; appending newer candles is O(1).
+    """
+
+    def __init__(self, seconds, max_candles=None):
+        self.seconds = seconds
+        self.max_candles = max_candles
+        self.times = array('q')
+        self.columns = {field: array('d') for field in FIELDS}
+        self.fetched_at = None
+        # Set once the bot has returned fewer candles than asked for, so we
+        # stop asking it for history older than this
+        self.oldest_available = None
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def first_time(self):
+        return self.times[0] if self.times else None
+
+    @property
+    def last_time(self):
+        return self.times[-1] if self.times else None
+
+    def is_fresh(self, ttl):
+        return self.fetched_at is not None and time.monotonic() - self.fetched_at < ttl
+
+    def merge(self, candles):
+        """Insert candles (bot-style dicts), replacing any with the same open time"""
+        for row in sorted(_candle_row(candle) for candle in candles):
+            timestamp = row[0]
+            if not self.times or timestamp > self.times[-1]:
+                self._append(row)
+                continue
+            i = bisect_left(self.times, timestamp)
+            if i < len(self.times) and self.times[i] == timestamp:
+                for field, value in zip(FIELDS, row[1:]):
+                    self.columns[field][i] = value
+            else:
+                self.times.insert(i, timestamp)
+                for field, value in zip(FIELDS, row[1:]):
+                    self.columns[field].insert(i, value)
+
+        if self.max_candles and len(self.times) > self.max_candles:
+            excess = len(self.times) - self.max_candles
+            del self.times[:excess]
+            for column in self.columns.values():
+                del column[:excess]
+            self.oldest_available = None
+
+    def _append(self, row):
+        self.times.append(row[0])
+        for field, value in zip(FIELDS, row[1:]):
+            self.columns[field].append(value)
+
+    def index_range(self, start=None, end=None):
+        """Array indexes [lo, hi) of the candles opening within [start, end]"""
+        lo = 0 if start is None else bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect_right(self.times, end)
+        return lo, max(lo, hi)
+
+    def is_contiguous(self, lo, hi):
+        """True when indexes [lo, hi) hold consecutive candles with no gaps"""
+        return hi > lo and self.times[hi - 1] - self.times[lo] == (hi - lo - 1) * self.seconds
+
+    def rows(self, start=None, end=None, limit=None):
+        """Candles within [start, end] as dicts, oldest first (the latest ``limit``)"""
+        lo, hi = self.index_range(start, end)
+        if limit:
+            lo = max(lo, hi - limit)
+        columns = [self.columns[field][lo:hi] for field in FIELDS]
+        return [
+            {'time': timestamp, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for timestamp, o, h, l, c, v in zip(self.times[lo:hi], *columns)
+        ]
+
+    def resample(self, seconds, start=None, end=None):
+        """Aggregate into a coarser timeframe that is a multiple of this one.
+
+        A leading bucket that is missing its first base candles is dropped;
+        the last bucket may be partial, like the bot's in-progress candle.
+        """
+        out = CandleSeries(seconds)
+        lo, hi = self.index_range(start, end)
+        times = self.times
+        opens, highs, lows, closes, volumes = (self.columns[field] for field in FIELDS)
+
+        # Skip the first bucket when it starts before the data does
+        skipped = None
+        if hi > lo and times[lo] != bucket_start(times[lo], seconds):
+            skipped = bucket_start(times[lo], seconds)
+
+        current = None
+        for i in range(lo, hi):
+            bucket = bucket_start(times[i], seconds)
+            if bucket != current:
+                if current is not None and current != skipped:
+                    out._append((current, o, h, l, c, v))
+                current = bucket
+                o, h, l, c, v = opens[i], highs[i], lows[i], closes[i], volumes[i]
+            else:
+                h = max(h, highs[i])
+                l = min(l, lows[i])
+                c = closes[i]
+                v += volumes[i]
+        if current is not None and current != skipped:
+            out._append((current, o, h, l, c, v))
+        return out
+
+
+class CandleStore:
+    """Per-symbol candle cache in front of the bot's /candles endpoint.
+
+    A request is answered, in order of preference, by resampling a finer
+    stored timeframe that covers the range, from the stored series itself,
+    or by asking the bot for only the candles that are missing: the tail
+    since the last stored candle once the series is older than
+    ``CANDLE_CACHE_TTL``, or enough history to reach the range start.
+    """
+
+    def __init__(self, ttl=None, max_candles=None, max_fetch=None):
+        self._ttl = ttl
+        self._max_candles = max_candles
+        self._max_fetch = max_fetch
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'CANDLE_CACHE_TTL', 10)
+
+    @property
+    def max_candles(self):
+        return self._max_candles or getattr(settings, 'CANDLE_MAX_CANDLES', 5000)
+
+    @property
+    def max_fetch(self):
+        return self._max_fetch or getattr(settings, 'CANDLE_MAX_FETCH', 1000)
+
+    def series(self, symbol, timeframe):
+        """Stored series for (symbol, timeframe), created empty if needed"""
+        key = (normalize_symbol(symbol), timeframe)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = CandleSeries(TIMEFRAMES[timeframe], self.max_candles)
+            return series
+
+    def add(self, symbol, timeframe, candles, requested=None):
+        """Merge candles fetched from the bot into the store"""
+        series = self.series(symbol, timeframe)
+        with self._lock:
+            series.merge(candles)
+            series.fetched_at = time.monotonic()
+            if requested is not None and len(candles) < requested and series.times:
+                series.oldest_available = series.first_time
+        return series
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    async def get_candles(self, symbol, timeframe, limit=100, start=None, end=None, client=None):
+        """Candles for ``symbol`` at ``timeframe`` as bot-style dicts, oldest first.
+
+        ``start``/``end`` are epoch seconds; without ``start`` the latest
+        ``limit`` candles up to ``end`` (or now) are returned.
+        """
+        symbol = normalize_symbol(symbol)
+        seconds = TIMEFRAMES[timeframe]
+        now = int(time.time())
+        current = bucket_start(now, seconds)
+        last_wanted = min(current, bucket_start(end, seconds)) if end is not None else current
+        first_wanted = last_wanted - (limit - 1) * seconds
+        if start is not None:
+            first_wanted = max(first_wanted, bucket_start(start, seconds))
+
+        resampled = self._resample(symbol, timeframe, first_wanted, last_wanted, now)
+        if resampled is not None:
+            return resampled.rows(first_wanted, end, limit)
+
+        series = self.series(symbol, timeframe)
+        count = self._missing_count(series, first_wanted, last_wanted, current)
+        if count:
+            client = client or AsyncBotAPIClient()
+            candles = await candle_fetches.aget_or_fetch(
+                ('candles', symbol, timeframe, count),
+                lambda: client.get_candles(symbol, timeframe, count),
+            )
+            if candles:
+                self.add(symbol, timeframe, candles, requested=count)
+        with self._lock:
+            return series.rows(first_wanted, end, limit)
+
+    def _missing_count(self, series, first_wanted, last_wanted, current):
+        """How many of the latest candles to fetch from the bot (0 for none)"""
+        seconds = series.seconds
+        # The bot only serves the latest candles, at most max_fetch per call
+        first_wanted = max(first_wanted, current - (self.max_fetch - 1) * seconds)
+        with self._lock:
+            have_start = series.times and (
+                series.first_time <= first_wanted or series.oldest_available is not None
+            )
+            if not have_start:
+                return min((current - first_wanted) // seconds + 1, self.max_fetch)
+            if last_wanted < series.last_time or series.is_fresh(self.ttl):
+                return 0
+            # Refetch from the last stored candle, which may have been in progress
+            return min((current - series.last_time) // seconds + 1, self.max_fetch)
+
+    def _resample(self, symbol, timeframe, first_wanted, last_wanted, now):
+        """Resample the coarsest finer series that fully covers the range, or None"""
+        target = TIMEFRAMES[timeframe]
+        sources = sorted(
+            (name for name, seconds in TIMEFRAMES.items() if seconds < target and target % seconds == 0),
+            key=TIMEFRAMES.get, reverse=True,
+        )
+        last_end = last_wanted + target  # exclusive end of the newest wanted bucket
+        with self._lock:
+            for name in sources:
+                series = self._series.get((symbol, name))
+                if series is None or not series.times or series.first_time > first_wanted:
+                    continue
+                if last_end > now:
+                    # The newest bucket is still open: need the current base candle, fresh
+                    if series.last_time != bucket_start(now, series.seconds) or not series.is_fresh(self.ttl):
+                        continue
+                elif series.last_time + series.seconds < last_end:
+                    continue
+                lo, hi = series.index_range(first_wanted, last_end - 1)
+                if not series.is_contiguous(lo, hi):
+                    continue
+                return series.resample(target, first_wanted, last_end - 1)
+        return None
+
+
+# Shared by the candle API views in this process
+candle_store = CandleStore()
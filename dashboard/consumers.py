@@ -2,38 +2,106 @@
 WebSocket Consumer for Real-Time Dashboard Updates
 """
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.consumer import get_handler_name
+from django.conf import settings
+import asyncio
 import json
-from .api_client import BotAPIClient
+import logging
+from .api_client import AsyncBotAPIClient
+from .events import PRICE_UPDATE, parse_topic, publish, relay_message, topic_group
+from .frames import JSON, MSGPACK, frame_memo, negotiate
+from .metrics import websocket_connections, websocket_messages
+from .relay import ClientOutbox, transport_backlog
+from .state import dashboard_state
+from .log_tail import filter_log_lines, find_latest_log, log_follower, log_tailer
+
+logger = logging.getLogger(__name__)
 
 
 class DashboardConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer for real-time trading bot updates"""
+    """WebSocket consumer for real-time trading bot updates.
+    
+    Outgoing messages go through a per-connection ClientOutbox: price
+    updates are conflated (latest per symbol wins, at most one send per
+    DASHBOARD_PRICE_INTERVAL) while trades, status and replies are queued
+    and never dropped. Clients that stay too far behind are disconnected.
+    
+    Clients offering the ``dashboard.msgpack`` subprotocol get MessagePack
+    frames, with price/status/stats sent as field deltas; JSON is the
+    default. Either way each broadcast is encoded once per process and the
+    bytes are shared by every recipient (see dashboard.frames).
+    
+    Broadcasts to the 'dashboard' group reach a client through the
+    process's dashboard_state listener; by default it gets everything.
+    Sending ``{"command": "subscribe", "topics": ["price_update:BTC/USDT",
+    "trade_executed"]}`` moves it to per-topic groups (message type, or
+    type and symbol), so the channel layer only fans each event out to the
+    clients that want it. The bot only sends to 'dashboard', so that
+    needs ``manage.py route_events`` running; while no router is alive the
+    listener relays subscribers their topics itself.
+    
+    Every broadcast is also folded into the process-wide dashboard_state
+    snapshot, by one listener per process that the first connection
+    starts, so a (re)connecting client gets status and stats from memory
+    and the bot API is only asked when the snapshot is cold or stale.
+    """
+    
+    # Close code sent to clients disconnected for falling behind
+    SLOW_CLIENT_CLOSE_CODE = 4008
+    
+    async def dispatch(self, message):
+        """Route a message to its handler.
+        
+        Channels runs close_old_connections() in a worker thread before every
+        message; this consumer never uses the database, so skip that thread
+        hop on each relayed broadcast.
+        """
+        handler = getattr(self, get_handler_name(message), None)
+        if handler is None:
+            raise ValueError(f"No handler for message type {message['type']}")
+        await handler(message)
     
     async def connect(self):
         """Accept WebSocket connection and send initial status once"""
-        await self.accept()
+        self.protocol, subprotocol = negotiate(self.scope)
+        self._stream_seqs = {}
+        self.topics = set()
+        await self.accept(subprotocol=subprotocol)
+        websocket_connections.inc('dashboard')
         
         # Initialize API client
-        self.bot_api = BotAPIClient()
+        self.bot_api = AsyncBotAPIClient()
         
-        # Add to dashboard channel group for receiving bot broadcasts
-        await self.channel_layer.group_add(
-            'dashboard',
-            self.channel_name
+        self.outbox = ClientOutbox(
+            self.send_now, on_slow=self.close_slow_client, backlog=transport_backlog(self.base_send),
         )
+        self.outbox.start()
+        
+        await dashboard_state.start_listener(self.channel_layer)
+        
+        # Receive bot broadcasts through the process's state listener
+        dashboard_state.clients.add(self)
         
         print("✅ Dashboard WebSocket connected - relay mode (no polling)")
         
-        # Send initial status once only - no polling
+        # Send initial status once only - no polling; served from the
+        # snapshot unless it is cold, so mass reconnects don't hit the bot
         await self.send_status()
+        stats = dashboard_state.stats_snapshot()
+        if stats is not None:
+            await self.send_json({
+                'type': 'stats',
+                'data': stats
+            })
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
-        # Remove from channel group
-        await self.channel_layer.group_discard(
-            'dashboard',
-            self.channel_name
-        )
+        # Remove from channel groups
+        dashboard_state.clients.discard(self)
+        for group in self.groups_joined():
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.outbox.stop()
+        websocket_connections.dec('dashboard')
         
         print(f"❌ Dashboard WebSocket disconnected (code: {close_code})")
     
@@ -54,15 +122,18 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             
             elif command == 'start_bot':
                 # Forward command to bot API
-                response = self.bot_api.start_bot()
+                response = await self.bot_api.start_bot()
                 await self.send_json({
                     'type': 'bot_control',
                     'data': response
                 })
             
+            elif command in ('subscribe', 'unsubscribe'):
+                await self.update_topics(command, data.get('topics') or [])
+            
             elif command == 'stop_bot':
                 # Forward command to bot API
-                response = self.bot_api.stop_bot()
+                response = await self.bot_api.stop_bot()
                 await self.send_json({
                     'type': 'bot_control',
                     'data': response
@@ -82,7 +153,7 @@ class DashboardConsumer(AsyncWebsocketConsumer):
     async def send_status(self):
         """Get and send current bot status"""
         try:
-            status = self.bot_api.get_status()
+            status = await dashboard_state.get_status(self.bot_api)
             await self.send_json({
                 'type': 'status',
                 'data': status
@@ -96,7 +167,7 @@ class DashboardConsumer(AsyncWebsocketConsumer):
     async def send_stats(self):
         """Get and send trading statistics"""
         try:
-            stats = self.bot_api.get_stats()
+            stats = await dashboard_state.get_stats(self.bot_api)
             await self.send_json({
                 'type': 'stats',
                 'data': stats
@@ -107,9 +178,76 @@ class DashboardConsumer(AsyncWebsocketConsumer):
                 'data': {'message': f'Error getting stats: {str(e)}'}
             })
     
+    def groups_joined(self):
+        """Channel layer topic groups for this client's current subscriptions"""
+        return [topic_group(message_type, symbol) for message_type, symbol in self.topics]
+    
+    async def update_topics(self, command, topics):
+        """Subscribe to / unsubscribe from topics and move between channel groups"""
+        parsed = [parse_topic(topic) for topic in topics]
+        unknown = [topic for topic, key in zip(topics, parsed) if key is None]
+        if unknown:
+            await self.send_json({
+                'type': 'error',
+                'data': {'message': f'Unknown topics: {", ".join(map(str, unknown))}'}
+            })
+            return
+        
+        before = set(self.groups_joined())
+        wanted = set(self.topics)
+        for topic in parsed:
+            message_type, symbol = topic
+            if command == 'unsubscribe':
+                wanted.discard(topic)
+            elif (message_type, None) not in wanted:
+                if symbol is None:
+                    # A whole-type subscription covers that type's symbols
+                    wanted = {t for t in wanted if t[0] != message_type}
+                wanted.add(topic)
+        self.topics = wanted
+        after = set(self.groups_joined())
+        
+        for group in after - before:
+            await self.channel_layer.group_add(group, self.channel_name)
+        for group in before - after:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        if self.topics and not dashboard_state.router_alive():
+            logger.warning(
+                "No topic router is running (manage.py route_events); relaying the bot's "
+                "broadcasts to topic subscribers from each web process"
+            )
+        await self.send_json({
+            'type': 'subscriptions',
+            'data': {'topics': sorted(f'{t}:{s}' if s else t for t, s in self.topics)}
+        })
+    
     async def send_json(self, content):
-        """Send JSON message to client"""
-        await self.send(text_data=json.dumps(content))
+        """Queue a message for the client (never dropped)"""
+        self.outbox.put(frame_memo.frame(content['type'], content.get('data')))
+    
+    async def send_now(self, frame):
+        """Write a frame to the socket in this client's protocol; called by the outbox"""
+        websocket_messages.inc(frame.message_type)
+        if self.protocol == JSON:
+            await self.send(text_data=frame.encode(JSON))
+            return
+        base_seq = self._stream_seqs.get(frame.stream) if frame.stream else None
+        payload = frame.encode(MSGPACK, base_seq)
+        if frame.stream:
+            self._stream_seqs[frame.stream] = frame.seq
+        await self.send(bytes_data=payload)
+    
+    async def close_slow_client(self):
+        await self.close(code=self.SLOW_CLIENT_CLOSE_CODE)
+    
+    def relay(self, message_type, data, event_id=None):
+        """Queue a broadcast for this client, conflating price updates"""
+        frame = frame_memo.frame(message_type, data, event_id)
+        if message_type == PRICE_UPDATE:
+            symbol = data.get('symbol') if isinstance(data, dict) else None
+            self.outbox.put_latest((PRICE_UPDATE, symbol), frame)
+        else:
+            self.outbox.put(frame)
     
     async def send_trade(self, trade_data):
         """Send new trade notification"""
@@ -119,29 +257,93 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         })
     
     async def broadcast_to_group(self, message_type, data):
-        """Broadcast message to all clients in dashboard group"""
-        await self.channel_layer.group_send(
-            'dashboard',
-            {
-                'type': 'dashboard_message',
-                'message_type': message_type,
-                'data': data
-            }
-        )
+        """Broadcast message to all clients in dashboard group and its topic groups"""
+        await publish(self.channel_layer, message_type, data)
     
     async def dashboard_message(self, event):
         """Receive message from channel layer and send to WebSocket"""
-        await self.send_json({
-            'type': event['message_type'],
-            'data': event['data']
-        })
+        self.relay(*relay_message(event), event.get('event_id'))
     
     async def bot_update(self, event):
         """
         Receives broadcast messages from bot_api manager via channel layer
         This is the relay point - bot pushes updates, we forward to frontend
         """
-        await self.send(text_data=json.dumps({
-            'type': event['type'],
-            'data': event['data']
-        }))
+        self.relay(*relay_message(event), event.get('event_id'))
+
+
+class LogStreamConsumer(AsyncWebsocketConsumer):
+    """WebSocket consumer that streams newly appended bot log lines.
+
+    The client sends ``{"command": "subscribe", "level": ..., "search": ...,
+    "lines": N}``; it gets the last N matching lines once, then only new lines
+    as the shared log follower picks them up. Filters are applied here, per
+    subscriber, so the browser never re-downloads the log.
+    """
+
+    async def connect(self):
+        await self.accept()
+        websocket_connections.inc('logs')
+        self.level_filter = ''
+        self.search_filter = ''
+
+    async def disconnect(self, close_code):
+        log_follower.unsubscribe(self.push_lines)
+        websocket_connections.dec('logs')
+
+    async def receive(self, text_data):
+        """Handle subscribe / filter-change commands"""
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            data = None
+        if not isinstance(data, dict):
+            await self.send_json({
+                'type': 'error',
+                'data': {'message': 'Invalid JSON'}
+            })
+            return
+
+        if data.get('command') == 'subscribe':
+            self.level_filter = data.get('level') or ''
+            self.search_filter = data.get('search') or ''
+            try:
+                lines_count = int(data.get('lines', 100))
+            except (TypeError, ValueError):
+                lines_count = 100
+            lines_count = max(1, min(lines_count, getattr(settings, 'BOT_LOG_MAX_LINES', 5000)))
+
+            await self.send_snapshot(lines_count)
+            log_follower.subscribe(self.push_lines)
+
+    async def send_snapshot(self, lines_count):
+        """Send the last N matching lines, newest first"""
+        try:
+            log_path = await asyncio.to_thread(find_latest_log)
+            lines = await asyncio.to_thread(log_tailer.tail, log_path, lines_count) if log_path else []
+        except OSError as e:
+            await self.send_json({
+                'type': 'error',
+                'data': {'message': f'Error reading log files: {str(e)}'}
+            })
+            return
+        logs, stats = filter_log_lines(lines, self.level_filter, self.search_filter)
+        logs.reverse()
+        await self.send_json({
+            'type': 'logs_snapshot',
+            'data': {'logs': logs, 'stats': stats}
+        })
+
+    async def push_lines(self, lines):
+        """Called by the log follower with lines appended since the last tick"""
+        logs, stats = filter_log_lines(lines, self.level_filter, self.search_filter)
+        if logs:
+            logs.reverse()
+            await self.send_json({
+                'type': 'logs_append',
+                'data': {'logs': logs, 'stats': stats}
+            })
+
+    async def send_json(self, content):
+        """Send JSON message to client"""
+        await self.send(text_data=json.dumps(content))
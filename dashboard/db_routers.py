@@ -0,0 +1,66 @@
+"""
+Database routing: analytics reads go to a separate read-only connection
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Database alias for order history, export and rollup reads
+ANALYTICS_DB = 'analytics'
+
+_analytics = ContextVar('analytics_reads', default=False)
+
+
+def analytics_db():
+    """Alias analytics reads should use right now.
+
+    'analytics' when it is configured and no write transaction is open on
+    'default' (so a request always reads its own writes), else 'default'.
+    """
+    if ANALYTICS_DB not in connections.settings or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return ANALYTICS_DB
+
+
+@contextmanager
+def analytics_reads():
+    """Route ORM reads made inside the block to the analytics connection"""
+    token = _analytics.set(True)
+    try:
+        yield
+    finally:
+        _analytics.reset(token)
+
+
+def uses_analytics_db(view):
+    """Decorator for sync views whose reads can go to the analytics connection"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with analytics_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class AnalyticsRouter:
+    """Sends reads inside analytics_reads() to ANALYTICS_DB; everything else to default.
+
+    ANALYTICS_DB is the same SQLite file opened with ``query_only`` locally
+    (WAL mode lets it read while trades are being written), or a Postgres
+    replica in production. It is never migrated or written to.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _analytics.get():
+            return analytics_db()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != ANALYTICS_DB
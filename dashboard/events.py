@@ -0,0 +1,156 @@
+"""
+Bot broadcast events relayed over the channel layer
+"""
+import asyncio
+import logging
+import time
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TRADE_EXECUTED = 'trade_executed'
+STATUS_CHANGE = 'status_change'
+PRICE_UPDATE = 'price_update'
+
+# Group the bot's broadcasts are relayed to (see DashboardConsumer)
+BROADCAST_GROUP = 'dashboard'
+
+# Sent to BROADCAST_GROUP by a running TopicRouter (see DashboardState.listen)
+ROUTER_HEARTBEAT = 'router_heartbeat'
+
+# Message types a dashboard client can subscribe to, per symbol for those
+# whose payload carries one
+TOPIC_TYPES = frozenset({TRADE_EXECUTED, STATUS_CHANGE, PRICE_UPDATE, 'status', 'stats'})
+
+
+def relay_message(event):
+    """Return (message_type, data) for a channel layer event.
+
+    ``dashboard_message`` events name their type in ``message_type``;
+    ``bot_update`` events may carry the bot's own ``{"type", "data"}``
+    message as their data. Anything else is passed through as-is.
+    """
+    message_type = event.get('message_type')
+    data = event.get('data')
+    if not message_type and isinstance(data, dict) and isinstance(data.get('type'), str) and 'data' in data:
+        message_type, data = data['type'], data['data']
+    return message_type or event.get('type'), data
+
+
+def symbol_key(symbol):
+    """'BTC/USDT' -> 'BTCUSDT' (group names only allow a few characters)"""
+    return ''.join(ch for ch in symbol.upper() if ch.isalnum()) or None
+
+
+def topic_group(message_type, symbol=None):
+    """Channel layer group for one topic: 'dashboard.price_update.BTCUSDT'"""
+    group = f'{BROADCAST_GROUP}.{message_type}'
+    if symbol:
+        group += '.' + symbol_key(symbol)
+    return group
+
+
+def parse_topic(topic):
+    """'price_update:BTC/USDT' -> ('price_update', 'BTCUSDT'); None if unknown"""
+    message_type, _, symbol = str(topic).partition(':')
+    if message_type not in TOPIC_TYPES:
+        return None
+    return message_type, symbol_key(symbol)
+
+
+def wants(topics, message_type, data):
+    """Whether a client subscribed to ``topics`` (parse_topic() keys) gets this event"""
+    if (message_type, None) in topics:
+        return True
+    symbol = data.get('symbol') if isinstance(data, dict) else None
+    return isinstance(symbol, str) and (message_type, symbol_key(symbol)) in topics
+
+
+def event_groups(message_type, data):
+    """Topic groups an event is delivered to (besides the legacy BROADCAST_GROUP)"""
+    groups = [topic_group(message_type)]
+    symbol = data.get('symbol') if isinstance(data, dict) else None
+    if isinstance(symbol, str) and symbol:
+        groups.append(topic_group(message_type, symbol))
+    return groups
+
+
+async def publish(channel_layer, message_type, data, event_id=None, legacy=True):
+    """Send one event to the clients that want it.
+
+    Goes to the message type's topic group, the type-and-symbol group when
+    the payload names a symbol, and (with ``legacy``) BROADCAST_GROUP for
+    clients that haven't subscribed to topics. Every copy shares one
+    ``event_id``, so each process encodes it once.
+    """
+    event = {
+        'type': 'dashboard_message',
+        'message_type': message_type,
+        'data': data,
+        'event_id': event_id or uuid.uuid4().hex,
+        'routed': True,
+    }
+    groups = event_groups(message_type, data)
+    if legacy:
+        groups.append(BROADCAST_GROUP)
+    for group in groups:
+        await channel_layer.group_send(group, event)
+
+
+class TopicRouter:
+    """Re-publishes events sent only to BROADCAST_GROUP into the topic groups.
+
+    Producers that predate topics (the bot's bridge) keep sending to
+    'dashboard'; run one router (``manage.py route_events``) so the
+    channel layer only delivers those events to the topics' subscribers.
+    Events sent with :func:`publish` are already routed and skipped. The
+    router sends ROUTER_HEARTBEAT to 'dashboard' every ``heartbeat``
+    seconds; until web processes hear it they relay to subscribers
+    themselves.
+    """
+
+    def __init__(self, heartbeat=None):
+        self.routed = 0
+        if heartbeat is None:
+            heartbeat = getattr(settings, 'DASHBOARD_ROUTER_HEARTBEAT', 5)
+        self.heartbeat = heartbeat
+
+    async def listen(self, channel_layer=None, group=BROADCAST_GROUP):
+        if channel_layer is None:
+            from channels.layers import get_channel_layer
+            channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(group, channel)
+        # Renew the membership before the layer's group_expiry drops it
+        rejoin_every = max(1, int(getattr(channel_layer, 'group_expiry', 86400) // 2))
+        rejoin_at = time.monotonic() + rejoin_every
+        beat_at = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= beat_at:
+                    await channel_layer.group_send(group, {'type': ROUTER_HEARTBEAT, 'routed': True})
+                    beat_at = now + self.heartbeat
+                try:
+                    event = await asyncio.wait_for(
+                        channel_layer.receive(channel), min(rejoin_at, beat_at) - time.monotonic(),
+                    )
+                except asyncio.TimeoutError:
+                    event = None
+                if time.monotonic() >= rejoin_at:
+                    await channel_layer.group_add(group, channel)
+                    rejoin_at = time.monotonic() + rejoin_every
+                if event is None or event.get('routed'):
+                    continue
+                message_type, data = relay_message(event)
+                if message_type not in TOPIC_TYPES:
+                    continue
+                try:
+                    await publish(channel_layer, message_type, data, event.get('event_id'), legacy=False)
+                    self.routed += 1
+                except Exception as e:
+                    logger.error(f"Error routing {message_type} event: {e}")
+        finally:
+            await channel_layer.group_discard(group, channel)
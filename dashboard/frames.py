@@ -0,0 +1,142 @@
+"""
+Encoded WebSocket frames for the dashboard relay
+"""
+from collections import OrderedDict
+from urllib.parse import parse_qs
+import json
+
+try:
+    import msgpack
+except ImportError:  # channels_redis depends on it, but the binary protocol is optional
+    msgpack = None
+
+from .events import PRICE_UPDATE
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+# WebSocket subprotocol a client offers to receive MessagePack frames
+MSGPACK_SUBPROTOCOL = 'dashboard.msgpack'
+
+# Binary clients get these as field deltas against the last frame they saw
+DELTA_TYPES = frozenset({PRICE_UPDATE, 'status', 'stats'})
+
+# Binary frame layouts (MessagePack arrays):
+#   [KEY_FRAME, type, data]                         plain message
+#   [KEY_FRAME, type, data, stream, seq]            full state of a delta stream
+#   [DELTA_FRAME, stream, seq, base_seq, changed, removed]
+# Streams are small integers, one per type and symbol; a delta's type is
+# that of its stream's key frame.
+KEY_FRAME = 0
+DELTA_FRAME = 1
+
+_MISSING = object()
+
+
+def negotiate(scope):
+    """Pick the protocol for a connection: returns (protocol, subprotocol to accept).
+
+    Clients opt into MessagePack by offering the ``dashboard.msgpack``
+    subprotocol or with ``?protocol=msgpack``; everyone else gets JSON.
+    """
+    if msgpack is None:
+        return JSON, None
+    if MSGPACK_SUBPROTOCOL in (scope.get('subprotocols') or []):
+        return MSGPACK, MSGPACK_SUBPROTOCOL
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if query.get('protocol') == [MSGPACK]:
+        return MSGPACK, None
+    return JSON, None
+
+
+class Frame:
+    """One outgoing message, encoded at most once per protocol and delta base.
+
+    A broadcast's Frame is shared by every recipient in the process, so its
+    JSON text or MessagePack bytes are built for the first client and reused
+    for the rest.
+    """
+
+    __slots__ = ('message_type', 'data', 'stream', 'seq', 'history', '_encoded')
+
+    def __init__(self, message_type, data, stream=None, seq=None, history=None):
+        self.message_type = message_type
+        self.data = data
+        self.stream = stream
+        self.seq = seq
+        self.history = history
+        self._encoded = {}
+
+    @property
+    def content(self):
+        return {'type': self.message_type, 'data': self.data}
+
+    def encode(self, protocol, base_seq=None):
+        """JSON text, or MessagePack bytes (a delta when ``base_seq`` is known)"""
+        if protocol == JSON or self.history is None or base_seq not in self.history:
+            base_seq = None
+        key = (protocol, base_seq)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = self._encoded[key] = self._encode(protocol, base_seq)
+        return encoded
+
+    def _encode(self, protocol, base_seq):
+        if protocol == JSON:
+            return json.dumps(self.content)
+        if base_seq is not None:
+            base = self.history[base_seq]
+            changed = {k: v for k, v in self.data.items() if base.get(k, _MISSING) != v}
+            removed = [k for k in base if k not in self.data]
+            frame = [DELTA_FRAME, self.stream, self.seq, base_seq, changed, removed]
+        elif self.stream is not None:
+            frame = [KEY_FRAME, self.message_type, self.data, self.stream, self.seq]
+        else:
+            frame = [KEY_FRAME, self.message_type, self.data]
+        return msgpack.packb(frame, default=str)
+
+
+class FrameMemo:
+    """Builds the Frame for each broadcast once per process.
+
+    Frames are looked up by the event's ``event_id``; every broadcast has
+    one by the time it is relayed (the state listener stamps the bot's).
+    Messages without one, such as replies to a single client, get a frame
+    of their own. Delta streams (one per type and symbol) keep their last
+    ``history`` payloads, so a client can be sent a delta against
+    whichever of them it saw last.
+    """
+
+    def __init__(self, size=256, history=16):
+        self.size = size
+        self.history_size = history
+        self._frames = OrderedDict()
+        self._streams = {}       # (type, symbol) -> (stream id, last seq, history)
+
+    def frame(self, message_type, data, event_id=None):
+        if event_id is None:
+            return self._build(message_type, data)
+        frame = self._frames.get(event_id)
+        if frame is not None:
+            self._frames.move_to_end(event_id)
+            return frame
+        frame = self._frames[event_id] = self._build(message_type, data)
+        while len(self._frames) > self.size:
+            self._frames.popitem(last=False)
+        return frame
+
+    def _build(self, message_type, data):
+        if message_type not in DELTA_TYPES or not isinstance(data, dict):
+            return Frame(message_type, data)
+        key = (message_type, data.get('symbol'))
+        stream, seq, history = self._streams.get(key) or (len(self._streams) + 1, 0, OrderedDict())
+        seq += 1
+        history[seq] = data
+        while len(history) > self.history_size:
+            history.popitem(last=False)
+        self._streams[key] = (stream, seq, history)
+        return Frame(message_type, data, stream, seq, history)
+
+
+# Shared by every dashboard connection in the process
+frame_memo = FrameMemo()
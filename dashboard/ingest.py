@@ -0,0 +1,319 @@
+"""
+Bulk ingestion of bot trades into the Trade table
+"""
+from asgiref.sync import sync_to_async
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+
+from . import analytics, pairing, rollups
+from .events import BROADCAST_GROUP, TRADE_EXECUTED, relay_message
+from .models import Trade
+
+logger = logging.getLogger(__name__)
+
+
+def _decimal(value, places=None):
+    if value is None or value == '':
+        return None
+    try:
+        number = Decimal(str(value).strip().rstrip('%'))
+    except (InvalidOperation, ValueError):
+        return None
+    if not number.is_finite():
+        return None
+    return number.quantize(Decimal(1).scaleb(-places)) if places is not None else number
+
+
+def _field_decimal(value, field_name):
+    """_decimal() rounded and clamped to the precision of a Trade DecimalField"""
+    number = _decimal(value)
+    if number is None:
+        return None
+    field = Trade._meta.get_field(field_name)
+    step = Decimal(1).scaleb(-field.decimal_places)
+    limit = Decimal(10) ** (field.max_digits - field.decimal_places) - step
+    return max(min(number, limit), -limit).quantize(step)
+
+
+def _timestamp(value):
+    """Aware datetime from an ISO string or epoch seconds/milliseconds"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e11 else value
+        parsed = datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+    elif isinstance(value, str) and value:
+        parsed = parse_datetime(value.replace(' ', 'T', 1))
+    else:
+        parsed = None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def bot_trade_id(payload):
+    """Stable id for a bot trade payload.
+
+    Uses the bot's ``trade_id``/``id`` when present, otherwise a hash of the
+    fields that identify the fill, so the same trade seen as a broadcast and
+    again in a /trades/recent backfill maps to the same row.
+    """
+    for key in ('trade_id', 'id'):
+        if payload.get(key) not in (None, ''):
+            return str(payload[key])[:64]
+    identity = '|'.join(str(payload.get(key, '')) for key in ('timestamp', 'symbol', 'action', 'price', 'amount'))
+    return 'h:' + hashlib.sha1(identity.encode()).hexdigest()
+
+
+def trade_from_payload(payload):
+    """Build an unsaved Trade from a bot trade payload, or None if unusable"""
+    if not isinstance(payload, dict):
+        return None
+    action = str(payload.get('action') or payload.get('side') or '').upper()
+    price = _field_decimal(payload.get('price'), 'price')
+    if action not in ('BUY', 'SELL') or price is None:
+        return None
+
+    # The bot reports results either as WIN/LOSS or as a signed "+1.25%"
+    result = payload.get('result')
+    profit_loss_pct = _field_decimal(payload.get('profit_loss_pct', payload.get('profit_pct')), 'profit_loss_pct')
+    if isinstance(result, str) and result.upper() in ('WIN', 'LOSS'):
+        result = result.upper()
+    else:
+        if profit_loss_pct is None:
+            profit_loss_pct = _field_decimal(result, 'profit_loss_pct')
+        result = None if profit_loss_pct is None else ('WIN' if profit_loss_pct > 0 else 'LOSS')
+
+    duration = payload.get('duration_minutes')
+    try:
+        duration = int(duration) if duration is not None else None
+    except (TypeError, ValueError):
+        duration = None
+
+    return Trade(
+        bot_trade_id=bot_trade_id(payload),
+        timestamp=_timestamp(payload.get('timestamp')) or timezone.now(),
+        symbol=str(payload.get('symbol') or 'BTC/USDT')[:20],
+        action=action,
+        price=price,
+        amount=_field_decimal(payload.get('amount'), 'amount') or Decimal('0'),
+        profit_loss_pct=profit_loss_pct,
+        result=result,
+        entry_price=_field_decimal(payload.get('entry_price'), 'entry_price'),
+        exit_price=_field_decimal(payload.get('exit_price'), 'exit_price'),
+        duration_minutes=duration,
+        fee_paid=_field_decimal(payload.get('fee_paid', payload.get('fee')), 'fee_paid') or Decimal('0'),
+        net_pnl=_field_decimal(payload.get('net_pnl', payload.get('profit')), 'net_pnl'),
+        notes=str(payload.get('notes') or ''),
+    )
+
+
+def trade_payload_from_event(event):
+    """The trade payload carried by a channel layer event, or None"""
+    message_type, data = relay_message(event)
+    if message_type != TRADE_EXECUTED or not isinstance(data, dict):
+        return None
+    return data
+
+
+class TradeIngestor:
+    """Buffers bot trades and writes them with bulk_create.
+
+    Trades are deduplicated on ``bot_trade_id`` within the buffer and against
+    the table, and written in one transaction per flush: one lookup of the
+    already-stored ids, one multi-row INSERT per ``batch_size`` rows and one
+    rollup update. A flush happens when ``batch_size`` trades are pending or
+    ``flush_interval`` seconds have passed since the last one. Stored trades
+    are paired (see dashboard.pairing) by pair(), which the periodic
+    flusher calls, at most once per ``pairing_interval`` seconds.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, pairing_interval=None):
+        self.batch_size = batch_size or getattr(settings, 'TRADE_INGEST_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(
+            settings, 'TRADE_INGEST_FLUSH_INTERVAL', 1.0)
+        self.pairing_interval = pairing_interval if pairing_interval is not None else getattr(
+            settings, 'TRADE_PAIRING_INTERVAL', 5.0)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._pairing_due = False
+        self._last_pairing = None
+        self.received = 0
+        self.inserted = 0
+        self.skipped = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, payload):
+        """Buffer one payload; returns True when a flush is due"""
+        trade = trade_from_payload(payload)
+        with self._lock:
+            self.received += 1
+            if trade is None:
+                self.skipped += 1
+            else:
+                self._pending[trade.bot_trade_id] = trade
+        return self.flush_due()
+
+    def add_many(self, payloads):
+        """Buffer payloads, flushing whenever a batch fills; returns rows inserted"""
+        inserted = 0
+        for payload in payloads:
+            if self.add(payload):
+                inserted += self.flush()
+        return inserted
+
+    def flush_due(self):
+        if len(self._pending) >= self.batch_size:
+            return True
+        return bool(self._pending) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self):
+        """Write pending trades; returns the number of new rows"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            with transaction.atomic():
+                new_trades = self._insert(pending)
+                rollups.apply_trades(new_trades)
+                if new_trades:
+                    analytics.invalidate()
+        except Exception:
+            # Keep the batch for the next flush; trades added since win
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+
+        self.inserted += len(new_trades)
+        self.skipped += len(pending) - len(new_trades)
+        if new_trades:
+            with self._lock:
+                self._pairing_due = True
+        return len(new_trades)
+
+    def pair(self, force=False):
+        """Pair the trades flushed since the last run; returns the number of trades updated.
+
+        Does nothing within ``pairing_interval`` seconds of the last run
+        unless ``force`` is set.
+        """
+        with self._lock:
+            if not self._pairing_due or not pairing.pairing_enabled():
+                return 0
+            now = time.monotonic()
+            if not force and self._last_pairing is not None and now - self._last_pairing < self.pairing_interval:
+                return 0
+            self._pairing_due = False
+            self._last_pairing = now
+        try:
+            return pairing.pair_trades()[1]
+        except Exception:
+            with self._lock:
+                self._pairing_due = True
+            raise
+
+    def _insert(self, pending):
+        """Insert the trades in ``pending`` not stored yet; returns the ones inserted here.
+
+        Without ignore_conflicts a batch fails as a whole when another
+        writer stored one of its ids first, so the trades returned are
+        exactly the rows this call wrote and rollups never count a trade
+        twice. The ids are then looked up again and the rest retried.
+        """
+        trades = list(pending.values())
+        while True:
+            stored = set(
+                Trade.objects.filter(bot_trade_id__in=[trade.bot_trade_id for trade in trades])
+                .values_list('bot_trade_id', flat=True)
+            )
+            trades = [trade for trade in trades if trade.bot_trade_id not in stored]
+            # Drop pks left by a write that was rolled back
+            for trade in trades:
+                trade.pk = None
+                trade._state.adding = True
+            try:
+                with transaction.atomic():
+                    Trade.objects.bulk_create(trades, batch_size=self.batch_size)
+                return trades
+            except IntegrityError:
+                if not Trade.objects.filter(bot_trade_id__in=[trade.bot_trade_id for trade in trades]).exists():
+                    raise
+
+    async def aadd(self, payload):
+        if self.add(payload):
+            await self.aflush()
+
+    async def aflush(self):
+        return await sync_to_async(self.flush, thread_sensitive=True)()
+
+    async def apair(self, force=False):
+        return await sync_to_async(self.pair, thread_sensitive=True)(force)
+
+    async def backfill(self, client=None):
+        """Ingest the bot's /trades/recent list; returns rows inserted"""
+        if client is None:
+            from .api_client import AsyncBotAPIClient
+            client = AsyncBotAPIClient()
+        trades = await client.get_recent_trades()
+        if isinstance(trades, dict):
+            trades = trades.get('trades') or []
+        for payload in trades or []:
+            self.add(payload)
+        inserted = await self.aflush()
+        await self.apair(force=True)
+        return inserted
+
+    async def listen(self, channel_layer=None, group=BROADCAST_GROUP):
+        """Consume trade events broadcast to ``group`` until cancelled"""
+        if channel_layer is None:
+            from channels.layers import get_channel_layer
+            channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(group, channel)
+        flusher = asyncio.ensure_future(self._flush_periodically(channel_layer, group, channel))
+        try:
+            while True:
+                event = await channel_layer.receive(channel)
+                payload = trade_payload_from_event(event)
+                if payload is None:
+                    continue
+                try:
+                    await self.aadd(payload)
+                except Exception as e:
+                    logger.error(f"Error ingesting trades: {e}")
+        finally:
+            flusher.cancel()
+            await channel_layer.group_discard(group, channel)
+            await self.aflush()
+            await self.apair(force=True)
+
+    async def _flush_periodically(self, channel_layer, group, channel):
+        """Flush idle buffers and pair stored trades on time, and renew the group membership before it expires"""
+        rejoin_every = max(1, int(getattr(channel_layer, 'group_expiry', 86400) // 2))
+        rejoin_at = time.monotonic() + rejoin_every
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                if self.flush_due():
+                    await self.aflush()
+                await self.apair()
+                if time.monotonic() >= rejoin_at:
+                    await channel_layer.group_add(group, channel)
+                    rejoin_at = time.monotonic() + rejoin_every
+            except Exception as e:
+                logger.error(f"Error flushing ingested trades: {e}")
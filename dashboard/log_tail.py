@@ -0,0 +1,300 @@
+"""
+Incremental tail reader for the trading bot log files
+"""
+from collections import OrderedDict, deque, namedtuple
+from django.conf import settings
+import asyncio
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Bot log format: YYYY-MM-DD HH:MM:SS,mmm - LEVEL - MESSAGE
+LOG_LINE_RE = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ - (\w+) - (.+)')
+
+BLOCK_SIZE = 64 * 1024
+
+
+class LogLine(namedtuple('LogLine', ['raw', 'time', 'level', 'message', 'parsed'])):
+    """One log line, parsed once when it is first read"""
+
+    __slots__ = ()
+
+    def as_dict(self):
+        return {'time': self.time, 'level': self.level, 'message': self.message}
+
+
+def parse_log_line(raw):
+    """Parse a raw log line, falling back to an INFO entry for unknown formats"""
+    raw = raw.rstrip('\r')
+    line = raw.strip()
+    match = LOG_LINE_RE.match(line)
+    if match:
+        timestamp, level, message = match.groups()
+        return LogLine(raw, timestamp, level, message, True)
+    return LogLine(raw, 'Unknown', 'INFO', line, False)
+
+
+def matches_filters(line, level_filter='', search_filter=''):
+    """Apply the log viewer's level and search filters to a parsed line"""
+    if not line.message:
+        return False
+    if line.parsed:
+        if level_filter and line.level != level_filter:
+            return False
+        return not search_filter or search_filter.lower() in line.message.lower()
+    # Lines that don't match the expected format only show unfiltered by level
+    return not level_filter and (not search_filter or search_filter.lower() in line.message.lower())
+
+
+def filter_log_lines(lines, level_filter='', search_filter=''):
+    """Filter parsed lines and count levels; returns (entries, stats), oldest first"""
+    logs = []
+    stats = {'total': 0, 'info': 0, 'warning': 0, 'error': 0}
+    for line in lines:
+        if not matches_filters(line, level_filter, search_filter):
+            continue
+        logs.append(line.as_dict())
+        stats['total'] += 1
+        if line.level == 'INFO':
+            stats['info'] += 1
+        elif line.level == 'WARNING':
+            stats['warning'] += 1
+        elif line.level in ['ERROR', 'CRITICAL']:
+            stats['error'] += 1
+    return logs, stats
+
+
+def get_log_dir():
+    """Directory the trading bot writes its logs to"""
+    default = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        'crypto-trading-bot', 'logs',
+    )
+    return str(getattr(settings, 'BOT_LOG_DIR', default))
+
+
+def find_latest_log(log_dir=None):
+    """Path of the most recently created .log file, or None"""
+    log_dir = log_dir or get_log_dir()
+    if not os.path.isdir(log_dir):
+        return None
+    log_files = [f for f in os.listdir(log_dir) if f.endswith('.log')]
+    if not log_files:
+        return None
+    latest_log = max(log_files, key=lambda f: os.path.getctime(os.path.join(log_dir, f)))
+    return os.path.join(log_dir, latest_log)
+
+
+class _Cursor:
+    """Read position and parsed tail buffer for one log file"""
+
+    def __init__(self, stat, offset, capacity):
+        self.identity = (stat.st_dev, stat.st_ino)
+        self.offset = offset
+        self.lines = deque(maxlen=capacity)
+        self.partial = b''
+
+
+class LogTailer:
+    """Returns the last N lines of a log file without reading the whole file.
+
+    The first request for a file reads backwards from EOF in blocks until it
+    has enough lines. A cursor is then kept per file, so later requests only
+    read and parse the bytes appended since. Rotation (a new inode) or
+    truncation (size below the cursor) discards the cursor and starts over.
+    """
+
+    def __init__(self, capacity=None, max_files=8):
+        self.capacity = capacity or getattr(settings, 'BOT_LOG_TAIL_BUFFER', 1000)
+        self.max_files = max_files
+        self._cursors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tail(self, path, n):
+        """Return the last ``n`` lines of ``path`` as LogLine, oldest first"""
+        if n <= 0:
+            return []
+        with self._lock:
+            cursor = self._refresh(path, n)
+            lines = list(cursor.lines)[-n:] if n < len(cursor.lines) else list(cursor.lines)
+            if cursor.partial:
+                # Unterminated last line: show it, but don't cache it yet
+                lines = lines[1:] if len(lines) == n else lines
+                lines.append(parse_log_line(cursor.partial.decode('utf-8', errors='replace')))
+            return lines
+
+    def forget(self, path=None):
+        with self._lock:
+            if path is None:
+                self._cursors.clear()
+            else:
+                self._cursors.pop(path, None)
+
+    def _refresh(self, path, n):
+        stat = os.stat(path)
+        cursor = self._cursors.get(path)
+        if cursor is not None and self._is_same_file(cursor, stat) and cursor.lines.maxlen >= n:
+            self._read_appended(path, cursor, stat)
+            self._cursors.move_to_end(path)
+        else:
+            cursor = self._load_tail(path, stat, max(n, self.capacity))
+            self._cursors[path] = cursor
+            self._evict()
+        return cursor
+
+    @staticmethod
+    def _is_same_file(cursor, stat):
+        return cursor.identity == (stat.st_dev, stat.st_ino) and stat.st_size >= cursor.offset
+
+    def _evict(self):
+        while len(self._cursors) > self.max_files:
+            self._cursors.popitem(last=False)
+
+    def _load_tail(self, path, stat, capacity):
+        """Read backwards from EOF in blocks until ``capacity`` lines are found"""
+        size = stat.st_size
+        cursor = _Cursor(stat, size, capacity)
+        blocks = []
+        newlines = 0
+        position = size
+        with open(path, 'rb') as f:
+            while position > 0 and newlines <= capacity:
+                read_size = min(BLOCK_SIZE, position)
+                position -= read_size
+                f.seek(position)
+                block = f.read(read_size)
+                newlines += block.count(b'\n')
+                blocks.append(block)
+        data = b''.join(reversed(blocks))
+        pieces = data.split(b'\n')
+        if position > 0:
+            # First piece is the tail end of a line we didn't read fully
+            pieces = pieces[1:]
+        cursor.partial = pieces.pop()
+        for piece in pieces[-capacity:]:
+            cursor.lines.append(parse_log_line(piece.decode('utf-8', errors='replace')))
+        return cursor
+
+    def _read_appended(self, path, cursor, stat):
+        """Parse bytes written after the cursor and advance it"""
+        if stat.st_size == cursor.offset:
+            return []
+        with open(path, 'rb') as f:
+            f.seek(cursor.offset)
+            data = f.read(stat.st_size - cursor.offset)
+        cursor.offset += len(data)
+        pieces = (cursor.partial + data).split(b'\n')
+        cursor.partial = pieces.pop()
+        new_lines = [parse_log_line(piece.decode('utf-8', errors='replace')) for piece in pieces]
+        cursor.lines.extend(new_lines)
+        return new_lines
+
+
+class LogFollower:
+    """Follows the newest bot log and pushes appended lines to subscribers.
+
+    A single polling task per process serves every subscriber. Each tick
+    stats the file and reads only the bytes appended since the last one; a
+    rotated or newly created log is followed from its start.
+    """
+
+    # Upper bound on one read, so a large new file doesn't flood subscribers
+    MAX_READ = 1024 * 1024
+
+    def __init__(self, interval=None):
+        self._interval = interval
+        self._subscribers = set()
+        self._task = None
+        self._path = None
+        self._identity = None
+        self._offset = 0
+        self._partial = b''
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return getattr(settings, 'BOT_LOG_POLL_INTERVAL', 1)
+
+    def subscribe(self, callback):
+        """Register ``async callback(lines)``; starts following if idle"""
+        self._subscribers.add(callback)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def unsubscribe(self, callback):
+        self._subscribers.discard(callback)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        positioned = False
+        while True:
+            try:
+                if not positioned:
+                    await asyncio.to_thread(self.seek_to_end)
+                    positioned = True
+                await asyncio.sleep(self.interval)
+                lines = await asyncio.to_thread(self.poll)
+            except OSError as e:
+                logger.warning(f"Error following bot log: {e}")
+                if not positioned:
+                    # Try again next interval rather than follow from the start
+                    await asyncio.sleep(self.interval)
+                continue
+            if lines:
+                await asyncio.gather(
+                    *(callback(lines) for callback in list(self._subscribers)),
+                    return_exceptions=True,
+                )
+
+    def seek_to_end(self):
+        """Start following from the current end of the newest log"""
+        path = find_latest_log()
+        if path is None:
+            self._path = None
+            return
+        stat = os.stat(path)
+        self._path = path
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._offset = stat.st_size
+        self._partial = b''
+
+    def poll(self):
+        """Return the complete lines appended since the previous poll"""
+        path = find_latest_log()
+        if path is None:
+            return []
+        stat = os.stat(path)
+        identity = (stat.st_dev, stat.st_ino)
+        if path != self._path or identity != self._identity or stat.st_size < self._offset:
+            self._path, self._identity, self._offset, self._partial = path, identity, 0, b''
+        if stat.st_size == self._offset:
+            return []
+
+        skip_partial = False
+        if stat.st_size - self._offset > self.MAX_READ:
+            self._offset = stat.st_size - self.MAX_READ
+            self._partial = b''
+            skip_partial = True
+        with open(path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        self._offset += len(data)
+
+        pieces = (self._partial + data).split(b'\n')
+        self._partial = pieces.pop()
+        if skip_partial and pieces:
+            pieces = pieces[1:]
+        return [parse_log_line(piece.decode('utf-8', errors='replace')) for piece in pieces]
+
+
+# Shared by the log views so cursors survive between polls
+log_tailer = LogTailer()
+
+# Shared by every log stream WebSocket in the process
+log_follower = LogFollower()
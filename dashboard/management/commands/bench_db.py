@@ -0,0 +1,136 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.utils import timezone
+
+from dashboard.management.commands.seed_trades import synthetic_trades
+from dashboard.models import BotSettings, Trade
+from dashboard.views import order_history_csv_chunks, order_history_queryset, order_history_summary
+
+
+def _alias_settings(alias, config):
+    """Fill in Django's defaults for an extra connection and register it"""
+    databases = connections.configure_settings({'default': {'ENGINE': config['ENGINE']}, alias: config})
+    connections.settings[alias] = databases[alias]
+
+
+class Command(BaseCommand):
+    help = ('Mixed read/write throughput on SQLite: CSV exports and summaries running alongside '
+            'trade inserts and settings saves, with the old setup (rollback journal, one '
+            'database) and the configured one (WAL plus the analytics connection)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Trades to seed before measuring')
+        parser.add_argument('--duration', type=float, default=5, help='Seconds per setup')
+        parser.add_argument('--writers', type=int, default=2, help='Threads inserting trades / saving settings')
+        parser.add_argument('--readers', type=int, default=2, help='Threads running exports and summaries')
+
+    def handle(self, *args, **options):
+        configured = settings.DATABASES['default']
+        analytics = settings.DATABASES.get('analytics', configured)
+        if configured['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('bench_db compares SQLite journal modes; the default database is not SQLite')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            setups = {
+                'before': (
+                    {'ENGINE': configured['ENGINE'], 'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE;'}},
+                    None,
+                ),
+                'after': (
+                    {'ENGINE': configured['ENGINE'], 'OPTIONS': dict(configured.get('OPTIONS', {}))},
+                    {'ENGINE': analytics['ENGINE'], 'OPTIONS': dict(analytics.get('OPTIONS', {}))},
+                ),
+            }
+            for name, (write_config, read_config) in setups.items():
+                path = os.path.join(tmp, f'{name}.sqlite3')
+                write_alias = f'bench_{name}'
+                _alias_settings(write_alias, {**write_config, 'NAME': path})
+                read_alias = write_alias
+                if read_config is not None:
+                    read_alias = f'bench_{name}_read'
+                    _alias_settings(read_alias, {**read_config, 'NAME': path})
+                try:
+                    call_command('migrate', database=write_alias, verbosity=0)
+                    Trade.objects.using(write_alias).bulk_create(synthetic_trades(options['rows']), batch_size=5000)
+                    result = self.run_mix(write_alias, read_alias, options)
+                finally:
+                    for alias in {write_alias, read_alias}:
+                        connections[alias].close()
+                        del connections.settings[alias]
+                self.report(name, result)
+
+    def run_mix(self, write_alias, read_alias, options):
+        stop_at = time.perf_counter() + options['duration']
+        result = {'write_latencies': [], 'write_errors': 0, 'exports': 0, 'rows_read': 0, 'summaries': 0}
+        lock = threading.Lock()
+
+        def writer(index):
+            i = 0
+            while time.perf_counter() < stop_at:
+                i += 1
+                started = time.perf_counter()
+                try:
+                    if i % 10 == 0:
+                        BotSettings(buy_threshold=Decimal('1.5')).save(using=write_alias)
+                    else:
+                        Trade.objects.using(write_alias).bulk_create([Trade(
+                            symbol='BTC/USDT', action='BUY', price=Decimal('40000.00'),
+                            amount=Decimal('0.001000'), timestamp=timezone.now(),
+                        )])
+                except OperationalError:  # database is locked
+                    with lock:
+                        result['write_errors'] += 1
+                    continue
+                with lock:
+                    result['write_latencies'].append(time.perf_counter() - started)
+
+        def reader(index):
+            while time.perf_counter() < stop_at:
+                trades = order_history_queryset(None).using(read_alias)
+                if index % 2:
+                    order_history_summary(order_history_queryset('BTC/USDT').using(read_alias))
+                    with lock:
+                        result['summaries'] += 1
+                    continue
+                rows = sum(chunk.count('\n') for chunk in order_history_csv_chunks(trades))
+                with lock:
+                    result['exports'] += 1
+                    result['rows_read'] += rows
+
+        def run(target, index):
+            try:
+                target(index)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(writer, i)) for i in range(options['writers'])]
+        threads += [threading.Thread(target=run, args=(reader, i)) for i in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result['elapsed'] = time.perf_counter() - started
+        return result
+
+    def report(self, name, result):
+        latencies = sorted(result['write_latencies'])
+        elapsed = result['elapsed']
+        line = f'{name:<7} writes {len(latencies) / elapsed:>8,.0f}/s'
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100)
+            line += f' (p50 {cuts[49] * 1000:.1f}ms, p99 {cuts[98] * 1000:.1f}ms, max {latencies[-1] * 1000:.0f}ms)'
+        line += (
+            f'  locked {result["write_errors"]}  exports {result["exports"]}'
+            f' ({result["rows_read"] / elapsed:,.0f} rows/s)  summaries {result["summaries"]}'
+        )
+        self.stdout.write(line)
@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.ingest import TradeIngestor, trade_from_payload
+
+
+class _Rollback(Exception):
+    pass
+
+
+def synthetic_payloads(count, duplicate_ratio=0.1, seed=0):
+    """Bot-shaped trade_executed payloads, with some ids repeated"""
+    rng = random.Random(seed)
+    start = timezone.now() - timedelta(days=30)
+    payloads = []
+    for i in range(count):
+        trade_id = i
+        if i and rng.random() < duplicate_ratio:
+            trade_id = rng.randrange(i)
+        pnl = rng.uniform(-25, 25)
+        payloads.append({
+            'trade_id': f'bench-{trade_id}',
+            'timestamp': (start + timedelta(seconds=trade_id * 7)).isoformat(),
+            'symbol': rng.choice(['BTC/USDT', 'ETH/USDT', 'SOL/USDT']),
+            'action': 'BUY' if trade_id % 2 == 0 else 'SELL',
+            'price': round(40000 + rng.uniform(-500, 500), 2),
+            'amount': 0.01,
+            'fee_paid': 0.4,
+            'net_pnl': round(pnl, 2),
+            'result': f'{pnl / 4:+.2f}%',
+            'duration_minutes': rng.randrange(240),
+        })
+    return payloads
+
+
+class Command(BaseCommand):
+    help = ('Measure TradeIngestor throughput on synthetic trades, against per-row '
+            'Trade.objects.create; everything is rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000, help='Trades to ingest')
+        parser.add_argument('--batch-size', type=int, default=500, help='Trades per bulk insert')
+        parser.add_argument('--per-row', type=int, default=1000,
+                            help='Trades to insert one by one for comparison (0 to skip)')
+        parser.add_argument('--duplicates', type=float, default=0.1,
+                            help='Fraction of payloads that repeat an earlier trade id')
+
+    def handle(self, *args, **options):
+        payloads = synthetic_payloads(options['count'], options['duplicates'])
+        expected = len({p['trade_id'] for p in payloads})
+
+        ingestor = TradeIngestor(batch_size=options['batch_size'], flush_interval=float('inf'))
+        bulk_seconds = self._timed(lambda: ingestor.add_many(payloads) + ingestor.flush())
+        if ingestor.inserted != expected:
+            self.stderr.write(f'Expected {expected} unique trades, stored {ingestor.inserted}')
+        rate = len(payloads) / bulk_seconds
+        self.stdout.write(
+            f'Bulk ingest: {len(payloads)} payloads ({ingestor.inserted} unique) in '
+            f'{bulk_seconds:.2f}s = {rate:,.0f} trades/s (batch size {ingestor.batch_size})'
+        )
+
+        sample = list({p['trade_id']: p for p in payloads[:options['per_row']]}.values())
+        if sample:
+            def insert_each():
+                for payload in sample:
+                    trade_from_payload(payload).save()
+            row_seconds = self._timed(insert_each)
+            row_rate = len(sample) / row_seconds
+            self.stdout.write(
+                f'Per-row save(): {len(sample)} trades in {row_seconds:.2f}s = {row_rate:,.0f} trades/s '
+                f'({rate / row_rate:.1f}x slower than bulk, and autocommit per row would be slower still)'
+            )
+
+    @staticmethod
+    def _timed(work):
+        """Run ``work`` in a transaction that is rolled back, returning its duration"""
+        elapsed = None
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                work()
+                elapsed = time.perf_counter() - started
+                raise _Rollback
+        except _Rollback:
+            pass
+        return elapsed
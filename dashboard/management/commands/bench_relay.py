@@ -0,0 +1,206 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from unittest import mock
+
+import msgpack
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from dashboard import routing
+from dashboard.api_client import AsyncBotAPIClient
+from dashboard.events import BROADCAST_GROUP, PRICE_UPDATE, TRADE_EXECUTED
+from dashboard.frames import DELTA_FRAME
+from dashboard.relay import relay_metrics
+from dashboard.state import dashboard_state
+
+STUB_STATUS = {'bot_running': True, 'current_price': 40000.0, 'balance': 10000.0, 'position': None}
+STUB_STATS = {'total_trades': 0, 'win_rate': 0, 'wins': 0, 'losses': 0}
+
+
+class BenchChannelLayer(InMemoryChannelLayer):
+    """In-memory layer that sweeps for expired messages once a second.
+
+    The stock layer sweeps every channel on each receive, which is O(clients)
+    per message and would swamp the relay being measured with 10k clients.
+    """
+
+    _cleaned_at = 0.0
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now - self._cleaned_at >= 1:
+            self._cleaned_at = now
+            super()._clean_expired()
+
+
+class RelayStats:
+    """What the simulated clients saw"""
+
+    def __init__(self):
+        self.latencies = []
+        self.received = {PRICE_UPDATE: 0, TRADE_EXECUTED: 0}
+        self.last_received_at = None
+
+
+def decode(message, streams):
+    """(type, data) of a frame as sent to a JSON or MessagePack client"""
+    if message.get('text') is not None:
+        content = json.loads(message['text'])
+        return content['type'], content['data']
+    frame = msgpack.unpackb(message['bytes'])
+    if frame[0] == DELTA_FRAME:
+        _, stream, seq, base_seq, changed, removed = frame
+        message_type, data = streams[stream]
+        data = {k: v for k, v in {**data, **changed}.items() if k not in removed}
+        streams[stream] = (message_type, data)
+        return message_type, data
+    message_type, data = frame[1], frame[2]
+    if len(frame) > 3:
+        streams[frame[3]] = (message_type, data)
+    return message_type, data
+
+
+async def read_client(communicator, stats):
+    """Record the relay latency of every benchmark message one client receives"""
+    streams = {}
+    while True:
+        message = await communicator.receive_output(timeout=None)
+        if message['type'] != 'websocket.send':
+            return
+        message_type, data = decode(message, streams)
+        sent_at = data.get('sent_at') if isinstance(data, dict) else None
+        if sent_at is None:
+            continue
+        now = time.perf_counter()
+        stats.latencies.append(now - sent_at)
+        stats.received[message_type] += 1
+        stats.last_received_at = now
+
+
+class Command(BaseCommand):
+    help = ('Load-test the dashboard WebSocket relay in process: N simulated clients, an '
+            'in-memory channel layer and a stubbed bot API (no Redis or bot needed). The '
+            'clients share the event loop with the relay, so latencies are an upper bound')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help='Simulated WebSocket clients')
+        parser.add_argument('--rate', type=float, default=200, help='bot_update events per second')
+        parser.add_argument('--burst', type=int, default=10, help='Events injected back to back per tick')
+        parser.add_argument('--duration', type=float, default=5, help='Seconds of injected load')
+        parser.add_argument('--trade-ratio', type=float, default=0.1,
+                            help='Fraction of events that are trade_executed (the rest are price updates)')
+        parser.add_argument('--symbols', type=int, default=3, help='Distinct symbols in price updates')
+        parser.add_argument('--protocol', choices=['json', 'msgpack'], default='json')
+        parser.add_argument('--capacity', type=int, default=10000,
+                            help='In-memory channel layer capacity per channel')
+
+    def handle(self, *args, **options):
+        layers = {'default': {
+            'BACKEND': f'{__name__}.BenchChannelLayer',
+            'CONFIG': {'capacity': options['capacity']},
+        }}
+        with override_settings(CHANNEL_LAYERS=layers), \
+                mock.patch.object(AsyncBotAPIClient, 'get_status', mock.AsyncMock(return_value=STUB_STATUS)), \
+                mock.patch.object(AsyncBotAPIClient, 'get_stats', mock.AsyncMock(return_value=STUB_STATS)):
+            dashboard_state.clear()
+            relay_metrics.reset()
+            asyncio.run(self.run(options))
+
+    async def run(self, options):
+        app = URLRouter(routing.websocket_urlpatterns)
+        subprotocols = ['dashboard.msgpack'] if options['protocol'] == 'msgpack' else None
+        stats = RelayStats()
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        communicators = []
+        for start in range(0, options['clients'], 500):
+            batch = [
+                WebsocketCommunicator(app, '/ws/dashboard/', subprotocols=subprotocols)
+                for _ in range(min(500, options['clients'] - start))
+            ]
+            results = await asyncio.gather(*(c.connect(timeout=30) for c in batch))
+            communicators += [c for c, (connected, _) in zip(batch, results) if connected]
+        await asyncio.sleep(0.1)
+        per_client = (tracemalloc.get_traced_memory()[0] - before) / max(1, len(communicators))
+        tracemalloc.stop()
+        self.stdout.write(f'Connected {len(communicators)} clients, ~{per_client / 1024:.1f} KiB each')
+
+        readers = [asyncio.ensure_future(read_client(c, stats)) for c in communicators]
+        sent = await self.inject(get_channel_layer(), options)
+
+        # Wait for the relay to drain, at most 30s after the last event
+        deadline = time.perf_counter() + 30
+        expected = sent[TRADE_EXECUTED] * len(communicators)
+        while time.perf_counter() < deadline:
+            seen = sum(stats.received.values())
+            await asyncio.sleep(0.5)
+            if sum(stats.received.values()) == seen and stats.received[TRADE_EXECUTED] >= expected:
+                break
+
+        for reader in readers:
+            reader.cancel()
+        for start in range(0, len(communicators), 500):
+            await asyncio.gather(
+                *(c.disconnect(timeout=30) for c in communicators[start:start + 500]), return_exceptions=True,
+            )
+        self.report(options, stats, sent, len(communicators))
+
+    async def inject(self, layer, options):
+        """Send bot-shaped bot_update events at the requested rate"""
+        rng = random.Random(0)
+        symbols = [f'SYM{i}/USDT' for i in range(options['symbols'])]
+        sent = {PRICE_UPDATE: 0, TRADE_EXECUTED: 0}
+        interval = options['burst'] / options['rate']
+        self.started_at = time.perf_counter()
+        stop_at = self.started_at + options['duration']
+        next_tick = self.started_at
+        while next_tick < stop_at:
+            for _ in range(options['burst']):
+                symbol = rng.choice(symbols)
+                if rng.random() < options['trade_ratio']:
+                    message_type = TRADE_EXECUTED
+                    data = {'symbol': symbol, 'action': 'BUY', 'price': 40000.0, 'amount': 0.01}
+                else:
+                    message_type = PRICE_UPDATE
+                    data = {'symbol': symbol, 'price': 40000 + rng.random(), 'change_24h': 1.2}
+                data['sent_at'] = time.perf_counter()
+                event = {'type': 'bot_update', 'data': {'type': message_type, 'data': data}}
+                await layer.group_send(BROADCAST_GROUP, event)
+                sent[message_type] += 1
+            next_tick += interval
+            await asyncio.sleep(max(0, next_tick - time.perf_counter()))
+        return sent
+
+    def report(self, options, stats, sent, clients):
+        elapsed = (stats.last_received_at or time.perf_counter()) - self.started_at
+        delivered = sum(stats.received.values())
+        self.stdout.write(
+            f'Injected {sum(sent.values())} events ({sent[TRADE_EXECUTED]} trades) over '
+            f'{options["duration"]:.1f}s to {clients} {options["protocol"]} clients'
+        )
+        if len(stats.latencies) >= 2:
+            cuts = statistics.quantiles(stats.latencies, n=100)
+            self.stdout.write(
+                f'Relay latency: p50 {cuts[49] * 1000:.1f}ms  p95 {cuts[94] * 1000:.1f}ms  '
+                f'p99 {cuts[98] * 1000:.1f}ms  max {max(stats.latencies) * 1000:.1f}ms'
+            )
+        self.stdout.write(f'Throughput: {delivered} messages delivered, {delivered / elapsed:,.0f}/s')
+
+        # Trades must never be lost; price updates may be conflated by design
+        dropped = sent[TRADE_EXECUTED] * clients - stats.received[TRADE_EXECUTED]
+        conflated = sent[PRICE_UPDATE] * clients - stats.received[PRICE_UPDATE]
+        metrics = relay_metrics.snapshot()
+        self.stdout.write(
+            f'Dropped trades: {dropped}  conflated price updates: {conflated}  '
+            f'peak queue depth: {metrics["peak_depth"]}  slow disconnects: {metrics["slow_disconnects"]}'
+        )
+        if dropped:
+            self.stderr.write('Trade messages were lost (channel layer capacity or slow-client disconnects)')
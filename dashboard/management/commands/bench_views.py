@@ -0,0 +1,146 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from dashboard import rollups
+from dashboard.management.commands.seed_trades import seed_trades
+
+
+class _Rollback(Exception):
+    pass
+
+
+def bench_cases():
+    """(name, url) of the trade-history requests to time"""
+    month_ago = (timezone.now() - timedelta(days=30)).date().isoformat()
+    return [
+        ('trades_view', '/trades/'),
+        ('api_trades', '/api/trades/?symbol=BTC/USDT&limit=50'),
+        ('api_trades_count', '/api/trades/?symbol=BTC/USDT&result=WIN&limit=50&count=1'),
+        ('order_history', '/order-history/?symbol=BTC/USDT'),
+        ('order_history_month', f'/order-history/?symbol=BTC/USDT&from_date={month_ago}'),
+        ('order_history_wins', '/order-history/?symbol=BTC/USDT&result=WIN'),
+        ('order_history_csv', '/order-history/?symbol=&export=csv'),
+        ('api_analytics', '/api/analytics/?symbol=BTC/USDT'),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Time the trade history views and CSV export at several Trade table sizes, '
+            'recording query counts and peak memory; seeded data is rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Trade table sizes to measure at')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per request')
+        parser.add_argument('--output', default='bench_views.json', help='Where to write the JSON results')
+        parser.add_argument('--compare', default=None, help='Earlier results file to compare against')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+                seeded = 0
+                for size in sorted(options['sizes']):
+                    seeded += seed_trades(size - seeded, start_index=seeded)
+                    rollups.rebuild()
+                    self.stdout.write(f'-- {size:,} seeded trades')
+                    for name, url in bench_cases():
+                        result = self.measure(url, options['repeat'])
+                        result.update(size=size, case=name)
+                        results.append(result)
+                        self.stdout.write(
+                            f'{name:<22} {result["median_ms"]:>10.1f} ms  {result["queries"]:>3} queries  '
+                            f'{result["peak_kib"]:>9,.0f} KiB peak  {result["bytes"]:>12,} bytes'
+                        )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        report = {
+            'commit': git_commit(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f'Wrote {options["output"]}')
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    @staticmethod
+    def measure(url, repeat):
+        """Median/min time over ``repeat`` runs, then one traced run for queries and memory"""
+        client = Client()
+
+        def fetch():
+            cache.clear()
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url} returned {response.status_code}')
+            if response.streaming:
+                return sum(len(chunk) for chunk in response.streaming_content)
+            return len(response.content)
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            size = fetch()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # Order history reads go to the analytics alias, so count them all
+        tracemalloc.start()
+        with ExitStack() as stack:
+            captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+            fetch()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'queries': sum(len(queries) for queries in captured),
+            'peak_kib': peak / 1024,
+            'bytes': size,
+        }
+
+    def compare(self, path, results):
+        with open(path) as f:
+            previous = json.load(f)
+        baseline = {(r['size'], r['case']): r for r in previous['results']}
+        self.stdout.write(f'Compared with {path} (commit {previous.get("commit")}):')
+        for result in results:
+            before = baseline.get((result['size'], result['case']))
+            if before is None:
+                continue
+            ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+            self.stdout.write(
+                f'{result["size"]:>9,} {result["case"]:<22} {ratio:>6.2f}x time  '
+                f'{result["queries"] - before["queries"]:+d} queries'
+            )
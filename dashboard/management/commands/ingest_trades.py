@@ -0,0 +1,40 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from dashboard.ingest import TradeIngestor
+
+
+class Command(BaseCommand):
+    help = ('Store bot trades in the Trade table: backfill from /trades/recent, '
+            'then consume trade_executed broadcasts from the channel layer')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Trades per bulk insert (default TRADE_INGEST_BATCH_SIZE)')
+        parser.add_argument('--flush-interval', type=float, default=None,
+                            help='Seconds before a partial batch is written (default TRADE_INGEST_FLUSH_INTERVAL)')
+        parser.add_argument('--no-backfill', action='store_true',
+                            help='Skip the initial /trades/recent backfill')
+        parser.add_argument('--backfill-only', action='store_true',
+                            help='Backfill and exit without listening for broadcasts')
+
+    def handle(self, *args, **options):
+        ingestor = TradeIngestor(batch_size=options['batch_size'], flush_interval=options['flush_interval'])
+        try:
+            asyncio.run(self.run(ingestor, options))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            f'Received {ingestor.received} trades: {ingestor.inserted} stored, '
+            f'{ingestor.skipped} duplicate or invalid'
+        )
+
+    async def run(self, ingestor, options):
+        if not options['no_backfill']:
+            inserted = await ingestor.backfill()
+            self.stdout.write(f'Backfilled {inserted} trades from /trades/recent')
+        if options['backfill_only']:
+            return
+        self.stdout.write('Listening for trade_executed broadcasts (Ctrl+C to stop)')
+        await ingestor.listen()
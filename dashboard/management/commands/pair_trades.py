@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import pairing
+
+
+class Command(BaseCommand):
+    help = ('Pair SELLs with earlier BUYs of the same symbol (FIFO, partial fills) and fill in '
+            'missing entry/exit prices, durations, net P&L and results. Only trades newer than '
+            'the stored watermark, or stored behind it since the last run, are read, unless --full')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Forget the watermarks and pair all history again')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Trades read and updated per batch')
+
+    def handle(self, *args, **options):
+        engine, updated = pairing.pair_trades(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} trades: {engine.matched} SELLs paired, '
+            f'{engine.unmatched} with no open BUY to close'
+        ))
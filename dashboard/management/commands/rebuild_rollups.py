@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly/daily trade P&L rollups from the Trade table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rollup rows written per bulk insert')
+
+    def handle(self, *args, **options):
+        written = rollups.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} rollup rows'))
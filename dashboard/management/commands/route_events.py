@@ -0,0 +1,19 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from dashboard.events import TopicRouter
+
+
+class Command(BaseCommand):
+    help = ("Re-publish broadcasts sent to the 'dashboard' group into per-topic groups "
+            "for dashboard clients that subscribed to topics")
+
+    def handle(self, *args, **options):
+        router = TopicRouter()
+        self.stdout.write('Routing dashboard broadcasts to topic groups (Ctrl+C to stop)')
+        try:
+            asyncio.run(router.listen())
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Routed {router.routed} events')
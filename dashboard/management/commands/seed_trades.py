@@ -0,0 +1,113 @@
+import math
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard import analytics, rollups
+from dashboard.models import Trade
+
+# Seeded trades are tagged so they can be told apart from real ones
+SEED_PREFIX = 'seed-'
+
+SYMBOL_PRICES = {
+    'BTC/USDT': 40000.0,
+    'ETH/USDT': 2500.0,
+    'SOL/USDT': 100.0,
+    'BNB/USDT': 300.0,
+    'XRP/USDT': 0.6,
+    'ADA/USDT': 0.45,
+}
+
+
+def synthetic_trades(count, symbols=None, days=365, start_index=0, seed=0):
+    """Yield unsaved BUY/SELL round trips spread over the last ``days`` days.
+
+    Prices follow a random walk per symbol; each SELL closes the previous
+    BUY of its symbol with entry/exit prices, fees, net P&L and duration,
+    like the bot's own trades.
+    """
+    rng = random.Random(seed + start_index)
+    symbols = symbols or list(SYMBOL_PRICES)
+    prices = {symbol: SYMBOL_PRICES.get(symbol, 100.0) for symbol in symbols}
+    open_buys = {}
+    end = timezone.now()
+    step = timedelta(days=days) / max(1, count)
+
+    for i in range(start_index, start_index + count):
+        symbol = symbols[rng.randrange(len(symbols))]
+        prices[symbol] *= math.exp(rng.gauss(0, 0.01))
+        price = Decimal(f'{prices[symbol]:.2f}')
+        amount = Decimal(f'{rng.uniform(0.001, 2) * 1000 / max(prices[symbol], 1):.6f}')
+        fee = (price * amount * Decimal('0.001')).quantize(Decimal('0.0001'))
+        trade = Trade(
+            timestamp=end - step * (start_index + count - i),
+            symbol=symbol,
+            price=price,
+            amount=amount,
+            fee_paid=fee,
+            bot_trade_id=f'{SEED_PREFIX}{i}',
+        )
+        buy = open_buys.pop(symbol, None)
+        if buy is None:
+            trade.action = 'BUY'
+            trade.entry_price = price
+            open_buys[symbol] = trade
+        else:
+            pct = (price - buy.price) / buy.price * 100 if buy.price else Decimal('0')
+            trade.action = 'SELL'
+            trade.entry_price = buy.price
+            trade.exit_price = price
+            trade.profit_loss_pct = max(min(pct, Decimal('999.99')), Decimal('-999.99')).quantize(Decimal('0.01'))
+            trade.result = 'WIN' if pct > 0 else 'LOSS'
+            trade.net_pnl = ((price - buy.price) * amount - fee - buy.fee_paid).quantize(Decimal('0.01'))
+            trade.duration_minutes = int((trade.timestamp - buy.timestamp).total_seconds() // 60)
+        yield trade
+
+
+def seed_trades(count, symbols=None, days=365, start_index=0, batch_size=5000):
+    """Bulk-insert ``count`` synthetic trades; returns the number written"""
+    written = 0
+    batch = []
+    for trade in synthetic_trades(count, symbols, days, start_index):
+        batch.append(trade)
+        if len(batch) >= batch_size:
+            Trade.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        Trade.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def clear_seeded_trades():
+    return Trade.objects.filter(bot_trade_id__startswith=SEED_PREFIX).delete()[0]
+
+
+class Command(BaseCommand):
+    help = 'Fill the Trade table with realistic synthetic trades (tagged seed-N) for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Trades to create (e.g. 10000, 100000, 1000000)')
+        parser.add_argument('--symbols', nargs='+', default=None,
+                            help=f'Symbols to spread trades across (default: {", ".join(SYMBOL_PRICES)})')
+        parser.add_argument('--days', type=int, default=365, help='Days of history the trades span')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Trades per bulk insert')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded trades first')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['clear']:
+                self.stdout.write(f'Deleted {clear_seeded_trades()} seeded trades')
+            start_index = Trade.objects.filter(bot_trade_id__startswith=SEED_PREFIX).count()
+            written = seed_trades(
+                options['rows'], options['symbols'], options['days'], start_index, options['batch_size'],
+            )
+            # bulk_create bypasses the analytics and rollup signals
+            analytics.invalidate()
+        rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Seeded {written} trades and rebuilt the rollups'))
@@ -0,0 +1,282 @@
+"""
+Process metrics in the Prometheus text exposition format
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+import threading
+import time
+
+from django.template.backends.django import DjangoTemplates
+
+# Seconds; roughly the range from a cached JSON view to a large CSV export
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels):
+        series = self._values.get(labels)
+        return series[2] if series else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._values.items())
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, labels, [('le', _number(bound))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors that report values owned elsewhere at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def collector(self, collect):
+        """Register ``collect()``, which returns Gauges/Counters built on the spot"""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            for metric in collect():
+                lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'dashboard_http_requests_total', 'HTTP requests by view, method and status', ['view', 'method', 'status'])
+http_latency = registry.histogram(
+    'dashboard_http_request_duration_seconds', 'Time to produce a response, by view', ['view', 'method'])
+request_db_queries = registry.histogram(
+    'dashboard_request_db_queries', 'Database queries per request, by view', ['view'], QUERY_COUNT_BUCKETS)
+request_db_time = registry.histogram(
+    'dashboard_request_db_seconds', 'Time spent in database queries per request, by view', ['view'])
+template_render_time = registry.histogram(
+    'dashboard_template_render_seconds', 'Template render time, by template', ['template'])
+bot_api_latency = registry.histogram(
+    'dashboard_bot_api_request_duration_seconds', 'Bot API round trips, by endpoint', ['method', 'endpoint'])
+bot_api_errors = registry.counter(
+    'dashboard_bot_api_errors_total', 'Failed bot API calls, by endpoint', ['method', 'endpoint'])
+websocket_connections = registry.gauge(
+    'dashboard_websocket_connections', 'Open WebSocket connections, by consumer', ['consumer'])
+websocket_messages = registry.counter(
+    'dashboard_websocket_messages_total', 'Messages written to dashboard WebSockets, by type', ['type'])
+
+
+class QueryStats:
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# The current request's query stats. asgiref copies the context into
+# sync_to_async threads, so queries from async views are counted too.
+current_queries = ContextVar('current_queries', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's stats"""
+    stats = current_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created handler: wrap every new database connection"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class _TimedTemplate:
+    def __init__(self, template, name):
+        self.template = template
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.template, attr)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            template_render_time.observe(time.perf_counter() - started, self.name)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend that records render time per template"""
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name), template_name)
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code), '<string>')
+
+
+RELAY_GAUGES = {
+    'queued': 'Messages waiting in dashboard send queues',
+    'max_depth': 'Deepest dashboard send queue right now',
+    'peak_depth': 'Deepest dashboard send queue since startup',
+}
+RELAY_COUNTERS = {
+    'sent': 'Messages sent by dashboard send queues',
+    'conflated': 'Price updates replaced by a newer one before sending',
+    'slow_disconnects': 'Dashboard clients disconnected for falling behind',
+}
+STATE_COUNTERS = {
+    'snapshot_hits': 'Status/stats requests answered from the state snapshot',
+    'snapshot_misses': 'Status/stats requests that went to the bot API',
+}
+
+
+@registry.collector
+def relay_collector():
+    """Relay queue and state snapshot counters, read at scrape time"""
+    from .relay import relay_metrics
+    from .state import dashboard_state
+
+    snapshot = {**relay_metrics.snapshot(), **dashboard_state.counters()}
+    metrics = []
+    for key, documentation in RELAY_GAUGES.items():
+        gauge = Gauge(f'dashboard_relay_{key}', documentation)
+        gauge.set(snapshot[key])
+        metrics.append(gauge)
+    for key, documentation in RELAY_COUNTERS.items():
+        counter = Counter(f'dashboard_relay_{key}_total', documentation)
+        counter.inc(amount=snapshot[key])
+        metrics.append(counter)
+    for key, documentation in STATE_COUNTERS.items():
+        counter = Counter(f'dashboard_state_{key}_total', documentation)
+        counter.inc(amount=snapshot[key])
+        metrics.append(counter)
+    return metrics
+
+
+@registry.collector
+def bot_api_collector():
+    """Circuit breaker state and response cache counters"""
+    from .api_client import bot_api_breaker, bot_api_cache
+
+    circuit_open = Gauge('dashboard_bot_api_circuit_open', '1 while bot API calls are failing fast')
+    circuit_open.set(int(bot_api_breaker.is_open))
+    opened = Counter('dashboard_bot_api_circuit_opened_total', 'Times the bot API circuit breaker opened')
+    opened.inc(amount=bot_api_breaker.opened_count)
+    cache_lookups = Counter('dashboard_bot_api_cache_lookups_total', 'Bot API cache lookups by outcome', ['outcome'])
+    stats = bot_api_cache.stats()
+    for outcome in ('hits', 'misses', 'coalesced'):
+        cache_lookups.inc(outcome, amount=stats[outcome])
+    return [circuit_open, opened, cache_lookups]
@@ -0,0 +1,122 @@
+"""
+Request instrumentation feeding dashboard.metrics
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+import time
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Record latency, status and database queries/time per view.
+
+    Views are labelled by URL name (``dashboard:api_trades`` style view
+    names), so the series stay bounded; unmatched URLs share one label.
+    Works without a thread hop under both WSGI and ASGI. Streaming
+    responses (the CSV export) are recorded once their body has been
+    sent, with the queries made while producing it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_queries.reset(token)
+        return self._finish_response(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_queries.reset(token)
+        return self._finish_response(request, response, stats, started)
+
+    @staticmethod
+    def _start():
+        stats = metrics.QueryStats()
+        return stats, metrics.current_queries.set(stats), time.perf_counter()
+
+    def _finish_response(self, request, response, stats, started):
+        """Record the request now, or once a streaming response is done"""
+        if not response.streaming:
+            self._finish(request, response, stats, started)
+            return response
+
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if not finished:
+                finished = True
+                self._finish(request, response, stats, started)
+
+        if response.is_async:
+            response.streaming_content = self._astream(aiter(response.streaming_content), stats, finish)
+        else:
+            response.streaming_content = self._stream(iter(response.streaming_content), stats, finish)
+        # Servers close the response after sending it, even if it was
+        # never iterated (or was sent with wsgi.file_wrapper)
+        close = response.close
+
+        def close_and_finish():
+            try:
+                close()
+            finally:
+                finish()
+
+        response.close = close_and_finish
+        return response
+
+    @staticmethod
+    def _stream(chunks, stats, finish):
+        """Yield ``chunks`` with the request's query stats current while each is made"""
+        try:
+            while True:
+                token = metrics.current_queries.set(stats)
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    metrics.current_queries.reset(token)
+                yield chunk
+        finally:
+            finish()
+
+    @staticmethod
+    async def _astream(chunks, stats, finish):
+        try:
+            while True:
+                token = metrics.current_queries.set(stats)
+                try:
+                    chunk = await anext(chunks)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    metrics.current_queries.reset(token)
+                yield chunk
+        finally:
+            finish()
+
+    @staticmethod
+    def _finish(request, response, stats, started):
+        elapsed = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unmatched'
+        metrics.http_requests.inc(view, request.method, str(response.status_code))
+        metrics.http_latency.observe(elapsed, view, request.method)
+        metrics.request_db_queries.observe(stats.count, view)
+        metrics.request_db_time.observe(stats.seconds, view)
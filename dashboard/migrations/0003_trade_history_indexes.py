@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_trade_duration_minutes_trade_entry_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['-timestamp'], name='trade_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', '-timestamp'], name='trade_symbol_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', 'action', '-timestamp'], name='trade_sym_action_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', 'result', '-timestamp'], name='trade_sym_result_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', 'net_pnl'], name='trade_symbol_pnl_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_trade_history_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trade_timestamp_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trade_symbol_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trade_sym_action_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trade',
+            name='trade_sym_result_ts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['-timestamp', '-id'], name='trade_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', '-timestamp', '-id'], name='trade_symbol_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', 'action', '-timestamp', '-id'], name='trade_sym_action_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['symbol', 'result', '-timestamp', '-id'], name='trade_sym_result_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:30
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+
+
+def build_rollups(apps, schema_editor):
+    """Seed the rollups from existing trades so they are complete from the start.
+
+    Frozen copy of rollups.rebuild() as of this migration, so later changes
+    to the live module can't change what it does.
+    """
+    Trade = apps.get_model('dashboard', 'Trade')
+    TradeRollup = apps.get_model('dashboard', 'TradeRollup')
+    using = schema_editor.connection.alias
+    zero = {
+        'trade_count': 0, 'volume': Decimal('0'), 'fees': Decimal('0'), 'net_pnl': Decimal('0'),
+        'wins': 0, 'losses': 0, 'min_pnl': None, 'max_pnl': None, 'duration_sum': 0, 'duration_count': 0,
+    }
+    for granularity, trunc in (('hour', TruncHour), ('day', TruncDay)):
+        rows = (
+            Trade.objects.using(using).order_by()
+            .annotate(bucket=trunc('timestamp'))
+            .values('symbol', 'bucket')
+            .annotate(
+                rollup_trade_count=Count('id'),
+                rollup_volume=Sum('amount'),
+                rollup_fees=Sum('fee_paid'),
+                rollup_net_pnl=Sum('net_pnl'),
+                rollup_wins=Count('id', filter=Q(result='WIN')),
+                rollup_losses=Count('id', filter=Q(result='LOSS')),
+                rollup_min_pnl=Min('net_pnl'),
+                rollup_max_pnl=Max('net_pnl'),
+                rollup_duration_sum=Sum('duration_minutes'),
+                rollup_duration_count=Count('duration_minutes'),
+            )
+            .iterator(chunk_size=1000)
+        )
+        batch = []
+        for row in rows:
+            totals = {field: row[f'rollup_{field}'] for field in zero}
+            batch.append(TradeRollup(
+                symbol=row['symbol'], granularity=granularity, bucket_start=row['bucket'],
+                **{field: default if totals[field] is None else totals[field] for field, default in zero.items()},
+            ))
+            if len(batch) >= 1000:
+                TradeRollup.objects.using(using).bulk_create(batch)
+                batch = []
+        TradeRollup.objects.using(using).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_trade_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('trade_count', models.IntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=6, default=Decimal('0'), max_digits=20)),
+                ('fees', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=16)),
+                ('net_pnl', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=16)),
+                ('wins', models.IntegerField(default=0)),
+                ('losses', models.IntegerField(default=0)),
+                ('min_pnl', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('max_pnl', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('duration_sum', models.BigIntegerField(default=0)),
+                ('duration_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'granularity', 'bucket_start'), name='unique_trade_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
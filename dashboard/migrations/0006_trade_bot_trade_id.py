@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_trade_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='bot_trade_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_trade_bot_trade_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradePairingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20, unique=True)),
+                ('last_timestamp', models.DateTimeField()),
+                ('last_trade_id', models.BigIntegerField()),
+                ('open_lots', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
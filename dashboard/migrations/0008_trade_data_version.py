@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    TradeDataVersion = apps.get_model('dashboard', 'TradeDataVersion')
+    TradeDataVersion.objects.using(schema_editor.connection.alias).get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_trade_pairing_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def create_run_row(apps, schema_editor):
+    """Start from the furthest watermark; trades above it behind a watermark were skipped"""
+    using = schema_editor.connection.alias
+    TradePairingState = apps.get_model('dashboard', 'TradePairingState')
+    TradePairingRun = apps.get_model('dashboard', 'TradePairingRun')
+    max_trade_id = TradePairingState.objects.using(using).aggregate(Max('last_trade_id'))['last_trade_id__max']
+    TradePairingRun.objects.using(using).get_or_create(pk=1, defaults={'max_trade_id': max_trade_id or 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_trade_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradePairingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_trade_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_run_row, migrations.RunPython.noop),
+    ]
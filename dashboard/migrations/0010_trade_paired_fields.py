@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_trade_pairing_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='paired_fields',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
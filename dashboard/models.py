@@ -32,8 +32,25 @@ class Trade(models.Model):
     net_pnl = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True)
     
+    # The bot's own id for the trade, so ingested trades are stored once
+    bot_trade_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Which round-trip fields dashboard.pairing filled in, so it may
+    # overwrite them when it pairs the trade again; the rest came from the bot
+    paired_fields = models.JSONField(default=list, blank=True)
+    
     class Meta:
         ordering = ['-timestamp']  # Most recent first
+        indexes = [
+            # Shaped for the trade history filters: symbol, then optional
+            # action/result, then a timestamp range ordered newest first.
+            # id breaks timestamp ties for keyset pagination.
+            models.Index(fields=['-timestamp', '-id'], name='trade_timestamp_idx'),
+            models.Index(fields=['symbol', '-timestamp', '-id'], name='trade_symbol_ts_idx'),
+            models.Index(fields=['symbol', 'action', '-timestamp', '-id'], name='trade_sym_action_ts_idx'),
+            models.Index(fields=['symbol', 'result', '-timestamp', '-id'], name='trade_sym_result_ts_idx'),
+            # Best/worst trade lookups sort by net P&L within a symbol
+            models.Index(fields=['symbol', 'net_pnl'], name='trade_symbol_pnl_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action} {self.amount} {self.symbol} @ ${self.price}"
@@ -52,8 +69,8 @@ class Trade(models.Model):
         """Calculate trade duration if closed"""
         if not self.is_closed():
             return None
-        # Duration calculation would need paired buy/sell trades
-        # For now, return stored duration_minutes
+        # Filled in from the paired BUYs (see dashboard.pairing) when the bot
+        # doesn't report it
         return self.duration_minutes
     
     def is_closed(self):
@@ -66,6 +83,80 @@ class Trade(models.Model):
         return 'CLOSED' if self.is_closed() else 'OPEN'
 
 
+class TradePairingState(models.Model):
+    """How far FIFO buy/sell pairing has got for one symbol.
+
+    The last paired trade is stored as a (timestamp, id) watermark along
+    with the BUY lots still open after it, so incremental runs of
+    dashboard.pairing only read newer trades.
+    """
+
+    symbol = models.CharField(max_length=20, unique=True)
+    last_timestamp = models.DateTimeField()
+    last_trade_id = models.BigIntegerField()
+    # [amount, price, fee, timestamp] per open lot, oldest first
+    open_lots = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.symbol} paired to {self.last_timestamp:%Y-%m-%d %H:%M}: {len(self.open_lots)} open lots"
+
+
+class TradePairingRun(models.Model):
+    """Single row every pairing run updates first, which serializes the runs.
+
+    select_for_update() is a no-op on SQLite; an UPDATE takes the database
+    write lock there (and a row lock elsewhere) until the run commits.
+    ``max_trade_id`` is the highest Trade id the last run could see, so
+    trades stored since then behind a symbol's watermark are found.
+    """
+
+    max_trade_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Pairing run up to trade {self.max_trade_id}"
+
+
+class TradeRollup(models.Model):
+    """Pre-aggregated trade totals per symbol and hour/day bucket.
+
+    Kept up to date incrementally as trades are written (see
+    dashboard.rollups) and rebuilt in bulk with ``manage.py rebuild_rollups``.
+    """
+
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    symbol = models.CharField(max_length=20)
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    trade_count = models.IntegerField(default=0)
+    volume = models.DecimalField(max_digits=20, decimal_places=6, default=Decimal('0'))
+    fees = models.DecimalField(max_digits=16, decimal_places=4, default=Decimal('0'))
+    net_pnl = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0'))
+    wins = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    min_pnl = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    max_pnl = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # Sum and count of non-null durations, so averages can be combined
+    duration_sum = models.BigIntegerField(default=0)
+    duration_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['symbol', 'granularity', 'bucket_start'],
+                name='unique_trade_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M}: {self.trade_count} trades"
+
+
 class BotSettings(models.Model):
     """Model for storing bot configuration settings"""
     
@@ -92,3 +183,18 @@ class BotSettings(models.Model):
     class Meta:
         verbose_name = "Bot Settings"
         verbose_name_plural = "Bot Settings"
+
+
+class TradeDataVersion(models.Model):
+    """Generation counter for results derived from the Trade table.
+
+    A single row, bumped once per batch of trade writes (see
+    dashboard.analytics.invalidate and invalidate_on_commit). It lives in the database rather
+    than the cache so writes from other processes, such as
+    ``manage.py ingest_trades``, are seen by the web server too.
+    """
+
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Trade data version {self.version}"
@@ -0,0 +1,131 @@
+"""
+Keyset (cursor) pagination for trade listings
+"""
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+import base64
+import hashlib
+import json
+
+# Cursor value that jumps to the oldest page
+LAST_PAGE = 'last'
+
+
+def encode_cursor(direction, timestamp, pk):
+    """Opaque cursor for the row at (timestamp, pk); direction is 'next' or 'prev'"""
+    raw = json.dumps([direction[0], timestamp.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (direction, timestamp, pk), or None for a missing or invalid cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, timestamp, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        timestamp = parse_datetime(timestamp)
+        if direction not in ('n', 'p') or timestamp is None:
+            return None
+        return ('next' if direction == 'n' else 'prev'), timestamp, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def cached_count(queryset, ttl=60):
+    """COUNT(*) for a filtered queryset, cached per filter set for ``ttl`` seconds"""
+    key = 'trade-count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, ttl)
+
+
+class KeysetPage:
+    """One page of rows plus the cursors to reach its neighbours"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginates a queryset newest first on (timestamp, id).
+
+    Each page is a bounded index range scan starting at the cursor row, so
+    page 5,000 costs the same as page 1 and there is no COUNT(*) or OFFSET.
+    The cursors are opaque strings and stay valid as new rows arrive.
+    """
+
+    def __init__(self, queryset, per_page=50):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, cursor=None, total=None):
+        if cursor == LAST_PAGE:
+            return self._oldest_page(total)
+        position = decode_cursor(cursor)
+        if position is None:
+            return self._page_after(None, total)
+        direction, timestamp, pk = position
+        if direction == 'next':
+            return self._page_after((timestamp, pk), total)
+        return self._page_before((timestamp, pk), total)
+
+    def _page_after(self, position, total):
+        """Rows older than ``position`` (or the newest rows)"""
+        qs = self.queryset.order_by('-timestamp', '-id')
+        if position is not None:
+            timestamp, pk = position
+            qs = qs.filter(Q(timestamp__lte=timestamp) & (Q(timestamp__lt=timestamp) | Q(id__lt=pk)))
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self._make_page(rows, has_older=has_more, has_newer=position is not None, total=total)
+
+    def _page_before(self, position, total):
+        """Rows newer than ``position``, still returned newest first"""
+        timestamp, pk = position
+        qs = self.queryset.order_by('timestamp', 'id').filter(
+            Q(timestamp__gte=timestamp) & (Q(timestamp__gt=timestamp) | Q(id__gt=pk))
+        )
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._make_page(rows, has_older=True, has_newer=has_more, total=total)
+
+    def _oldest_page(self, total):
+        rows = list(self.queryset.order_by('timestamp', 'id')[:self.per_page + 1])
+        has_newer = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._make_page(rows, has_older=False, has_newer=has_newer, total=total)
+
+    def _make_page(self, rows, has_older, has_newer, total):
+        next_cursor = previous_cursor = None
+        if rows and has_older:
+            next_cursor = encode_cursor('next', self._value(rows[-1], 'timestamp'), self._value(rows[-1], 'id'))
+        if rows and has_newer:
+            previous_cursor = encode_cursor('prev', self._value(rows[0], 'timestamp'), self._value(rows[0], 'id'))
+        return KeysetPage(rows, next_cursor, previous_cursor, total)
+
+    @staticmethod
+    def _value(row, field):
+        # Rows may be model instances or values() dicts
+        return row[field] if isinstance(row, dict) else getattr(row, field)
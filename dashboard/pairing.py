@@ -0,0 +1,253 @@
+"""
+FIFO pairing of BUY and SELL trades into round trips
+"""
+from collections import deque
+from decimal import Decimal
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Max, Q
+from django.utils.dateparse import parse_datetime
+
+from . import analytics, rollups
+
+# Round-trip fields pairing fills in; values the bot reported are kept, and
+# Trade.paired_fields lists the ones pairing owns
+PAIRED_FIELDS = ['entry_price', 'exit_price', 'duration_minutes', 'net_pnl', 'profit_loss_pct', 'result']
+
+CENT = Decimal('0.01')
+# Limit of the profit_loss_pct column (max_digits=5, decimal_places=2)
+PCT_LIMIT = Decimal('999.99')
+
+
+def pairing_enabled():
+    return getattr(settings, 'TRADE_PAIRING_ENABLED', True)
+
+
+class Lot:
+    """The unsold part of one BUY, with its share of the buy fee"""
+
+    __slots__ = ('amount', 'price', 'fee', 'timestamp')
+
+    def __init__(self, amount, price, fee, timestamp):
+        self.amount = amount
+        self.price = price
+        self.fee = fee
+        self.timestamp = timestamp
+
+    def to_json(self):
+        return [str(self.amount), str(self.price), str(self.fee), self.timestamp.isoformat()]
+
+    @classmethod
+    def from_json(cls, data):
+        amount, price, fee, timestamp = data
+        return cls(Decimal(amount), Decimal(price), Decimal(fee), parse_datetime(timestamp))
+
+
+class PairingEngine:
+    """Matches SELLs to earlier BUYs of the same symbol, first in first out.
+
+    Feed it trades in (timestamp, id) order. A SELL closes the oldest open
+    lots first and may close several, or part of one; a BUY's unsold
+    remainder stays open for later SELLs. Each trade is visited once.
+    """
+
+    def __init__(self, lots=None):
+        # symbol -> deque of open lots, oldest first
+        self.lots = {symbol: deque(symbol_lots) for symbol, symbol_lots in (lots or {}).items()}
+        # symbol -> (timestamp, id) of the last trade fed
+        self.watermarks = {}
+        self.matched = 0
+        self.unmatched = 0
+
+    def feed(self, trade):
+        """Process one trade (a dict of Trade fields, with id); returns the fields to write"""
+        symbol = trade['symbol']
+        self.watermarks[symbol] = (trade['timestamp'], trade['id'])
+        lots = self.lots.setdefault(symbol, deque())
+        amount = trade['amount'] or Decimal('0')
+
+        if trade['action'] == 'BUY':
+            if amount > 0:
+                lots.append(Lot(amount, trade['price'], trade['fee_paid'] or Decimal('0'), trade['timestamp']))
+            return _assign(trade, {'entry_price': trade['price']})
+
+        remaining = amount
+        matched = cost = buy_fees = Decimal('0')
+        held_seconds = 0.0
+        while remaining > 0 and lots:
+            lot = lots[0]
+            take = min(remaining, lot.amount)
+            fee = lot.fee * take / lot.amount
+            matched += take
+            cost += take * lot.price
+            buy_fees += fee
+            held_seconds += float(take) * (trade['timestamp'] - lot.timestamp).total_seconds()
+            remaining -= take
+            lot.amount -= take
+            lot.fee -= fee
+            if lot.amount <= 0:
+                lots.popleft()
+        if not matched:
+            self.unmatched += 1
+            return _assign(trade, {})
+        self.matched += 1
+
+        price = trade['price']
+        entry = cost / matched
+        # Only the matched part of the sell fee belongs to this round trip
+        sell_fee = (trade['fee_paid'] or Decimal('0')) * matched / amount
+        net_pnl = ((price - entry) * matched - buy_fees - sell_fee).quantize(CENT)
+        pct = (price - entry) / entry * 100 if entry else Decimal('0')
+        values = {
+            'entry_price': entry.quantize(CENT),
+            'exit_price': price,
+            'duration_minutes': int(held_seconds / float(matched) // 60),
+            'net_pnl': net_pnl,
+            'profit_loss_pct': max(min(pct, PCT_LIMIT), -PCT_LIMIT).quantize(CENT),
+        }
+        reported = trade['net_pnl'] is not None and 'net_pnl' not in trade['paired_fields']
+        final_pnl = trade['net_pnl'] if reported else net_pnl
+        values['result'] = 'WIN' if final_pnl > 0 else 'LOSS'
+        return _assign(trade, values)
+
+
+def _assign(trade, values):
+    """The fields of ``trade`` that change when given pairing's ``values``.
+
+    Fields pairing filled before are overwritten, or cleared when it no
+    longer has a value for them; fields the bot reported are left alone.
+    The new ``paired_fields`` is included whenever something changes.
+    """
+    owned = trade['paired_fields'] or []
+    writable = {field: values.get(field) for field in PAIRED_FIELDS if field in owned or trade[field] is None}
+    changes = {field: value for field, value in writable.items() if trade[field] != value}
+    paired = [field for field, value in writable.items() if value is not None]
+    if changes or paired != owned:
+        changes['paired_fields'] = paired
+    return changes
+
+
+def _after(timestamp, pk):
+    return Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+
+
+def _fill_fields(rows):
+    """Write PAIRED_FIELDS and paired_fields for many (pk, values) with one prepared UPDATE.
+
+    bulk_update() builds a CASE expression per field over the whole batch,
+    which costs milliseconds per row at this size.
+    """
+    from .models import Trade
+
+    connection = connections[router.db_for_write(Trade)]
+    quote = connection.ops.quote_name
+    fields = [Trade._meta.get_field(name) for name in PAIRED_FIELDS + ['paired_fields']]
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    sql = f'UPDATE {quote(Trade._meta.db_table)} SET {assignments} WHERE {quote(Trade._meta.pk.column)} = %s'
+    params = [
+        [field.get_db_prep_save(values[field.name], connection) for field in fields] + [pk]
+        for pk, values in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _start_run():
+    """Update the run row first, so concurrent runs wait for this one; returns it"""
+    from .models import TradePairingRun
+
+    runs = TradePairingRun.objects
+    if not runs.filter(pk=1).update(max_trade_id=F('max_trade_id')):
+        runs.bulk_create([TradePairingRun(pk=1)], ignore_conflicts=True)
+        runs.filter(pk=1).update(max_trade_id=F('max_trade_id'))
+    return runs.get(pk=1)
+
+
+def pair_trades(full=False, batch_size=1000):
+    """Fill the round-trip fields of trades newer than each symbol's watermark.
+
+    Trades stored since the last run with a timestamp behind their symbol's
+    watermark (an ingest backfill, say) are found by id; those symbols are
+    paired again from their first trade. Values pairing filled before are
+    replaced by the new pairing and only trades whose values change are
+    written; values the bot reported are never touched. With ``full`` the
+    stored state is dropped and all history is paired again. Trades are read and updated in keyset
+    batches of ``batch_size``. Returns the engine, for its
+    matched/unmatched counts, and the number of trades updated.
+    """
+    from .models import Trade, TradePairingState
+
+    with transaction.atomic():
+        run = _start_run()
+        # Trades stored after this point are left to the next run
+        max_trade_id = Trade.objects.aggregate(Max('id'))['id__max'] or 0
+        if full:
+            TradePairingState.objects.all().delete()
+            states = {}
+        else:
+            states = {state.symbol: state for state in TradePairingState.objects.all()}
+        if states:
+            behind = Q()
+            for state in states.values():
+                behind |= Q(symbol=state.symbol) & ~_after(state.last_timestamp, state.last_trade_id)
+            late = Trade.objects.filter(behind, id__gt=run.max_trade_id, id__lte=max_trade_id)
+            for symbol in set(late.values_list('symbol', flat=True)):
+                del states[symbol]
+        engine = PairingEngine({
+            symbol: [Lot.from_json(lot) for lot in state.open_lots] for symbol, state in states.items()
+        })
+
+        trades = Trade.objects.filter(id__lte=max_trade_id)
+        if states:
+            newer = ~Q(symbol__in=list(states))
+            for state in states.values():
+                newer |= Q(symbol=state.symbol) & _after(state.last_timestamp, state.last_trade_id)
+            trades = trades.filter(newer)
+        trades = trades.order_by('timestamp', 'id').values(
+            'id', 'timestamp', 'symbol', 'action', 'price', 'amount', 'fee_paid', 'paired_fields', *PAIRED_FIELDS,
+        )
+
+        updated = 0
+        touched = set()
+        batch = list(trades[:batch_size])
+        while batch:
+            changed = []
+            for row in batch:
+                fields = engine.feed(row)
+                if fields:
+                    changed.append((
+                        row['id'],
+                        {field: fields.get(field, row[field]) for field in PAIRED_FIELDS + ['paired_fields']},
+                    ))
+                    if set(fields) - {'entry_price', 'paired_fields'}:
+                        touched.add((row['symbol'], rollups.bucket_start(row['timestamp'], 'hour')))
+            if changed:
+                _fill_fields(changed)
+            updated += len(changed)
+            last = batch[-1]
+            batch = list(trades.filter(_after(last['timestamp'], last['id']))[:batch_size])
+
+        TradePairingState.objects.bulk_create(
+            [
+                TradePairingState(
+                    symbol=symbol, last_timestamp=timestamp, last_trade_id=pk,
+                    open_lots=[lot.to_json() for lot in engine.lots[symbol]],
+                )
+                for symbol, (timestamp, pk) in engine.watermarks.items()
+            ],
+            update_conflicts=True, unique_fields=['symbol'],
+            update_fields=['last_timestamp', 'last_trade_id', 'open_lots', 'updated_at'],
+        )
+
+        run.max_trade_id = max_trade_id
+        run.save(update_fields=['max_trade_id', 'updated_at'])
+
+        # Raw updates skip the model signals the rollups and analytics rely on
+        if full and updated:
+            rollups.rebuild()
+        else:
+            for symbol, hour in touched:
+                rollups.recompute_buckets(symbol, hour)
+        if updated:
+            analytics.invalidate()
+    return engine, updated
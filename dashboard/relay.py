@@ -0,0 +1,217 @@
+"""
+Per-connection send queues for the dashboard WebSocket relay
+"""
+from collections import deque
+from django.conf import settings
+import asyncio
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class RelayMetrics:
+    """Process-wide counters for the dashboard relay's send queues.
+
+    Updated from the event loop only, so the counters need no locking.
+    """
+
+    def __init__(self):
+        self._outboxes = weakref.WeakSet()
+        self.sent = 0
+        self.conflated = 0
+        self.peak_depth = 0
+        self.slow_disconnects = 0
+
+    def register(self, outbox):
+        self._outboxes.add(outbox)
+
+    def record_depth(self, depth):
+        if depth > self.peak_depth:
+            self.peak_depth = depth
+
+    def snapshot(self):
+        outboxes = list(self._outboxes)
+        depths = [outbox.depth for outbox in outboxes if not outbox.closed]
+        return {
+            'clients': len(depths),
+            'queued': sum(depths),
+            'max_depth': max(depths, default=0),
+            'peak_depth': self.peak_depth,
+            'sent': self.sent,
+            'conflated': self.conflated,
+            'slow_disconnects': self.slow_disconnects,
+        }
+
+    def reset(self):
+        self.sent = self.conflated = self.peak_depth = self.slow_disconnects = 0
+
+
+relay_metrics = RelayMetrics()
+
+
+def transport_backlog(send):
+    """A callable giving the bytes the server holds unsent for a connection, or None.
+
+    websocket.send returns once the server has a message, not once it is
+    on the socket, so under daphne a slow browser backs up in the Twisted
+    transport's write buffer instead of the outbox. Daphne passes each
+    application ``partial(handle_reply, protocol)`` as its ``send``; other
+    servers give None.
+    """
+    protocol = next(iter(getattr(send, 'args', ())), None)
+    transport = getattr(protocol, 'transport', None)
+    # TLS and other protocol wrappers sit in front of the TCP transport
+    while transport is not None and not hasattr(transport, 'dataBuffer'):
+        transport = getattr(transport, 'transport', None)
+    if transport is None:
+        return None
+
+    def backlog():
+        return len(transport.dataBuffer) - transport.offset + getattr(transport, '_tempDataLen', 0)
+    return backlog
+
+
+class ClientOutbox:
+    """Send queue for one WebSocket, drained by its own task.
+
+    Channel layer handlers only enqueue, so a slow browser never holds up
+    the consumer's receive loop (and the channel layer doesn't overflow).
+    Ordinary messages are queued in order and never dropped. Conflatable
+    messages (price updates) keep only the latest per key and go out at most
+    once per ``price_interval``. A client whose queue stays above
+    ``max_queue`` for ``slow_timeout`` seconds is handed to ``on_slow``.
+
+    With ``backlog`` (see transport_backlog()), nothing is sent while the
+    server holds more than ``max_buffer`` unsent bytes, so a slow browser
+    fills this queue, where prices conflate and the limit applies. The
+    queue is also checked on a timer, as a stalled client may get neither
+    new messages nor deliveries.
+    """
+
+    # Seconds between checks of a full transport buffer
+    drain_poll = 0.05
+
+    def __init__(self, send, on_slow=None, price_interval=None, max_queue=None, slow_timeout=None,
+                 backlog=None, max_buffer=None, metrics=relay_metrics):
+        self._send = send
+        self._on_slow = on_slow
+        self._backlog = backlog
+        self.max_buffer = max_buffer or getattr(settings, 'DASHBOARD_SEND_BUFFER_LIMIT', 256 * 1024)
+        self.price_interval = price_interval if price_interval is not None else getattr(
+            settings, 'DASHBOARD_PRICE_INTERVAL', 0.25)
+        self.max_queue = max_queue or getattr(settings, 'DASHBOARD_SEND_QUEUE_LIMIT', 1000)
+        self.slow_timeout = slow_timeout if slow_timeout is not None else getattr(
+            settings, 'DASHBOARD_SLOW_CLIENT_TIMEOUT', 10)
+        self.metrics = metrics
+        self._queue = deque()
+        self._latest = {}
+        self._wakeup = asyncio.Event()
+        self._next_conflated_at = 0.0
+        self._over_limit_since = None
+        self._task = None
+        self._watchdog = None
+        self.closed = False
+        metrics.register(self)
+
+    @property
+    def depth(self):
+        return len(self._queue) + len(self._latest)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+        self._watchdog = asyncio.ensure_future(self._watch())
+
+    async def stop(self):
+        self.closed = True
+        for task in (self._task, self._watchdog):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._watchdog = None
+
+    def put(self, message):
+        """Queue a message that must be delivered"""
+        if self.closed:
+            return
+        self._queue.append(message)
+        self._wakeup.set()
+        self._check_depth()
+
+    def put_latest(self, key, message):
+        """Queue a message that replaces any undelivered one with the same key"""
+        if self.closed:
+            return
+        if key in self._latest:
+            self.metrics.conflated += 1
+        elif not self._latest:
+            self._wakeup.set()
+        self._latest[key] = message
+        self._check_depth()
+
+    def _check_depth(self):
+        depth = self.depth
+        self.metrics.record_depth(depth)
+        if depth <= self.max_queue:
+            self._over_limit_since = None
+            return
+        now = asyncio.get_running_loop().time()
+        if self._over_limit_since is None:
+            self._over_limit_since = now
+        elif now - self._over_limit_since >= self.slow_timeout and not self.closed:
+            self.closed = True
+            self.metrics.slow_disconnects += 1
+            logger.warning(f"Disconnecting slow dashboard client ({depth} messages queued)")
+            if self._on_slow is not None:
+                asyncio.ensure_future(self._on_slow())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._queue:
+                await self._deliver(self._queue.popleft())
+                self._check_depth()
+                continue
+            if not self._latest:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._next_conflated_at - loop.time()
+            if delay > 0:
+                # Only queued (non-conflatable) messages cut this wait short
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            latest, self._latest = self._latest, {}
+            for message in latest.values():
+                await self._deliver(message)
+            self._next_conflated_at = loop.time() + self.price_interval
+            self._check_depth()
+
+    async def _watch(self):
+        interval = max(self.slow_timeout / 4, self.drain_poll)
+        while not self.closed:
+            await asyncio.sleep(interval)
+            self._check_depth()
+
+    async def _drained(self):
+        """Wait while the server holds more than max_buffer unsent bytes"""
+        while self._backlog is not None and not self.closed and self._backlog() > self.max_buffer:
+            await asyncio.sleep(self.drain_poll)
+
+    async def _deliver(self, message):
+        await self._drained()
+        if self.closed:
+            return
+        try:
+            await self._send(message)
+        except Exception as e:
+            logger.error(f"Error sending to dashboard client: {e}")
+        self.metrics.sent += 1
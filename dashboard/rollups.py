@@ -0,0 +1,278 @@
+"""
+Hourly/daily P&L rollups over the Trade table
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+GRANULARITIES = ('hour', 'day')
+
+_TRUNC = {'hour': TruncHour, 'day': TruncDay}
+
+
+def rollups_enabled():
+    return getattr(settings, 'TRADE_ROLLUPS_ENABLED', True)
+
+
+def bucket_start(timestamp, granularity):
+    """Start of the hour/day bucket holding ``timestamp`` (current time zone)"""
+    local = timezone.localtime(timestamp)
+    naive = local.replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        naive = naive.replace(hour=0)
+    return timezone.make_aware(naive)
+
+
+def _bucket_end(start, granularity):
+    if granularity == 'hour':
+        return start + timedelta(hours=1)
+    local = timezone.localtime(start).replace(tzinfo=None) + timedelta(days=1)
+    return timezone.make_aware(local)
+
+
+def _empty_totals():
+    return {
+        'trade_count': 0, 'volume': Decimal('0'), 'fees': Decimal('0'), 'net_pnl': Decimal('0'),
+        'wins': 0, 'losses': 0, 'min_pnl': None, 'max_pnl': None,
+        'duration_sum': 0, 'duration_count': 0,
+    }
+
+
+def _merge(totals, other):
+    for field in ('trade_count', 'volume', 'fees', 'net_pnl', 'wins', 'losses',
+                  'duration_sum', 'duration_count'):
+        totals[field] += other[field]
+    if other['min_pnl'] is not None:
+        totals['min_pnl'] = other['min_pnl'] if totals['min_pnl'] is None else min(totals['min_pnl'], other['min_pnl'])
+    if other['max_pnl'] is not None:
+        totals['max_pnl'] = other['max_pnl'] if totals['max_pnl'] is None else max(totals['max_pnl'], other['max_pnl'])
+
+
+def _trade_totals(trade):
+    totals = _empty_totals()
+    totals.update(
+        trade_count=1,
+        volume=trade.amount or Decimal('0'),
+        fees=trade.fee_paid or Decimal('0'),
+        net_pnl=trade.net_pnl or Decimal('0'),
+        wins=1 if trade.result == 'WIN' else 0,
+        losses=1 if trade.result == 'LOSS' else 0,
+        min_pnl=trade.net_pnl,
+        max_pnl=trade.net_pnl,
+        duration_sum=trade.duration_minutes or 0,
+        duration_count=0 if trade.duration_minutes is None else 1,
+    )
+    return totals
+
+
+def _rollup_model():
+    from .models import TradeRollup
+    return TradeRollup
+
+
+def apply_trades(trades):
+    """Add newly created trades to their hour and day buckets.
+
+    Deltas are merged per bucket in Python, then added to the stored rows
+    by the database in one INSERT ... ON CONFLICT, whatever the batch size.
+    Use this for bulk_create'd trades, which skip the model signals.
+    """
+    if not rollups_enabled():
+        return
+
+    deltas = defaultdict(_empty_totals)
+    # Every UTC offset is a multiple of 15 minutes, so trades in the same
+    # quarter hour share buckets; saves a time zone conversion per trade
+    buckets = {}
+    for trade in trades:
+        quarter = int(trade.timestamp.timestamp() // 900)
+        starts = buckets.get(quarter)
+        if starts is None:
+            starts = buckets[quarter] = [(g, bucket_start(trade.timestamp, g)) for g in GRANULARITIES]
+        totals = _trade_totals(trade)
+        for granularity, start in starts:
+            _merge(deltas[(trade.symbol, granularity, start)], totals)
+    if deltas:
+        _upsert(deltas)
+
+
+def _upsert(deltas):
+    """Add ``deltas``, keyed by (symbol, granularity, bucket_start), to the rollups.
+
+    Each row is inserted or, when its bucket exists, added to it in the
+    same statement, so writers creating the same bucket at once neither
+    collide on the unique constraint nor lose an update. A read then
+    write would need row locks, and select_for_update() is a no-op on
+    SQLite.
+    """
+    TradeRollup = _rollup_model()
+    connection = connections[router.db_for_write(TradeRollup)]
+    quote = connection.ops.quote_name
+    table = quote(TradeRollup._meta.db_table)
+    keys = ['symbol', 'granularity', 'bucket_start']
+    fields = [TradeRollup._meta.get_field(name) for name in keys + list(_empty_totals())]
+
+    if connection.features.supports_update_conflicts_with_target:
+        conflict = f'ON CONFLICT ({", ".join(quote(name) for name in keys)}) DO UPDATE SET'
+        old, new = f'{table}.{{0}}', 'EXCLUDED.{0}'
+    else:  # MySQL
+        conflict = 'ON DUPLICATE KEY UPDATE'
+        old, new = '{0}', 'VALUES({0})'
+    assignments = []
+    for field in fields[len(keys):]:
+        column = quote(field.column)
+        stored, added = old.format(column), new.format(column)
+        if field.name in ('min_pnl', 'max_pnl'):
+            # NULL (no closed trade yet) on either side keeps the other
+            compare = '<' if field.name == 'min_pnl' else '>'
+            assignments.append(
+                f'{column} = CASE WHEN {stored} IS NULL OR {added} {compare} {stored} THEN {added} ELSE {stored} END'
+            )
+        else:
+            assignments.append(f'{column} = {stored} + {added}')
+
+    sql = (
+        f'INSERT INTO {table} ({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))}) {conflict} {", ".join(assignments)}'
+    )
+    params = [
+        [field.get_db_prep_save(value, connection) for field, value in zip(fields, (*key, *delta.values()))]
+        for key, delta in deltas.items()
+    ]
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _aggregate_fields():
+    # Aliased so they don't clash with the Trade fields they aggregate
+    return {
+        'rollup_trade_count': Count('id'),
+        'rollup_volume': Sum('amount'),
+        'rollup_fees': Sum('fee_paid'),
+        'rollup_net_pnl': Sum('net_pnl'),
+        'rollup_wins': Count('id', filter=Q(result='WIN')),
+        'rollup_losses': Count('id', filter=Q(result='LOSS')),
+        'rollup_min_pnl': Min('net_pnl'),
+        'rollup_max_pnl': Max('net_pnl'),
+        'rollup_duration_sum': Sum('duration_minutes'),
+        'rollup_duration_count': Count('duration_minutes'),
+    }
+
+
+def _clean(row):
+    """Rollup field values from an aggregate row, with NULL sums as zero"""
+    totals = _empty_totals()
+    for field in totals:
+        value = row.get(f'rollup_{field}')
+        if value is not None:
+            totals[field] = value
+    return totals
+
+
+def recompute_buckets(symbol, timestamp):
+    """Recompute the hour and day buckets holding one trade from raw rows.
+
+    Used when a trade is edited or deleted, where the old values needed for
+    a delta are not known.
+    """
+    if not rollups_enabled():
+        return
+    from .models import Trade
+    TradeRollup = _rollup_model()
+
+    with transaction.atomic():
+        for granularity in GRANULARITIES:
+            start = bucket_start(timestamp, granularity)
+            row = Trade.objects.filter(
+                symbol=symbol, timestamp__gte=start, timestamp__lt=_bucket_end(start, granularity),
+            ).aggregate(**_aggregate_fields())
+            if not row['rollup_trade_count']:
+                TradeRollup.objects.filter(symbol=symbol, granularity=granularity, bucket_start=start).delete()
+                continue
+            TradeRollup.objects.update_or_create(
+                symbol=symbol, granularity=granularity, bucket_start=start, defaults=_clean(row),
+            )
+
+
+def rebuild(trade_model=None, rollup_model=None, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """Rebuild every rollup from the Trade table with GROUP BY queries.
+
+    The model classes default to the live ones and the database to the
+    default alias. Returns the number of rollup rows written.
+    """
+    if trade_model is None:
+        from .models import Trade as trade_model
+    rollup_model = rollup_model or _rollup_model()
+
+    written = 0
+    with transaction.atomic(using=using):
+        rollup_model.objects.using(using).all().delete()
+        for granularity in GRANULARITIES:
+            rows = (
+                trade_model.objects.using(using).order_by()
+                .annotate(bucket=_TRUNC[granularity]('timestamp'))
+                .values('symbol', 'bucket')
+                .annotate(**_aggregate_fields())
+                .iterator(chunk_size=batch_size)
+            )
+            batch = []
+            for row in rows:
+                batch.append(rollup_model(
+                    symbol=row['symbol'], granularity=granularity, bucket_start=row['bucket'], **_clean(row),
+                ))
+                if len(batch) >= batch_size:
+                    rollup_model.objects.using(using).bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                rollup_model.objects.using(using).bulk_create(batch)
+                written += len(batch)
+    return written
+
+
+def _granularity_for(start, end):
+    """Coarsest granularity whose bucket boundaries both ends fall on"""
+    for granularity in ('day', 'hour'):
+        if all(edge is None or bucket_start(edge, granularity) == edge for edge in (start, end)):
+            return granularity
+    return None
+
+
+def summary_totals(symbol, start=None, end=None):
+    """Totals for ``symbol`` over [start, end) answered from the rollups.
+
+    Returns a dict shaped like the order history aggregate (total_trades,
+    total_volume, total_fees, net_pnl, avg_duration), or None when the range
+    doesn't line up with bucket boundaries and raw rows must be scanned.
+    """
+    if not rollups_enabled() or not symbol:
+        return None
+    granularity = _granularity_for(start, end)
+    if granularity is None:
+        return None
+
+    rollups = _rollup_model().objects.filter(symbol=symbol, granularity=granularity)
+    if start is not None:
+        rollups = rollups.filter(bucket_start__gte=start)
+    if end is not None:
+        rollups = rollups.filter(bucket_start__lt=end)
+    agg = rollups.aggregate(
+        total_trades=Sum('trade_count'),
+        total_volume=Sum('volume'),
+        total_fees=Sum('fees'),
+        net_pnl=Sum('net_pnl'),
+        duration_sum=Sum('duration_sum'),
+        duration_count=Sum('duration_count'),
+    )
+    return {
+        'total_trades': agg['total_trades'] or 0,
+        'total_volume': agg['total_volume'],
+        'total_fees': agg['total_fees'],
+        'net_pnl': agg['net_pnl'],
+        'avg_duration': agg['duration_sum'] / agg['duration_count'] if agg['duration_count'] else None,
+    }
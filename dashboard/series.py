@@ -0,0 +1,215 @@
+"""
+Downsampled net P&L time series, with precomputed min/max levels for zooming
+"""
+from collections import OrderedDict
+from decimal import Decimal
+import threading
+
+from django.db.models import Count, Q, Sum
+import numpy as np
+
+from .analytics import cache_version, load_columns
+
+# 'equity' is cumulative net P&L, 'pnl' the net P&L of each closed trade
+SERIES_KINDS = ('equity', 'pnl')
+
+# Each level keeps the lowest and highest of every LEVEL_BUCKET points of
+# the level below, so it is about 4x shorter
+LEVEL_BUCKET = 8
+# No coarser level is built once one is this short
+MIN_LEVEL_POINTS = 1024
+# A level can serve a range once it has at most this many times the
+# requested points in it
+OVERSAMPLE = 4
+
+
+def lttb(x, y, threshold):
+    """Indexes of ``threshold`` points chosen by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points; from each bucket in between, keeps the
+    point forming the largest triangle with the previous pick and the mean
+    of the next bucket. Loops over buckets, not points.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        next_x = x[hi:edges[bucket + 2]].mean()
+        next_y = y[hi:edges[bucket + 2]].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (next_y - y[previous])
+        )
+        previous = lo + int(np.argmax(area))
+        picked[bucket + 1] = previous
+    return picked
+
+
+def minmax_reduce(x, y, bucket):
+    """The lowest and highest point of every ``bucket`` points, plus both ends, in order"""
+    n = len(y)
+    full = n // bucket * bucket
+    starts = np.arange(0, full, bucket)
+    body = y[:full].reshape(-1, bucket)
+    keep = [starts + body.argmin(axis=1), starts + body.argmax(axis=1), [0, n - 1]]
+    if full < n:
+        keep += [[full + int(np.argmin(y[full:])), full + int(np.argmax(y[full:]))]]
+    keep = np.unique(np.concatenate(keep))
+    return x[keep], y[keep]
+
+
+class SeriesLevels:
+    """One P&L series at full resolution plus coarser min/max levels.
+
+    Level 0 holds a point per closed trade. A range query picks the finest
+    level with at most OVERSAMPLE times the requested points in range, so
+    peaks and troughs are kept at any zoom, and finishes with LTTB. The
+    work and the payload follow the points asked for, not the trade count.
+    """
+
+    def __init__(self, time, value):
+        self.levels = [(time, value)]
+        while len(self.levels[-1][0]) > MIN_LEVEL_POINTS:
+            reduced = minmax_reduce(*self.levels[-1], LEVEL_BUCKET)
+            if len(reduced[0]) >= len(self.levels[-1][0]):
+                break
+            self.levels.append(reduced)
+
+    def __len__(self):
+        return len(self.levels[0][0])
+
+    @staticmethod
+    def _slice(times, start, end):
+        lo = 0 if start is None else int(np.searchsorted(times, start, 'left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, 'right'))
+        return lo, max(lo, hi)
+
+    def query(self, start=None, end=None, points=1000):
+        """At most ``points`` points between ``start`` and ``end`` (epoch seconds).
+
+        ``total`` is the number of trades in the range; times are returned
+        in epoch milliseconds.
+        """
+        lo, hi = self._slice(self.levels[0][0], start, end)
+        total = hi - lo
+        for level, (times, values) in enumerate(self.levels):
+            if level:
+                lo, hi = self._slice(times, start, end)
+            if hi - lo <= points * OVERSAMPLE:
+                break
+        times, values = times[lo:hi], values[lo:hi]
+        keep = lttb(times, values, points)
+        return {
+            'level': level,
+            'total': total,
+            'time': (times[keep] * 1000).round().astype(np.int64).tolist(),
+            'value': values[keep].round(2).tolist(),
+        }
+
+
+class _SymbolSeries:
+    """The closed trades of one symbol loaded so far, and the levels built from them"""
+
+    __slots__ = ('version', 'last', 'count', 'total', 'time', 'pnl', 'levels')
+
+    def __init__(self, version, last, count, total, time, pnl):
+        self.version = version
+        # (timestamp, id) of the last closed trade loaded
+        self.last = last
+        # Count and sum of net P&L up to ``last``, to tell appends from edits
+        self.count = count
+        self.total = total
+        self.time = time
+        self.pnl = pnl
+        self.levels = {}
+
+    def get_levels(self, kind):
+        levels = self.levels.get(kind)
+        if levels is None:
+            values = np.cumsum(self.pnl) if kind == 'equity' else self.pnl
+            levels = self.levels[kind] = SeriesLevels(self.time, values)
+        return levels
+
+
+def _after(last):
+    timestamp, pk = last
+    return Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+
+
+class SeriesStore:
+    """Process-local closed-trade columns and SeriesLevels per symbol.
+
+    While the trade generation stored in the database (see
+    analytics.invalidate) is unchanged a symbol is served from memory.
+    Once it moves, only trades after the last (timestamp, id) loaded are
+    read and appended; the symbol is reloaded in full when the count or
+    net P&L total of the trades up to that point changed, i.e. trades
+    behind it were stored, edited or deleted. The least recently used of
+    more than ``max_series`` symbols are dropped.
+    """
+
+    def __init__(self, max_series=8):
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol, kind):
+        key = symbol or ''
+        version = cache_version()
+        with self._lock:
+            series = self._series.get(key)
+            if series is not None:
+                self._series.move_to_end(key)
+        if series is None or series.version != version:
+            series = self._load(symbol, version, series)
+            with self._lock:
+                self._series[key] = series
+                self._series.move_to_end(key)
+                while len(self._series) > self.max_series:
+                    self._series.popitem(last=False)
+        return series.get_levels(kind)
+
+    @staticmethod
+    def _load(symbol, version, previous):
+        from .models import Trade
+
+        trades = Trade.objects.filter(net_pnl__isnull=False)
+        if symbol:
+            trades = trades.filter(symbol=symbol)
+        last = trades.order_by('-timestamp', '-id').values_list('timestamp', 'id').first()
+        if last is None:
+            empty = np.empty(0)
+            return _SymbolSeries(version, None, 0, Decimal('0'), empty, empty)
+        loaded = trades.exclude(_after(last))
+
+        if previous is not None and previous.last is not None:
+            behind = trades.exclude(_after(previous.last)).aggregate(count=Count('id'), total=Sum('net_pnl'))
+            if (behind['count'], behind['total']) == (previous.count, previous.total):
+                tail = loaded.filter(_after(previous.last))
+                totals = tail.aggregate(count=Count('id'), total=Sum('net_pnl'))
+                columns = load_columns(tail)
+                return _SymbolSeries(
+                    version, last, previous.count + totals['count'], previous.total + (totals['total'] or 0),
+                    np.concatenate([previous.time, columns['time']]),
+                    np.concatenate([previous.pnl, columns['pnl']]),
+                )
+
+        # Totals first: a trade stored in between then shows up as a mismatch
+        totals = loaded.aggregate(count=Count('id'), total=Sum('net_pnl'))
+        columns = load_columns(loaded)
+        return _SymbolSeries(
+            version, last, totals['count'], totals['total'] or Decimal('0'), columns['time'], columns['pnl'],
+        )
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+series_store = SeriesStore()
@@ -0,0 +1,43 @@
+"""
+Model signal handlers that keep derived trade data in step
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import analytics, rollups
+from .models import Trade
+
+
+@receiver(pre_save, sender=Trade)
+def remember_rollup_bucket(sender, instance, raw, **kwargs):
+    """Note an edited trade's old bucket so it can be recomputed too"""
+    if raw or instance.pk is None or not rollups.rollups_enabled():
+        return
+    instance._rollup_previous = (
+        Trade.objects.filter(pk=instance.pk).values_list('symbol', 'timestamp').first()
+    )
+
+
+@receiver(post_save, sender=Trade)
+def update_rollups_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.apply_trades([instance])
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous and previous != (instance.symbol, instance.timestamp):
+        rollups.recompute_buckets(*previous)
+    rollups.recompute_buckets(instance.symbol, instance.timestamp)
+
+
+@receiver(post_delete, sender=Trade)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    rollups.recompute_buckets(instance.symbol, instance.timestamp)
+
+
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+def invalidate_analytics(sender, using, **kwargs):
+    # Once per transaction; bulk writers (ingest, pairing) call invalidate() themselves
+    analytics.invalidate_on_commit(using)
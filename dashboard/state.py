@@ -0,0 +1,244 @@
+"""
+Live dashboard state built from the bot's broadcast events
+"""
+from collections import OrderedDict
+from django.conf import settings
+import asyncio
+import logging
+import time
+import uuid
+
+from .events import (
+    BROADCAST_GROUP, PRICE_UPDATE, ROUTER_HEARTBEAT, STATUS_CHANGE, TRADE_EXECUTED, relay_message, wants,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardState:
+    """In-process snapshot of bot status, position, balance, price and stats.
+
+    A full ``status``/``stats`` payload (broadcast or fetched from the bot
+    API) seeds each section; ``price_update``, ``trade_executed`` and
+    ``status_change`` events then keep the status current. Connecting
+    clients are served from the snapshot, and the bot API is only asked
+    when a section is cold or hasn't been refreshed for
+    ``DASHBOARD_STATE_MAX_AGE`` seconds.
+
+    Events are folded in by one channel layer listener per process (see
+    start_listener()), not by the consumers, so each is applied once
+    whether or not a client is connected or subscribed to its topic. The
+    listener also relays them to the process's ``clients``, so the channel
+    layer delivers each event to a process once rather than once per
+    client. Clients subscribed to topics get theirs from the topic groups
+    while a TopicRouter is alive, and from the listener when none is.
+    """
+
+    def __init__(self, max_age=None, remember=256):
+        self._max_age = max_age
+        self._remember = remember
+        self._seen = OrderedDict()
+        self._listener = None    # (task, joined future, channel layer, channel)
+        self.clients = set()     # the process's dashboard consumers (see listen())
+        self.clear()
+
+    @property
+    def max_age(self):
+        if self._max_age is not None:
+            return self._max_age
+        return getattr(settings, 'DASHBOARD_STATE_MAX_AGE', 60)
+
+    def clear(self):
+        self.status = None
+        self.stats = None
+        self.prices = {}
+        self.last_trade = None
+        self._status_at = None
+        self._stats_at = None
+        self._seen.clear()
+        self.router_seen_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def apply(self, message_type, data, event_id=None):
+        """Fold one event into the snapshot; repeats of an event_id are ignored"""
+        if event_id is not None:
+            if event_id in self._seen:
+                return False
+            self._seen[event_id] = None
+            if len(self._seen) > self._remember:
+                self._seen.popitem(last=False)
+        if not isinstance(data, dict):
+            return False
+
+        now = time.monotonic()
+        if message_type == 'status':
+            self.status = dict(data)
+            self._status_at = now
+        elif message_type == 'stats':
+            self.stats = dict(data)
+            self._stats_at = now
+        elif message_type == PRICE_UPDATE:
+            price = data.get('price', data.get('current_price'))
+            if price is None:
+                return False
+            self.prices[data.get('symbol')] = price
+            self._update_status(now, current_price=price)
+        elif message_type == TRADE_EXECUTED:
+            self.last_trade = data
+            changes = {'last_action': data.get('action')}
+            for key in ('position', 'balance'):
+                if key in data:
+                    changes[key] = data[key]
+            if data.get('price') is not None:
+                changes['current_price'] = data['price']
+            self._update_status(now, **changes)
+            # Trade counts and P&L moved; refetch stats when next needed
+            self._stats_at = None
+        elif message_type == STATUS_CHANGE:
+            running = data.get('bot_running')
+            if running is None and 'status' in data:
+                running = data['status'] == 'running'
+            if running is not None:
+                self._update_status(now, bot_running=running)
+        else:
+            return False
+        return True
+
+    def router_alive(self):
+        """Whether a TopicRouter's heartbeat was heard in the last three beats"""
+        if self.router_seen_at is None:
+            return False
+        return time.monotonic() - self.router_seen_at < 3 * getattr(settings, 'DASHBOARD_ROUTER_HEARTBEAT', 5)
+
+    async def start_listener(self, channel_layer, group=BROADCAST_GROUP):
+        """Run listen() in the current event loop unless it already does.
+
+        Returns once the listener is in ``group``. Called by every dashboard
+        connection; the listener keeps running after they disconnect.
+        """
+        loop = asyncio.get_running_loop()
+        if self._listener is not None:
+            task, joined, layer, channel = self._listener
+            if not task.done() and task.get_loop() is loop and layer is channel_layer:
+                await asyncio.shield(joined)
+                return
+            task.cancel()
+            if channel is not None:
+                try:
+                    await layer.group_discard(group, channel)
+                except Exception as e:
+                    logger.error(f"Error leaving {group} with the old state listener: {e}")
+        joined = loop.create_future()
+        task = asyncio.ensure_future(self.listen(channel_layer, group, joined))
+        self._listener = (task, joined, channel_layer, None)
+        channel = await asyncio.shield(joined)
+        if self._listener[0] is task:
+            self._listener = (task, joined, channel_layer, channel)
+
+    async def listen(self, channel_layer=None, group=BROADCAST_GROUP, joined=None):
+        """Fold every event broadcast to ``group`` into the snapshot and relay it to ``clients``.
+
+        Runs until cancelled. The bot's broadcasts carry no event_id; each
+        gets one here, where it enters the process, so every client is
+        sent the same frame. Clients subscribed to topics are only relayed
+        the events no live router will deliver to their topic groups.
+        """
+        if channel_layer is None:
+            from channels.layers import get_channel_layer
+            channel_layer = get_channel_layer()
+        try:
+            channel = await channel_layer.new_channel()
+            await channel_layer.group_add(group, channel)
+        except Exception as e:
+            if joined is not None and not joined.done():
+                joined.set_exception(e)
+            raise
+        if joined is not None and not joined.done():
+            joined.set_result(channel)
+        # Renew the membership before the layer's group_expiry drops it
+        rejoin_every = max(1, int(getattr(channel_layer, 'group_expiry', 86400) // 2))
+        rejoin_at = time.monotonic() + rejoin_every
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(channel_layer.receive(channel), rejoin_every)
+                except asyncio.TimeoutError:
+                    event = None
+                if time.monotonic() >= rejoin_at:
+                    await channel_layer.group_add(group, channel)
+                    rejoin_at = time.monotonic() + rejoin_every
+                if event is None:
+                    continue
+                if event.get('type') == ROUTER_HEARTBEAT:
+                    self.router_seen_at = time.monotonic()
+                    continue
+                event_id = event.get('event_id') or uuid.uuid4().hex
+                message_type, data = relay_message(event)
+                try:
+                    self.apply(message_type, data, event_id)
+                except Exception as e:
+                    logger.error(f"Error applying dashboard event: {e}")
+                unrouted = not event.get('routed') and not self.router_alive()
+                for client in list(self.clients):
+                    if client.topics and not (unrouted and wants(client.topics, message_type, data)):
+                        continue
+                    try:
+                        client.relay(message_type, data, event_id)
+                    except Exception as e:
+                        logger.error(f"Error relaying {message_type} event: {e}")
+        finally:
+            await channel_layer.group_discard(group, channel)
+
+    def _update_status(self, now, **changes):
+        # Partial updates only count once a full status has been seen
+        if self.status is None:
+            return
+        self.status.update(changes)
+        self._status_at = now
+
+    def _is_fresh(self, updated_at):
+        return updated_at is not None and time.monotonic() - updated_at < self.max_age
+
+    def status_snapshot(self):
+        """Copy of the current status, or None when cold or stale"""
+        return dict(self.status) if self._is_fresh(self._status_at) else None
+
+    def stats_snapshot(self):
+        return dict(self.stats) if self._is_fresh(self._stats_at) else None
+
+    async def get_status(self, client, timeout=None):
+        """Status from the snapshot, falling back to the bot API"""
+        snapshot = self.status_snapshot()
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        status = await client.get_status(timeout=timeout)
+        # A stale fallback (bot unreachable) is passed on but doesn't refresh the snapshot
+        if status is not None and not status.get('stale'):
+            self.apply('status', status)
+        return status
+
+    async def get_stats(self, client, timeout=None):
+        """Stats from the snapshot, falling back to the bot API"""
+        snapshot = self.stats_snapshot()
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        stats = await client.get_stats(timeout=timeout)
+        if stats is not None and not stats.get('stale'):
+            self.apply('stats', stats)
+        return stats
+
+    def counters(self):
+        return {
+            'snapshot_hits': self.hits,
+            'snapshot_misses': self.misses,
+            'status_age': None if self._status_at is None else time.monotonic() - self._status_at,
+        }
+
+
+# Shared by every dashboard connection in the process
+dashboard_state = DashboardState()
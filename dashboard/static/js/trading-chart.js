@@ -349,25 +349,7 @@ class TradingChart {
             };
             const limit = limits[tfLower] || 100;
 
-            // Fetch from Bot API - ensure it returns LATEST candles
-            const response = await fetch(`http://localhost:8002/api/candles/${symbolClean}/${timeframe}?limit=${limit}`);
-
-            if (!response.ok) {
-                throw new Error(`API error: ${response.status}`);
-            }
-
-            let candles = await response.json();
-
-            if (!candles || candles.length === 0) {
-                throw new Error('No candle data returned from API');
-            }
-
-            // Sort by time to ensure chronological order
-            candles.sort((a, b) => a.time - b.time);
-
             // For longer timeframes, only keep recent data to avoid testnet price anomalies
-            const now = Math.floor(Date.now() / 1000);
-            const tf = (timeframe || '').toLowerCase();
             const maxAgeSeconds = {
                 '1m': 2 * 24 * 3600,    // 2 days
                 '5m': 3 * 24 * 3600,    // 3 days
@@ -377,16 +359,25 @@ class TradingChart {
                 '1d': 30 * 24 * 3600,   // 1 month
                 '1w': 60 * 24 * 3600    // 2 months
             };
-            const maxAge = maxAgeSeconds[tf] || (7 * 24 * 3600);
-            const cutoffTime = now - maxAge;
+            const maxAge = maxAgeSeconds[tfLower] || (7 * 24 * 3600);
+            const cutoffTime = Math.floor(Date.now() / 1000) - maxAge;
+
+            // Served by Django's candle store: sorted, range-filtered, and only
+            // fetched from the bot when the store doesn't have them yet
+            const params = new URLSearchParams({ limit, start: cutoffTime });
+            const response = await fetch(`/api/candles/${symbolClean}/${tfLower}/?${params}`);
+
+            if (!response.ok) {
+                throw new Error(`API error: ${response.status}`);
+            }
 
-            candles = candles.filter(c => c.time >= cutoffTime);
+            const candles = await response.json();
 
-            if (candles.length === 0) {
+            if (!candles || candles.length === 0) {
                 throw new Error('No recent candles available for this timeframe');
             }
 
-            console.log(`Filtered to ${candles.length} recent candles (last ${Math.floor(maxAge / 86400)} days)`);
+            console.log(`Loaded ${candles.length} recent candles (last ${Math.floor(maxAge / 86400)} days)`);
 
             // Validate data freshness - last candle should be recent
             const lastCandle = candles[candles.length - 1];
@@ -12,6 +12,11 @@ class DashboardWebSocket {
         this.reconnectDelay = 5000; // 5 seconds
         this.pingInterval = null; // Client-side ping interval
         
+        // Binary protocol: used when the MessagePack decoder is loaded
+        // (dashboard.html pins @msgpack/msgpack), JSON otherwise
+        this.binary = typeof MessagePack !== 'undefined';
+        this.streams = {}; // delta stream id -> {type, data} last seen
+        
         // Initialize audio context for sound notifications
         this.audioContext = null;
         this.soundsEnabled = true; // Can be toggled by user
@@ -20,7 +25,11 @@ class DashboardWebSocket {
     connect() {
         try {
             console.log('🔌 Connecting to WebSocket:', this.url);
-            this.ws = new WebSocket(this.url);
+            this.ws = this.binary
+                ? new WebSocket(this.url, ['dashboard.msgpack'])
+                : new WebSocket(this.url);
+            this.ws.binaryType = 'arraybuffer';
+            this.streams = {};
             
             this.ws.onopen = this.onOpen.bind(this);
             this.ws.onmessage = this.onMessage.bind(this);
@@ -53,9 +62,32 @@ class DashboardWebSocket {
         console.log('📡 Push mode active - NO POLLING');
     }
 
+    /**
+     * Decode a MessagePack frame into {type, data}, applying field deltas
+     * against the last payload seen on the same stream
+     */
+    decodeFrame(buffer) {
+        const frame = MessagePack.decode(new Uint8Array(buffer));
+        if (frame[0] === 0) {
+            const [, type, data, stream] = frame;
+            if (stream !== undefined) {
+                this.streams[stream] = { type, data };
+            }
+            return { type, data };
+        }
+        const [, stream, , , changed, removed] = frame;
+        const { type, data: base } = this.streams[stream];
+        const data = Object.assign({}, base, changed);
+        removed.forEach(key => delete data[key]);
+        this.streams[stream] = { type, data };
+        return { type, data };
+    }
+
     onMessage(event) {
         try {
-            const message = JSON.parse(event.data);
+            const message = event.data instanceof ArrayBuffer
+                ? this.decodeFrame(event.data)
+                : JSON.parse(event.data);
             console.log('📨 Pushed update received:', message.type);
             
             // Route pushed messages by type - NO POLLING
@@ -1,3 +1,1767 @@
-from django.test import TestCase
+import asyncio
+import csv
+import functools
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import msgpack
+import numpy as np
+import requests
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import Q, Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .api_client import (
+    AsyncBotAPIClient, BotAPIClient, CircuitBreaker, ResponseCache, _async_http_clients, bot_api_cache,
+    fetch_concurrently, get_async_http_client,
+)
+from .candles import CandleSeries, CandleStore, bucket_start
+from . import analytics, log_tail, metrics, pairing, rollups, series
+from .consumers import DashboardConsumer, LogStreamConsumer
+from .db_routers import AnalyticsRouter, analytics_reads
+from .events import TopicRouter, publish, topic_group
+from .frames import DELTA_FRAME, JSON, KEY_FRAME, MSGPACK, FrameMemo, frame_memo, negotiate
+from .ingest import TradeIngestor, trade_from_payload
+from .log_tail import LogFollower, LogTailer
+from .models import Trade, TradePairingState, TradeRollup
+from .pagination import LAST_PAGE, KeysetPaginator, decode_cursor
+from .relay import ClientOutbox, RelayMetrics, transport_backlog
+from .series import SeriesLevels, lttb, minmax_reduce, series_store
+from .state import DashboardState, dashboard_state
+from .views import order_history_queryset, order_history_summary
+
+
+def mock_http_client(handler):
+    """Build an AsyncClient that answers requests with ``handler``"""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@override_settings(BOT_API_URL='http://bot.test/api')
+class AsyncBotAPIClientTests(SimpleTestCase):
+
+    def setUp(self):
+        bot_api_cache.clear()
+        # Failures here shouldn't trip the shared circuit breaker
+        patcher = mock.patch('dashboard.api_client.bot_api_breaker', CircuitBreaker(failure_threshold=1000))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_get_status_returns_json(self):
+        def handler(request):
+            self.assertEqual(str(request.url), 'http://bot.test/api/status')
+            return httpx.Response(200, json={'bot_running': True})
+
+        with mock.patch('dashboard.api_client.get_async_http_client',
+                        return_value=mock_http_client(handler)):
+            status = await AsyncBotAPIClient().get_status()
+
+        self.assertEqual(status, {'bot_running': True})
+
+    async def test_errors_fall_back_like_sync_client(self):
+        def handler(request):
+            raise httpx.ConnectError('connection refused', request=request)
+
+        errors = metrics.bot_api_errors.value('GET', '/status')
+        with mock.patch('dashboard.api_client.get_async_http_client',
+                        return_value=mock_http_client(handler)):
+            client = AsyncBotAPIClient()
+            self.assertIsNone(await client.get_status())
+            self.assertEqual(await client.get_recent_trades(), [])
+            self.assertFalse(await client.start_bot())
+        self.assertEqual(metrics.bot_api_errors.value('GET', '/status'), errors + 1)
+
+
+    def test_http_client_is_closed_with_its_loop(self):
+        async def get_client():
+            return get_async_http_client()
+
+        # async_to_sync() outside a server loop, as under WSGI: a new loop per call
+        first = async_to_sync(get_client)()
+        second = async_to_sync(get_client)()
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed and second.is_closed)
+        self.assertNotIn(second, [client for client, _ in _async_http_clients.values()])
+
+
+@override_settings(BOT_API_URL='http://bot.test/api')
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        bot_api_cache.clear()
+        self.probe_ok = threading.Event()
+        self.breaker = CircuitBreaker(failure_threshold=2, cooldown=0.02, probe=self.probe)
+        patcher = mock.patch('dashboard.api_client.bot_api_breaker', self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.probe_ok.set)  # let the probe thread finish
+
+    def probe(self):
+        if not self.probe_ok.is_set():
+            raise ConnectionError('still down')
+
+    async def test_open_circuit_fails_fast_with_stale_payload(self):
+        calls = []
+        bot_up = True
+
+        def handler(request):
+            calls.append(request.url.path)
+            if not bot_up:
+                raise httpx.ConnectError('connection refused', request=request)
+            return httpx.Response(200, json={'bot_running': True})
+
+        with mock.patch('dashboard.api_client.get_async_http_client',
+                        return_value=mock_http_client(handler)), \
+                override_settings(BOT_API_CACHE_TTL=0):
+            client = AsyncBotAPIClient()
+            self.assertEqual(await client.get_status(), {'bot_running': True})
+
+            bot_up = False
+            await client.get_status()
+            await client.get_status()
+            self.assertTrue(self.breaker.is_open)
+            self.assertEqual(len(calls), 3)
+
+            # Open: no call is made and the last good status comes back stale
+            status = await client.get_status()
+            self.assertEqual(len(calls), 3)
+            self.assertTrue(status['stale'])
+            self.assertTrue(status['bot_running'])
+            self.assertFalse(await client.start_bot())
+
+            bot_up = True
+            self.probe_ok.set()
+            for _ in range(100):
+                if not self.breaker.is_open:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(await client.get_status(), {'bot_running': True})
+            self.assertEqual(len(calls), 4)
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        response = mock.Mock(status_code=404)
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+        with mock.patch('dashboard.api_client.requests.request', return_value=response):
+            for _ in range(3):
+                self.assertEqual(BotAPIClient().get_recent_trades(), [])
+        self.assertFalse(self.breaker.is_open)
+
+        with mock.patch('dashboard.api_client.requests.request',
+                        side_effect=requests.exceptions.ConnectTimeout('timed out')) as request:
+            for _ in range(3):
+                BotAPIClient().get_recent_trades()
+        self.assertTrue(self.breaker.is_open)
+        self.assertEqual(request.call_count, 2)
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def test_hit_within_ttl(self):
+        cache = ResponseCache(ttl=60)
+        fetch = mock.Mock(return_value={'ok': True})
+
+        self.assertEqual(cache.get_or_fetch('status', fetch), {'ok': True})
+        self.assertEqual(cache.get_or_fetch('status', fetch), {'ok': True})
+
+        fetch.assert_called_once()
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_failures_are_not_cached(self):
+        cache = ResponseCache(ttl=60)
+        fetch = mock.Mock(return_value=None)
+
+        cache.get_or_fetch('status', fetch)
+        cache.get_or_fetch('status', fetch)
+
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_concurrent_sync_misses_share_one_call(self):
+        cache = ResponseCache(ttl=60)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'ok': True}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_fetch('stats', fetch)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'ok': True}] * 10)
+        self.assertEqual(cache.stats()['coalesced'], 9)
+
+    async def test_concurrent_async_misses_share_one_call(self):
+        cache = ResponseCache(ttl=0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'ok': True}
+
+        results = await asyncio.gather(*(cache.aget_or_fetch('status', fetch) for _ in range(10)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'ok': True}] * 10)
+        # Finished flights don't keep the loop alive
+        self.assertNotIn(asyncio.get_running_loop(), cache._async_flights)
+
+
+class ConcurrentFetchTests(SimpleTestCase):
+
+    async def test_calls_run_concurrently_under_one_deadline(self):
+        async def slow(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        started = time.monotonic()
+        results = await fetch_concurrently({
+            'status': (slow({'bot_running': True}, 0.05), None),
+            'stats': (slow({'wins': 1}, 0.05), None),
+            'recent_trades': (slow(['late'], 5), []),
+        }, deadline=0.2)
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1)
+        self.assertEqual(results['status'], {'bot_running': True})
+        self.assertEqual(results['stats'], {'wins': 1})
+        self.assertEqual(results['recent_trades'], [])
+
+    async def test_dashboard_renders_partial_data(self):
+        async def status(self, timeout=None):
+            return {'bot_running': True, 'symbol': 'ETH/USDT'}
+
+        async def missing(self, timeout=None):
+            return None
+
+        async def no_trades(self, timeout=None):
+            return []
+
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', status), \
+                mock.patch.object(AsyncBotAPIClient, 'get_stats', missing), \
+                mock.patch.object(AsyncBotAPIClient, 'get_recent_trades', no_trades):
+            response = await self.async_client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'ETH/USDT')
+
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class LogTailerTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'bot.log')
+
+    def write(self, lines, mode='a'):
+        with open(self.path, mode) as f:
+            for line in lines:
+                f.write(f"2025-01-01 00:00:00,000 - INFO - {line}\n")
+
+    def messages(self, lines):
+        return [line.message for line in lines]
+
+    def test_tail_reads_backwards_across_blocks(self):
+        self.write([f'line {i}' for i in range(5000)], mode='w')
+        tailer = LogTailer(capacity=10)
+
+        with mock.patch('dashboard.log_tail.BLOCK_SIZE', 256):
+            lines = tailer.tail(self.path, 3)
+
+        self.assertEqual(self.messages(lines), ['line 4997', 'line 4998', 'line 4999'])
+
+    def test_repeat_tail_only_parses_appended_lines(self):
+        self.write(['a', 'b'], mode='w')
+        tailer = LogTailer(capacity=10)
+        tailer.tail(self.path, 5)
+        self.write(['c'])
+
+        with mock.patch('dashboard.log_tail.parse_log_line', wraps=log_tail.parse_log_line) as parse:
+            lines = tailer.tail(self.path, 5)
+
+        self.assertEqual(self.messages(lines), ['a', 'b', 'c'])
+        self.assertEqual(parse.call_count, 1)
+
+    def test_detects_rotation(self):
+        self.write(['old 1', 'old 2'], mode='w')
+        tailer = LogTailer(capacity=10)
+        tailer.tail(self.path, 5)
+
+        os.remove(self.path)
+        self.write(['new 1'], mode='w')
+
+        self.assertEqual(self.messages(tailer.tail(self.path, 5)), ['new 1'])
+
+    def test_unterminated_last_line_is_returned_once_complete(self):
+        self.write(['a'], mode='w')
+        with open(self.path, 'a') as f:
+            f.write('2025-01-01 00:00:00,000 - INFO - par')
+        tailer = LogTailer(capacity=10)
+
+        self.assertEqual(self.messages(tailer.tail(self.path, 5)), ['a', 'par'])
+        with open(self.path, 'a') as f:
+            f.write('tial\n')
+        self.assertEqual(self.messages(tailer.tail(self.path, 5)), ['a', 'partial'])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class LogStreamTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log_dir = tmp.name
+        self.path = os.path.join(tmp.name, 'bot.log')
+        with open(self.path, 'w') as f:
+            f.write("2025-01-01 00:00:00,000 - INFO - started\n")
+
+    def append(self, level, message):
+        with open(self.path, 'a') as f:
+            f.write(f"2025-01-01 00:00:01,000 - {level} - {message}\n")
+
+    def test_follower_returns_only_appended_lines(self):
+        with override_settings(BOT_LOG_DIR=self.log_dir):
+            follower = LogFollower()
+            follower.seek_to_end()
+            self.assertEqual(follower.poll(), [])
+            self.append('INFO', 'tick')
+            self.assertEqual([line.message for line in follower.poll()], ['tick'])
+            self.assertEqual(follower.poll(), [])
+
+    async def test_follower_survives_a_failed_seek(self):
+        received = []
+
+        async def collect(lines):
+            received.extend(line.message for line in lines)
+
+        with override_settings(BOT_LOG_DIR=self.log_dir):
+            follower = LogFollower(interval=0.01)
+            seek_to_end = follower.seek_to_end
+
+            def flaky_seek():
+                if seek.call_count == 1:
+                    raise OSError('log rotated away')
+                seek_to_end()
+
+            with mock.patch.object(follower, 'seek_to_end', side_effect=flaky_seek) as seek, \
+                    self.assertLogs('dashboard.log_tail', 'WARNING'):
+                follower.subscribe(collect)
+                await asyncio.sleep(0.05)
+            self.append('INFO', 'tick')
+            await asyncio.sleep(0.05)
+            follower.unsubscribe(collect)
+
+        self.assertEqual(seek.call_count, 2)
+        self.assertEqual(received, ['tick'])
+
+    async def test_stream_pushes_new_filtered_lines(self):
+        with override_settings(BOT_LOG_DIR=self.log_dir, BOT_LOG_POLL_INTERVAL=0.01), \
+                mock.patch('dashboard.consumers.log_follower', LogFollower()), \
+                mock.patch('dashboard.consumers.log_tailer', LogTailer()):
+            communicator = WebsocketCommunicator(LogStreamConsumer.as_asgi(), '/ws/logs/')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+            await communicator.send_json_to({'command': 'subscribe', 'level': 'ERROR'})
+            snapshot = await communicator.receive_json_from()
+            self.assertEqual(snapshot['type'], 'logs_snapshot')
+            self.assertEqual(snapshot['data']['logs'], [])
+
+            await asyncio.sleep(0.05)
+            self.append('INFO', 'ignored')
+            self.append('ERROR', 'boom')
+            pushed = await communicator.receive_json_from(timeout=2)
+
+            self.assertEqual(pushed['type'], 'logs_append')
+            self.assertEqual([log['message'] for log in pushed['data']['logs']], ['boom'])
+            self.assertEqual(pushed['data']['stats']['error'], 1)
+            await communicator.disconnect()
+
+    async def test_commands_must_be_json_objects(self):
+        communicator = WebsocketCommunicator(LogStreamConsumer.as_asgi(), '/ws/logs/')
+        await communicator.connect()
+        for text in ('not json', '[1, 2]', '"subscribe"', 'null'):
+            await communicator.send_to(text_data=text)
+            reply = await communicator.receive_json_from()
+            self.assertEqual(reply, {'type': 'error', 'data': {'message': 'Invalid JSON'}})
+        await communicator.disconnect()
+
+
+def make_candles(count, seconds=60, end=None, price=100.0):
+    """``count`` consecutive bot-style candles, the last one opening at ``end``"""
+    end = end if end is not None else bucket_start(time.time(), seconds)
+    return [
+        {'time': end - (count - 1 - i) * seconds, 'open': price + i, 'high': price + i + 2,
+         'low': price + i - 1, 'close': price + i + 1, 'volume': 1.0}
+        for i in range(count)
+    ]
+
+
+class FakeCandleClient:
+    """Stands in for AsyncBotAPIClient, serving the latest ``limit`` candles"""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.calls = []
+
+    async def get_candles(self, symbol, timeframe, limit, timeout=None):
+        self.calls.append((symbol, timeframe, limit))
+        return self.candles[-limit:]
+
+
+class CandleStoreTests(SimpleTestCase):
+
+    def test_series_range_queries_and_replacement(self):
+        series = CandleSeries(60)
+        candles = make_candles(10, end=6000)
+        series.merge(candles[5:])
+        series.merge(candles[:6])
+        series.merge([{**candles[9], 'close': 1.5}])
+
+        self.assertEqual(len(series), 10)
+        self.assertEqual([c['time'] for c in series.rows(5700, 5820)], [5700, 5760, 5820])
+        self.assertEqual([c['time'] for c in series.rows(limit=2)], [5940, 6000])
+        self.assertEqual(series.rows(limit=1)[0]['close'], 1.5)
+        self.assertTrue(series.is_contiguous(*series.index_range()))
+
+    def test_resample_drops_partial_leading_bucket(self):
+        series = CandleSeries(60)
+        series.merge(make_candles(12, end=900))  # 240 .. 900
+
+        out = series.resample(300).rows()
+
+        self.assertEqual([c['time'] for c in out], [300, 600, 900])
+        first = out[0]
+        self.assertEqual((first['open'], first['close'], first['volume']), (101.0, 106.0, 5.0))
+        self.assertEqual(first['high'], 107.0)
+        self.assertEqual(first['low'], 100.0)
+
+    async def test_only_missing_candles_are_fetched(self):
+        client = FakeCandleClient(make_candles(300, seconds=3600))
+        store = CandleStore(ttl=60)
+
+        candles = await store.get_candles('BTC/USDT', '1h', 48, client=client)
+        self.assertEqual(len(candles), 48)
+        self.assertEqual(client.calls, [('BTCUSDT', '1h', 48)])
+
+        # Fresh and covered: answered from the store
+        await store.get_candles('BTCUSDT', '1h', 24, client=client)
+        self.assertEqual(len(client.calls), 1)
+
+        # Stale: only the newest candle is asked for again
+        store._ttl = 0
+        await store.get_candles('BTCUSDT', '1h', 24, client=client)
+        self.assertEqual(client.calls[-1], ('BTCUSDT', '1h', 1))
+
+        # Older history: enough candles to reach the new start
+        await store.get_candles('BTCUSDT', '1h', 100, client=client)
+        self.assertEqual(client.calls[-1], ('BTCUSDT', '1h', 100))
+
+    async def test_higher_timeframes_resampled_from_stored_candles(self):
+        client = FakeCandleClient(make_candles(600))
+        store = CandleStore(ttl=60)
+        await store.get_candles('BTCUSDT', '1m', 600, client=client)
+
+        candles = await store.get_candles('BTCUSDT', '5m', 12, client=client)
+
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(len(candles), 12)
+        self.assertEqual(candles[-1]['time'], bucket_start(time.time(), 300))
+        self.assertTrue(all(c['time'] % 300 == 0 for c in candles))
+
+    @override_settings(BOT_API_URL='http://bot.test/api')
+    async def test_endpoint(self):
+        requested = []
+
+        def handler(request):
+            requested.append(request.url.params['limit'])
+            return httpx.Response(200, json=make_candles(int(request.url.params['limit']), seconds=14400))
+
+        with mock.patch('dashboard.views.candle_store', CandleStore()), \
+                mock.patch('dashboard.api_client.get_async_http_client',
+                           return_value=mock_http_client(handler)):
+            response = await self.async_client.get('/api/candles/BTCUSDT/4H/', {'limit': 42})
+            bad = await self.async_client.get('/api/candles/BTCUSDT/3h/')
+
+        self.assertEqual(len(response.json()), 42)
+        self.assertEqual(requested, ['42'])
+        self.assertEqual(bad.status_code, 400)
+
+
+class ClientOutboxTests(SimpleTestCase):
+
+    def make_outbox(self, **kwargs):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        return ClientOutbox(send, metrics=RelayMetrics(), **kwargs), sent
+
+    async def test_price_updates_conflate_but_trades_are_kept(self):
+        outbox, sent = self.make_outbox(price_interval=0.05)
+        for i in range(50):
+            outbox.put_latest('BTC', {'type': 'price_update', 'price': i})
+            if i % 10 == 0:
+                outbox.put({'type': 'trade_executed', 'n': i})
+        outbox.start()
+        await asyncio.sleep(0.02)
+        outbox.put_latest('BTC', {'type': 'price_update', 'price': 99})
+        await asyncio.sleep(0.1)
+        await outbox.stop()
+
+        trades = [m['n'] for m in sent if m['type'] == 'trade_executed']
+        prices = [m['price'] for m in sent if m['type'] == 'price_update']
+        self.assertEqual(trades, [0, 10, 20, 30, 40])
+        self.assertEqual(prices, [49, 99])
+        self.assertEqual(outbox.metrics.conflated, 49)
+
+    async def test_slow_client_is_disconnected(self):
+        slow = asyncio.Event()
+
+        async def on_slow():
+            slow.set()
+
+        outbox, _ = self.make_outbox(on_slow=on_slow, max_queue=5, slow_timeout=0)
+        for i in range(7):
+            outbox.put({'type': 'status', 'n': i})
+        await asyncio.wait_for(slow.wait(), 1)
+
+        self.assertTrue(outbox.closed)
+        self.assertEqual(outbox.metrics.slow_disconnects, 1)
+        self.assertEqual(outbox.metrics.snapshot()['clients'], 0)
+
+
+    async def test_full_transport_buffer_holds_messages_in_the_queue(self):
+        buffered = [10 ** 6]
+        slow = asyncio.Event()
+
+        async def on_slow():
+            slow.set()
+
+        outbox, sent = self.make_outbox(
+            on_slow=on_slow, price_interval=0, max_queue=3, slow_timeout=0.1,
+            backlog=lambda: buffered[0], max_buffer=1000,
+        )
+        outbox.start()
+        for i in range(20):
+            outbox.put_latest('BTC', {'type': 'price_update', 'price': i})
+        outbox.put({'type': 'trade_executed'})
+        await asyncio.sleep(0.1)
+        self.assertEqual(sent, [])
+
+        buffered[0] = 0
+        await asyncio.sleep(0.1)
+        self.assertEqual([m['type'] for m in sent], ['trade_executed', 'price_update'])
+        self.assertEqual(sent[-1]['price'], 19)
+
+        # A stalled client is found by the timer, without further messages
+        buffered[0] = 10 ** 6
+        for i in range(5):
+            outbox.put({'type': 'status', 'n': i})
+        await asyncio.wait_for(slow.wait(), 1)
+        await outbox.stop()
+        self.assertEqual(outbox.metrics.slow_disconnects, 1)
+
+    def test_transport_backlog_reads_the_twisted_buffer(self):
+        tcp = mock.Mock(spec=['dataBuffer', 'offset', '_tempDataLen'], dataBuffer=b'x' * 100, offset=40, _tempDataLen=7)
+        tls = mock.Mock(spec=['transport'], transport=tcp)
+        send = functools.partial(lambda protocol, message: None, mock.Mock(transport=tls))
+
+        self.assertEqual(transport_backlog(send)(), 67)
+        self.assertIsNone(transport_backlog(lambda message: None))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, DASHBOARD_PRICE_INTERVAL=0.05)
+class DashboardRelayTests(SimpleTestCase):
+
+    def setUp(self):
+        dashboard_state.clear()
+
+    async def test_bursts_are_conflated_per_client(self):
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', mock.AsyncMock(return_value={'bot_running': True})):
+            communicator = WebsocketCommunicator(DashboardConsumer.as_asgi(), '/ws/dashboard/')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual((await communicator.receive_json_from())['type'], 'status')
+
+            layer = get_channel_layer()
+            for i in range(20):
+                await layer.group_send('dashboard', {
+                    'type': 'bot_update', 'data': {'type': 'price_update', 'data': {'symbol': 'BTC/USDT', 'price': i}},
+                })
+            await layer.group_send('dashboard', {
+                'type': 'dashboard_message', 'message_type': 'trade_executed', 'data': {'action': 'BUY'},
+            })
+
+            received = []
+            while not await communicator.receive_nothing(0.2):
+                received.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+
+        trades = [m['data'] for m in received if m['type'] == 'trade_executed']
+        prices = [m['data']['price'] for m in received if m['type'] == 'price_update']
+        self.assertEqual(trades, [{'action': 'BUY'}])
+        # The first update goes straight out, the rest collapse into the latest
+        self.assertLessEqual(len(prices), 3)
+        self.assertEqual(prices[-1], 19)
+
+    def test_bench_command_reports_latency(self):
+        out = io.StringIO()
+        call_command('bench_relay', clients=5, duration=0.3, rate=50, burst=5, trade_ratio=0.5, stdout=out)
+
+        self.assertIn('Relay latency: p50', out.getvalue())
+        self.assertIn('Dropped trades: 0', out.getvalue())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, DASHBOARD_PRICE_INTERVAL=0)
+class TopicSubscriptionTests(SimpleTestCase):
+
+    def setUp(self):
+        dashboard_state.clear()
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(DashboardConsumer.as_asgi(), '/ws/dashboard/')
+        await communicator.connect()
+        await communicator.receive_json_from()
+        return communicator
+
+    def test_topic_groups(self):
+        self.assertEqual(topic_group('price_update', 'BTC/USDT'), 'dashboard.price_update.BTCUSDT')
+        self.assertEqual(topic_group('stats'), 'dashboard.stats')
+
+    async def test_events_fan_out_to_subscribers_only(self):
+        layer = get_channel_layer()
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', mock.AsyncMock(return_value={'bot_running': True})):
+            everything = await self.connect()
+            eth = await self.connect()
+            await eth.send_json_to({'command': 'subscribe', 'topics': ['price_update:ETH/USDT', 'trade_executed']})
+            reply = await eth.receive_json_from()
+            self.assertEqual(reply['data']['topics'], ['price_update:ETHUSDT', 'trade_executed'])
+            # Only the process's state listener, which relays to both clients
+            self.assertEqual(len(layer.groups['dashboard']), 1)
+            self.assertEqual(len(dashboard_state.clients), 2)
+
+            await publish(layer, 'price_update', {'symbol': 'BTC/USDT', 'price': 1})
+            await publish(layer, 'price_update', {'symbol': 'ETH/USDT', 'price': 2})
+            await publish(layer, 'stats', {'total_trades': 3})
+            await publish(layer, 'trade_executed', {'symbol': 'ETH/USDT', 'action': 'BUY'})
+
+            eth_received = []
+            while not await eth.receive_nothing(0.1):
+                eth_received.append(await eth.receive_json_from())
+            all_received = []
+            while not await everything.receive_nothing(0.1):
+                all_received.append(await everything.receive_json_from())
+            await eth.disconnect()
+            await everything.disconnect()
+
+        self.assertEqual([m['type'] for m in eth_received], ['price_update', 'trade_executed'])
+        self.assertEqual(eth_received[0]['data']['price'], 2)
+        self.assertEqual(len(all_received), 4)
+
+    async def test_router_republishes_legacy_broadcasts(self):
+        layer = get_channel_layer()
+        subscriber = await layer.new_channel()
+        await layer.group_add(topic_group('status_change'), subscriber)
+        router = TopicRouter()
+        task = asyncio.ensure_future(router.listen(layer))
+        await asyncio.sleep(0.01)
+
+        await layer.group_send('dashboard', {
+            'type': 'bot_update', 'data': {'type': 'status_change', 'data': {'status': 'running'}},
+        })
+        await publish(layer, 'status_change', {'status': 'stopped'})
+        first = await asyncio.wait_for(layer.receive(subscriber), 1)
+        second = await asyncio.wait_for(layer.receive(subscriber), 1)
+        task.cancel()
+
+        # The already-routed event isn't delivered twice
+        self.assertEqual(sorted([first['data']['status'], second['data']['status']]), ['running', 'stopped'])
+        self.assertEqual(router.routed, 1)
+
+    async def test_subscribers_are_relayed_bot_broadcasts_until_a_router_runs(self):
+        layer = get_channel_layer()
+
+        async def bot_price(symbol, price):
+            await layer.group_send('dashboard', {
+                'type': 'bot_update', 'data': {'type': 'price_update', 'data': {'symbol': symbol, 'price': price}},
+            })
+
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', mock.AsyncMock(return_value={'bot_running': True})):
+            client = await self.connect()
+            with self.assertLogs('dashboard.consumers', 'WARNING'):
+                await client.send_json_to({'command': 'subscribe', 'topics': ['price_update:ETH/USDT']})
+                await client.receive_json_from()
+
+            await bot_price('BTC/USDT', 1)
+            await bot_price('ETH/USDT', 2)
+            self.assertEqual((await client.receive_json_from(timeout=1))['data']['price'], 2)
+            self.assertTrue(await client.receive_nothing(0.1))
+
+            router = TopicRouter(heartbeat=0.05)
+            task = asyncio.ensure_future(router.listen(layer))
+            while not dashboard_state.router_alive():
+                await asyncio.sleep(0.01)
+            # Now delivered by the router only, not twice
+            await bot_price('ETH/USDT', 3)
+            self.assertEqual((await client.receive_json_from(timeout=1))['data']['price'], 3)
+            self.assertTrue(await client.receive_nothing(0.1))
+            self.assertEqual(router.routed, 1)
+            task.cancel()
+            await client.disconnect()
+
+    async def test_unknown_topic_and_unsubscribe(self):
+        layer = get_channel_layer()
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', mock.AsyncMock(return_value={'bot_running': True})):
+            client = await self.connect()
+            await client.send_json_to({'command': 'subscribe', 'topics': ['bogus']})
+            self.assertEqual((await client.receive_json_from())['type'], 'error')
+
+            await client.send_json_to({'command': 'subscribe', 'topics': ['stats']})
+            await client.receive_json_from()
+            await client.send_json_to({'command': 'unsubscribe', 'topics': ['stats']})
+            await client.receive_json_from()
+            # Back on the catch-all broadcasts, relayed by the state listener
+            self.assertEqual(len(layer.groups.get('dashboard', {})), 1)
+            self.assertEqual(len(dashboard_state.clients), 1)
+            self.assertFalse(layer.groups.get('dashboard.stats'))
+            await client.disconnect()
+
+
+class DashboardStateTests(SimpleTestCase):
+
+    def setUp(self):
+        dashboard_state.clear()
+
+    def test_events_update_the_snapshot_once(self):
+        state = DashboardState(max_age=60)
+        self.assertIsNone(state.status_snapshot())
+        # Partial updates don't warm a cold snapshot
+        state.apply('price_update', {'symbol': 'BTC/USDT', 'price': 100})
+        self.assertIsNone(state.status_snapshot())
+
+        state.apply('status', {'bot_running': True, 'current_price': 100, 'balance': 1000})
+        state.apply('stats', {'total_trades': 4})
+        state.apply('price_update', {'symbol': 'BTC/USDT', 'price': 101}, event_id='p1')
+        state.apply('price_update', {'symbol': 'BTC/USDT', 'price': 999}, event_id='p1')
+        state.apply('trade_executed', {'action': 'SELL', 'price': 102, 'position': None, 'balance': 1010})
+        state.apply('status_change', {'status': 'stopped'})
+
+        self.assertEqual(state.status_snapshot(), {
+            'bot_running': False, 'current_price': 102, 'balance': 1010, 'position': None, 'last_action': 'SELL',
+        })
+        self.assertEqual(state.prices, {'BTC/USDT': 101})
+        # A trade makes the stats stale
+        self.assertIsNone(state.stats_snapshot())
+
+    async def test_stale_snapshot_refetches(self):
+        state = DashboardState(max_age=0.05)
+        client = mock.Mock(get_status=mock.AsyncMock(return_value={'bot_running': True}))
+        self.assertEqual(await state.get_status(client), {'bot_running': True})
+        self.assertEqual(await state.get_status(client), {'bot_running': True})
+        self.assertEqual(client.get_status.await_count, 1)
+
+        await asyncio.sleep(0.06)
+        await state.get_status(client)
+        self.assertEqual(client.get_status.await_count, 2)
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+    async def test_listener_applies_each_event_once_without_clients(self):
+        layer = get_channel_layer()
+        state = DashboardState(max_age=60)
+        await state.start_listener(layer)
+        await state.start_listener(layer)
+        self.assertEqual(len(layer.groups['dashboard']), 1)
+
+        with mock.patch.object(state, 'apply', wraps=state.apply) as apply:
+            await layer.group_send('dashboard', {
+                'type': 'bot_update', 'data': {'type': 'status', 'data': {'bot_running': True}},
+            })
+            await publish(layer, 'stats', {'total_trades': 3})
+            await asyncio.sleep(0.05)
+        state._listener[0].cancel()
+
+        self.assertEqual(apply.call_count, 2)
+        self.assertEqual(state.status_snapshot(), {'bot_running': True})
+        self.assertEqual(state.stats_snapshot(), {'total_trades': 3})
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+    async def test_connect_served_from_broadcast_snapshot(self):
+        layer = get_channel_layer()
+        status = mock.AsyncMock(return_value={'bot_running': False})
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', status):
+            first = WebsocketCommunicator(DashboardConsumer.as_asgi(), '/ws/dashboard/')
+            await first.connect()
+            await first.receive_json_from()
+            await layer.group_send('dashboard', {
+                'type': 'bot_update', 'data': {'type': 'status', 'data': {'bot_running': True, 'balance': 50}},
+            })
+            await first.receive_json_from()
+
+            second = WebsocketCommunicator(DashboardConsumer.as_asgi(), '/ws/dashboard/')
+            await second.connect()
+            snapshot = await second.receive_json_from()
+            await first.disconnect()
+            await second.disconnect()
+
+        self.assertEqual(snapshot, {'type': 'status', 'data': {'bot_running': True, 'balance': 50}})
+        # Only the first (cold) connect asked the bot
+        self.assertEqual(status.await_count, 1)
+
+
+class FrameEncodingTests(SimpleTestCase):
+
+    def setUp(self):
+        dashboard_state.clear()
+
+    def test_negotiation_defaults_to_json(self):
+        self.assertEqual(negotiate({'subprotocols': []}), (JSON, None))
+        self.assertEqual(negotiate({'subprotocols': ['dashboard.msgpack']}), (MSGPACK, 'dashboard.msgpack'))
+        self.assertEqual(negotiate({'query_string': b'protocol=msgpack'}), (MSGPACK, None))
+
+    def test_broadcast_encoded_once_per_process(self):
+        memo = FrameMemo()
+        first = memo.frame('trade_executed', {'action': 'BUY'}, event_id='e1')
+        second = memo.frame('trade_executed', {'action': 'BUY'}, event_id='e1')
+
+        self.assertIs(first, second)
+        self.assertIs(first.encode(JSON), second.encode(JSON))
+        self.assertEqual(msgpack.unpackb(first.encode(MSGPACK)), [KEY_FRAME, 'trade_executed', {'action': 'BUY'}])
+
+    def test_price_deltas_carry_only_changed_fields(self):
+        memo = FrameMemo(history=2)
+        tick = {'symbol': 'BTC/USDT', 'price': 100.0, 'change_24h': 1.5, 'volume': 10}
+        first = memo.frame('price_update', tick)
+        second = memo.frame('price_update', {**tick, 'price': 101.0})
+
+        delta = msgpack.unpackb(second.encode(MSGPACK, base_seq=first.seq))
+        self.assertEqual(delta, [DELTA_FRAME, first.stream, 2, 1, {'price': 101.0}, []])
+        self.assertLess(len(second.encode(MSGPACK, first.seq)), len(second.encode(JSON)) / 2)
+
+        # Bases that fell out of the history get a full key frame
+        memo.frame('price_update', {**tick, 'price': 102.0})
+        memo.frame('price_update', {**tick, 'price': 103.0})
+        self.assertEqual(msgpack.unpackb(memo.frame('price_update', tick).encode(MSGPACK, first.seq))[0], KEY_FRAME)
+
+    def test_messages_without_event_id_get_their_own_frame(self):
+        memo = FrameMemo()
+        first = memo.frame('status', {'bot_running': True})
+        second = memo.frame('status', {'bot_running': True})
+
+        self.assertIsNot(first, second)
+        self.assertEqual((first.seq, second.seq), (1, 2))
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, DASHBOARD_PRICE_INTERVAL=0)
+    async def test_bot_broadcasts_are_encoded_once_for_all_clients(self):
+        layer = get_channel_layer()
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', mock.AsyncMock(return_value={'bot_running': True})):
+            clients = []
+            for _ in range(3):
+                communicator = WebsocketCommunicator(DashboardConsumer.as_asgi(), '/ws/dashboard/')
+                await communicator.connect()
+                await communicator.receive_json_from()
+                clients.append(communicator)
+
+            with mock.patch.object(frame_memo, '_build', wraps=frame_memo._build) as build:
+                # The bot's broadcasts have no event_id
+                await layer.group_send('dashboard', {
+                    'type': 'bot_update', 'data': {'type': 'price_update', 'data': {'symbol': 'BTC/USDT', 'price': 1}},
+                })
+                received = [await client.receive_json_from(timeout=1) for client in clients]
+            for client in clients:
+                await client.disconnect()
+
+        self.assertEqual(received, [{'type': 'price_update', 'data': {'symbol': 'BTC/USDT', 'price': 1}}] * 3)
+        self.assertEqual(build.call_count, 1)
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, DASHBOARD_PRICE_INTERVAL=0)
+    async def test_binary_client_receives_deltas(self):
+        with mock.patch.object(AsyncBotAPIClient, 'get_status', mock.AsyncMock(return_value={'bot_running': True})):
+            communicator = WebsocketCommunicator(
+                DashboardConsumer.as_asgi(), '/ws/dashboard/', subprotocols=['dashboard.msgpack'],
+            )
+            connected, subprotocol = await communicator.connect()
+            self.assertEqual(subprotocol, 'dashboard.msgpack')
+            status = msgpack.unpackb(await communicator.receive_from())
+            self.assertEqual(status[:3], [KEY_FRAME, 'status', {'bot_running': True}])
+
+            layer = get_channel_layer()
+            frames = []
+            for price in (100.0, 101.0):
+                await layer.group_send('dashboard', {
+                    'type': 'dashboard_message', 'message_type': 'price_update',
+                    'data': {'symbol': 'ETH/USDT', 'price': price, 'volume': 5}, 'event_id': f'p{price}',
+                })
+                frames.append(msgpack.unpackb(await communicator.receive_from(timeout=1)))
+            await communicator.disconnect()
+
+        self.assertEqual(frames[0][0], KEY_FRAME)
+        self.assertEqual(frames[1][0], DELTA_FRAME)
+        self.assertEqual(frames[1][4], {'price': 101.0})
+
+
+class TradeIndexTests(TestCase):
+    """The order history filter paths must be answered from an index"""
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plan assertions are written for SQLite')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_symbol_and_date_range(self):
+        qs = order_history_queryset('BTC/USDT', '2025-01-01', '2025-01-31')
+        self.assertUsesIndex(qs, 'trade_symbol_ts_idx')
+
+    def test_action_filter(self):
+        qs = order_history_queryset('BTC/USDT', '2025-01-01', None, trade_type='SELL')
+        self.assertUsesIndex(qs, 'trade_sym_action_ts_idx')
+
+    def test_result_filter(self):
+        qs = order_history_queryset('BTC/USDT', None, '2025-01-31', result='WIN')
+        self.assertUsesIndex(qs, 'trade_sym_result_ts_idx')
+
+    def test_best_trades_sort(self):
+        qs = order_history_queryset('BTC/USDT').filter(net_pnl__isnull=False).order_by('-net_pnl')[:5]
+        self.assertUsesIndex(qs, 'trade_symbol_pnl_idx')
+
+    def test_date_filter_is_a_timestamp_range(self):
+        sql = str(order_history_queryset('BTC/USDT', '2025-01-01', '2025-01-31').query)
+        self.assertNotIn('django_datetime_cast_date', sql)
+
+
+def make_trades(count, symbol='BTC/USDT', start=None):
+    """Create ``count`` alternating BUY/SELL trades one minute apart"""
+    start = start or timezone.now() - timedelta(days=1)
+    trades = []
+    for i in range(count):
+        pnl = Decimal(i % 7 - 3) * Decimal('1.25')
+        trades.append(Trade(
+            timestamp=start + timedelta(minutes=i),
+            symbol=symbol,
+            action='BUY' if i % 2 == 0 else 'SELL',
+            price=Decimal('40000.00') + i,
+            amount=Decimal('0.010000'),
+            entry_price=Decimal('40000.00'),
+            exit_price=Decimal('40000.00') + i,
+            fee_paid=Decimal('0.5000'),
+            duration_minutes=i % 30,
+            net_pnl=pnl,
+            result='WIN' if pnl > 0 else 'LOSS',
+        ))
+    trades = Trade.objects.bulk_create(trades)
+    # bulk_create skips the model signals that maintain the rollups
+    rollups.apply_trades(trades)
+    return trades
+
+
+class OrderHistorySummaryTests(TestCase):
+
+    def setUp(self):
+        make_trades(40)
+        make_trades(5, symbol='ETH/USDT')
+
+    def test_summary_matches_separate_queries(self):
+        qs = order_history_queryset('BTC/USDT')
+        summary, best, worst = order_history_summary(qs)
+
+        self.assertEqual(summary['total_trades'], qs.count())
+        self.assertEqual(summary['net_pnl'], sum(t.net_pnl for t in qs))
+        self.assertEqual(
+            [t.net_pnl for t in best],
+            [t.net_pnl for t in qs.order_by('-net_pnl')[:5]],
+        )
+        self.assertEqual(
+            [t.net_pnl for t in worst],
+            [t.net_pnl for t in qs.order_by('net_pnl')[:5]],
+        )
+        self.assertEqual(summary['best_trade'], best[0])
+        self.assertEqual(summary['worst_trade'], worst[0])
+
+    def test_summary_runs_two_queries(self):
+        with self.assertNumQueries(2):
+            order_history_summary(order_history_queryset('BTC/USDT'))
+
+    def test_page_render_query_count(self):
+        # aggregate + ranked best/worst + one page of rows
+        with self.assertNumQueries(3):
+            response = self.client.get('/order-history/', {'symbol': 'BTC/USDT'})
+        self.assertEqual(response.status_code, 200)
+
+
+class TradeRollupTests(TestCase):
+
+    def setUp(self):
+        make_trades(90)
+        make_trades(10, symbol='ETH/USDT')
+
+    def snapshot(self):
+        return sorted(TradeRollup.objects.values_list(
+            'symbol', 'granularity', 'bucket_start', 'trade_count', 'volume', 'fees', 'net_pnl',
+            'wins', 'losses', 'min_pnl', 'max_pnl', 'duration_sum', 'duration_count',
+        ))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_incremental_rollups_match_rebuild(self):
+        self.assertMatchesRebuild()
+
+    def test_trades_are_added_to_existing_buckets_by_the_database(self):
+        start = timezone.now().replace(minute=0) - timedelta(days=2)
+        opened = Trade.objects.bulk_create([Trade(
+            timestamp=start, symbol='SOL/USDT', action='BUY', price=Decimal('150.00'), amount=Decimal('2.000000'),
+        )])
+        rollups.apply_trades(opened)
+        self.assertIsNone(TradeRollup.objects.get(symbol='SOL/USDT', granularity='hour').min_pnl)
+
+        closed = Trade.objects.bulk_create([
+            Trade(timestamp=start + timedelta(minutes=i), symbol='SOL/USDT', action='SELL', price=Decimal('151.00'),
+                  amount=Decimal('1.000000'), net_pnl=pnl, result='WIN' if pnl > 0 else 'LOSS')
+            for i, pnl in enumerate([Decimal('2.50'), Decimal('-1.25'), Decimal('4.00')], start=1)
+        ])
+        # Added to the buckets the open trade created by one upsert, no read
+        with CaptureQueriesContext(connection) as queries:
+            rollups.apply_trades(closed)
+        rollup_sql = [q['sql'] for q in queries if 'dashboard_traderollup' in q['sql']]
+        self.assertEqual(len(rollup_sql), 1)
+        self.assertIn('INSERT INTO', rollup_sql[0])
+        hour = TradeRollup.objects.get(symbol='SOL/USDT', granularity='hour')
+        self.assertEqual((hour.trade_count, hour.min_pnl, hour.max_pnl), (4, Decimal('-1.25'), Decimal('4.00')))
+        self.assertMatchesRebuild()
+
+    def test_save_edit_and_delete_keep_rollups_in_step(self):
+        trade = Trade.objects.create(
+            timestamp=timezone.now() - timedelta(days=3), symbol='BTC/USDT', action='SELL',
+            price=Decimal('41000.00'), amount=Decimal('0.020000'), net_pnl=Decimal('7.50'), result='WIN',
+        )
+        self.assertMatchesRebuild()
+
+        trade.net_pnl = Decimal('-2.00')
+        trade.result = 'LOSS'
+        trade.timestamp -= timedelta(hours=5)
+        trade.save()
+        self.assertMatchesRebuild()
+
+        Trade.objects.filter(symbol='BTC/USDT').first().delete()
+        trade.delete()
+        self.assertMatchesRebuild()
+
+    def test_summary_totals_match_raw_aggregate(self):
+        totals = rollups.summary_totals('BTC/USDT')
+        summary, _, _ = order_history_summary(order_history_queryset('BTC/USDT'))
+
+        self.assertEqual(totals['total_trades'], summary['total_trades'])
+        self.assertEqual(totals['net_pnl'], summary['net_pnl'])
+        self.assertEqual(totals['total_fees'], summary['total_fees_paid'])
+        self.assertEqual(int(totals['avg_duration']), summary['avg_trade_duration'])
+
+    def test_unaligned_range_falls_back_to_raw_rows(self):
+        start = timezone.now().replace(second=30, microsecond=0)
+        self.assertIsNone(rollups.summary_totals('BTC/USDT', start, None))
+        self.assertIsNone(rollups.summary_totals('', None, None))
+
+
+class OrderHistoryExportTests(TestCase):
+
+    def setUp(self):
+        self.trades = make_trades(12)
+        Trade.objects.filter(pk=self.trades[0].pk).update(exit_price=None, notes='line one\nline two')
+
+    def export(self, **params):
+        response = self.client.get('/order-history/', {'symbol': 'BTC/USDT', 'export': 'csv', **params})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_rows_match_model_values(self):
+        rows = self.export()
+
+        self.assertEqual(rows[0][0], 'ID')
+        self.assertEqual(len(rows), 13)
+        by_id = {int(row[0]): row for row in rows[1:]}
+        for trade in Trade.objects.filter(symbol='BTC/USDT'):
+            row = by_id[trade.id]
+            roi = trade.calculate_roi()
+            if roi is None:
+                self.assertEqual(row[10], '')
+            else:
+                # SQL ROUND rounds halves away from zero, Decimal to even
+                self.assertAlmostEqual(float(row[10]), float(roi), delta=0.01)
+            self.assertEqual(row[11], trade.status)
+            self.assertEqual(row[13], trade.notes.replace('\n', ' ').strip())
+
+    def test_export_streams_in_chunks(self):
+        from .views import order_history_csv_chunks
+
+        chunks = list(order_history_csv_chunks(order_history_queryset('BTC/USDT'), chunk_size=5))
+
+        self.assertEqual(len(chunks), 3)  # header + 12 rows, 5 lines per chunk
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        # Duplicate timestamps make sure ties are broken by id
+        start = timezone.now() - timedelta(days=1)
+        make_trades(23, start=start)
+        make_trades(4, start=start)
+        self.expected = list(
+            Trade.objects.filter(symbol='BTC/USDT').order_by('-timestamp', '-id').values_list('id', flat=True)
+        )
+
+    def test_walk_forward_and_back(self):
+        paginator = KeysetPaginator(order_history_queryset('BTC/USDT'), per_page=10)
+
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        seen = [t.id for page in pages for t in page]
+
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertFalse(pages[-1].has_next())
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([t.id for t in back], [t.id for t in pages[-2]])
+
+    def test_last_page(self):
+        page = KeysetPaginator(order_history_queryset('BTC/USDT'), per_page=10).get_page(LAST_PAGE)
+
+        self.assertEqual([t.id for t in page], self.expected[-10:])
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page = KeysetPaginator(order_history_queryset('BTC/USDT'), per_page=10).get_page('not-a-cursor')
+        self.assertEqual([t.id for t in page], self.expected[:10])
+
+    def test_deep_page_is_an_index_range_scan(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('query plan assertions are written for SQLite')
+        paginator = KeysetPaginator(order_history_queryset('BTC/USDT', trade_type='BUY'), per_page=10)
+        cursor = paginator.get_page().next_cursor
+
+        with CaptureQueriesContext(connection) as queries:
+            paginator.get_page(cursor)
+        with connection.cursor() as db:
+            db.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = ' '.join(str(row) for row in db.fetchall())
+
+        self.assertIn('trade_sym_action_ts_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class TradesAPITests(TestCase):
+
+    def setUp(self):
+        make_trades(30)
+        make_trades(6, symbol='ETH/USDT', start=timezone.now() - timedelta(days=10))
+
+    def test_filters_run_before_pagination(self):
+        response = self.client.get('/api/trades/', {'action': 'SELL', 'limit': 10, 'count': '1'})
+        data = response.json()
+
+        action = data['fields'].index('action')
+        self.assertEqual(len(data['rows']), 10)
+        self.assertTrue(all(row[action] == 'SELL' for row in data['rows']))
+        self.assertEqual(data['total'], Trade.objects.filter(action='SELL').count())
+        self.assertIsNotNone(data['next'])
+
+    def test_cursor_reaches_older_history(self):
+        seen = []
+        params = {'limit': 7}
+        while True:
+            data = self.client.get('/api/trades/', params).json()
+            seen.extend(row[0] for row in data['rows'])
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+
+        self.assertEqual(seen, list(Trade.objects.order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_date_and_symbol_filters(self):
+        day = (timezone.now() - timedelta(days=10)).strftime('%Y-%m-%d')
+        data = self.client.get('/api/trades/', {'symbol': 'ETH/USDT', 'from_date': day, 'to_date': day}).json()
+
+        self.assertTrue(data['rows'])
+        self.assertTrue(all(row[2] == 'ETH/USDT' for row in data['rows']))
+
+    def test_trades_page_renders_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/trades/', {'action': 'BUY'})
+        self.assertEqual(response.status_code, 200)
+
+
+class TradeAnalyticsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def sell(self, net_pnl, days_ago, pct=None):
+        # Committed, so the trade generation moves on
+        with self.captureOnCommitCallbacks(execute=True):
+            return Trade.objects.create(
+                symbol='BTC/USDT', action='SELL', price=Decimal('100'), amount=Decimal('1'),
+                net_pnl=Decimal(net_pnl), profit_loss_pct=Decimal(pct if pct is not None else net_pnl),
+                timestamp=timezone.now() - timedelta(days=days_ago),
+            )
+
+    def test_compute_analytics(self):
+        day = 86400.0
+        pnl = np.array([10, -5, -10, 20, 5, -1, -1, -1, 3], dtype=float)
+        result = analytics.compute_analytics(np.arange(9) * day, pnl, pnl / 100, window=3, points=5)
+
+        self.assertEqual(result['net_pnl'], 20)
+        self.assertEqual(result['profit_factor'], round(38 / 18, 4))
+        self.assertEqual(result['win_rate'], round(4 / 9 * 100, 2))
+        # Peak 10 after trade 1, down to -5 after trade 3, recovered by trade 4
+        self.assertEqual(result['max_drawdown'], 15)
+        self.assertEqual(result['max_drawdown_at'], 2 * 86400 * 1000)
+        # Longest time under water: the peak of 20 at trade 5 until trade 9 matches it
+        self.assertEqual(result['max_drawdown_trades'], 3)
+        self.assertEqual(result['max_drawdown_seconds'], 3 * day)
+        self.assertEqual(result['win_streak'], {'longest': 2, 'current': 1})
+        self.assertEqual(result['loss_streak'], {'longest': 3, 'current': 0})
+        self.assertEqual(result['rolling_win_rate']['win_rate'][:2], [33.33, 66.67])
+        self.assertEqual(len(result['equity_curve']['equity']), 5)
+        self.assertEqual(result['equity_curve']['equity'][-1], 20)
+        self.assertIsNotNone(result['sharpe_annualized'])
+
+    def test_no_trades(self):
+        result = analytics.compute_analytics(np.empty(0), np.empty(0), np.empty(0))
+
+        self.assertEqual(result['trades'], 0)
+        self.assertIsNone(result['profit_factor'])
+        self.assertEqual(result['equity_curve']['equity'], [])
+
+    def test_endpoint_is_cached_until_trades_change(self):
+        self.sell('10', 3)
+        self.sell('-4', 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Trade.objects.create(symbol='BTC/USDT', action='BUY', price=Decimal('100'), amount=Decimal('1'))
+
+        data = self.client.get('/api/analytics/', {'symbol': 'BTC/USDT'}).json()
+        self.assertEqual(data['trades'], 2)
+        self.assertEqual(data['net_pnl'], 6)
+        self.assertEqual(data['profit_factor'], 2.5)
+        # Only the trade generation is read
+        with self.assertNumQueries(1):
+            self.client.get('/api/analytics/', {'symbol': 'BTC/USDT'})
+
+        self.sell('5', 1)
+        data = self.client.get('/api/analytics/', {'symbol': 'BTC/USDT'}).json()
+        self.assertEqual(data['trades'], 3)
+        self.assertEqual(data['net_pnl'], 11)
+
+    def test_saves_bump_the_generation_once_per_transaction(self):
+        def create():
+            return Trade.objects.create(symbol='BTC/USDT', action='SELL', price=Decimal('100'),
+                                        amount=Decimal('1'), net_pnl=Decimal('1'))
+
+        version = analytics.cache_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            trades = [create() for _ in range(3)]
+            trades[0].delete()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(analytics.cache_version(), version + 1)
+
+        # Rolled back with its savepoint, so the next write registers again
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    create()
+                    raise ValueError
+            except ValueError:
+                pass
+            create()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(analytics.cache_version(), version + 2)
+
+    def test_writes_from_another_process_invalidate(self):
+        self.sell('10', 3)
+        self.assertEqual(self.client.get('/api/analytics/').json()['trades'], 1)
+        series_store.clear()
+        self.assertEqual(len(series_store.get(None, 'pnl')), 1)
+
+        # e.g. manage.py ingest_trades, with its own local memory cache
+        other_cache = LocMemCache('ingest-process', {})
+        with mock.patch('dashboard.analytics.cache', other_cache):
+            ingestor = TradeIngestor()
+            ingestor.add({
+                'trade_id': 'other-1', 'timestamp': timezone.now().isoformat(), 'symbol': 'BTC/USDT',
+                'action': 'SELL', 'price': 100, 'amount': 1, 'net_pnl': 2,
+            })
+            ingestor.flush()
+
+        self.assertEqual(self.client.get('/api/analytics/').json()['trades'], 2)
+        self.assertEqual(len(series_store.get(None, 'pnl')), 2)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class TradeIngestTests(TestCase):
+
+    def payload(self, trade_id, **extra):
+        return {
+            'trade_id': trade_id, 'timestamp': '2025-01-02T10:15:00+00:00', 'symbol': 'BTC/USDT',
+            'action': 'SELL', 'price': 42000.5, 'amount': 0.01, 'net_pnl': 3.2, 'result': '+1.25%', **extra,
+        }
+
+    def test_payload_mapping(self):
+        trade = trade_from_payload(self.payload('t-1'))
+
+        self.assertEqual(trade.bot_trade_id, 't-1')
+        self.assertEqual(trade.price, Decimal('42000.50'))
+        self.assertEqual(trade.profit_loss_pct, Decimal('1.25'))
+        self.assertEqual(trade.result, 'WIN')
+        self.assertIsNone(trade_from_payload({'action': 'HOLD', 'price': 1}))
+        # Without a bot id the same fill still hashes to the same id
+        no_id = {'timestamp': '2025-01-02T10:15:00', 'action': 'BUY', 'price': 1}
+        self.assertEqual(trade_from_payload(no_id).bot_trade_id, trade_from_payload(dict(no_id)).bot_trade_id)
+
+    def test_flush_deduplicates_in_one_bulk_insert(self):
+        Trade.objects.create(**{
+            field: getattr(trade_from_payload(self.payload('t-0')), field)
+            for field in ('bot_trade_id', 'timestamp', 'symbol', 'action', 'price', 'amount')
+        })
+        ingestor = TradeIngestor(batch_size=100, flush_interval=60)
+        for i in range(10):
+            ingestor.add(self.payload(f't-{i}'))
+        ingestor.add(self.payload('t-3'))
+        ingestor.add({'action': 'BUY'})
+
+        # id lookup + one INSERT + rollup read/insert, inside one transaction
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ingestor.flush(), 9)
+        self.assertEqual(sum('INTO "dashboard_trade" ' in q['sql'] for q in queries), 1)
+        self.assertEqual(Trade.objects.filter(bot_trade_id__startswith='t-').count(), 10)
+        self.assertEqual(ingestor.skipped, 2)
+        self.assertEqual(rollups.summary_totals('BTC/USDT')['total_trades'], 10)
+
+    def test_flushes_on_size_and_time(self):
+        ingestor = TradeIngestor(batch_size=3, flush_interval=60)
+        self.assertEqual(ingestor.add_many(self.payload(f't-{i}') for i in range(7)), 6)
+        self.assertEqual(len(ingestor), 1)
+
+        ingestor = TradeIngestor(batch_size=100, flush_interval=0)
+        self.assertTrue(ingestor.add(self.payload('t-9')))
+
+    def test_pairing_runs_off_the_flush_at_most_once_per_interval(self):
+        ingestor = TradeIngestor(batch_size=100, flush_interval=60, pairing_interval=60)
+        ingestor.add(self.payload('t-1', action='BUY', net_pnl=None, result=None))
+        with mock.patch.object(pairing, 'pair_trades', wraps=pairing.pair_trades) as pair_trades:
+            ingestor.flush()
+            pair_trades.assert_not_called()
+            self.assertEqual(ingestor.pair(), 1)
+
+            ingestor.add(self.payload('t-2'))
+            ingestor.flush()
+            self.assertEqual(ingestor.pair(), 0)
+            self.assertEqual(pair_trades.call_count, 1)
+            self.assertEqual(ingestor.pair(force=True), 1)
+            # Nothing flushed since, so nothing to pair
+            self.assertEqual(ingestor.pair(force=True), 0)
+            self.assertEqual(pair_trades.call_count, 2)
+        self.assertEqual(Trade.objects.get(bot_trade_id='t-2').entry_price, Decimal('42000.50'))
+
+    def test_decimals_are_clamped_to_the_columns(self):
+        trade = trade_from_payload(self.payload('t-1', result='+12345.678%', fee_paid='0.123456', amount=1e12))
+
+        self.assertEqual(trade.profit_loss_pct, Decimal('999.99'))
+        self.assertEqual(trade.fee_paid, Decimal('0.1235'))
+        self.assertEqual(trade.amount, Decimal('9999.999999'))
+        self.assertEqual(trade_from_payload(self.payload('t-2', profit_loss_pct=-5000)).profit_loss_pct,
+                         Decimal('-999.99'))
+
+    def test_failed_flush_keeps_the_batch(self):
+        ingestor = TradeIngestor(batch_size=100, flush_interval=60)
+        ingestor.add_many([self.payload('t-1'), self.payload('t-2')])
+
+        with mock.patch.object(rollups, 'apply_trades', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                ingestor.flush()
+        self.assertEqual(len(ingestor), 2)
+        self.assertFalse(Trade.objects.filter(bot_trade_id__startswith='t-').exists())
+
+        self.assertEqual(ingestor.flush(), 2)
+        self.assertEqual(rollups.summary_totals('BTC/USDT')['total_trades'], 2)
+
+    def test_rows_another_writer_inserts_are_not_counted_twice(self):
+        # Another process stores t-1, through save() so its rollup signal
+        # counts it, after the ingestor looked the ids up
+        trade_from_payload(self.payload('t-1')).save()
+        ingestor = TradeIngestor(batch_size=100, flush_interval=60)
+        ingestor.add_many(self.payload(f't-{i}') for i in range(3))
+        lookups = []
+        filter_trades = Trade.objects.filter
+
+        def stale_first_lookup(*args, **kwargs):
+            lookups.append(kwargs)
+            return Trade.objects.none() if len(lookups) == 1 else filter_trades(*args, **kwargs)
+
+        with mock.patch.object(Trade.objects, 'filter', side_effect=stale_first_lookup):
+            self.assertEqual(ingestor.flush(), 2)
+        self.assertEqual(Trade.objects.filter(bot_trade_id__startswith='t-').count(), 3)
+        self.assertEqual(rollups.summary_totals('BTC/USDT')['total_trades'], 3)
+
+    async def test_backfill_and_broadcasts_share_ids(self):
+        class RecentTrades:
+            async def get_recent_trades(client):
+                return [self.payload('t-1'), self.payload('t-2')]
+
+        ingestor = TradeIngestor(batch_size=100, flush_interval=0.01)
+        self.assertEqual(await ingestor.backfill(RecentTrades()), 2)
+
+        layer = get_channel_layer()
+        listener = asyncio.ensure_future(ingestor.listen(layer))
+        await asyncio.sleep(0.01)
+        await layer.group_send('dashboard', {
+            'type': 'bot_update', 'data': {'type': 'trade_executed', 'data': self.payload('t-2')},
+        })
+        await layer.group_send('dashboard', {
+            'type': 'dashboard_message', 'message_type': 'trade_executed', 'data': self.payload('t-3'),
+        })
+        await layer.group_send('dashboard', {'type': 'bot_update', 'data': {'type': 'price_update', 'data': {}}})
+        await asyncio.sleep(0.1)
+        listener.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await listener
+
+        self.assertEqual(ingestor.inserted, 3)
+        self.assertEqual(await Trade.objects.filter(bot_trade_id__startswith='t-').acount(), 3)
+
+    def test_bench_command_rolls_back(self):
+        out = io.StringIO()
+        call_command('bench_ingest', count=300, batch_size=50, per_row=20, stdout=out)
+
+        self.assertIn('trades/s', out.getvalue())
+        self.assertFalse(Trade.objects.filter(bot_trade_id__startswith='bench-').exists())
+
+
+class AnalyticsRouterTests(TestCase):
+
+    def test_analytics_reads_use_the_analytics_connection(self):
+        router = AnalyticsRouter()
+        self.assertIsNone(router.db_for_read(Trade))
+        with analytics_reads():
+            # TestCase wraps each test in a transaction on 'default'
+            self.assertEqual(router.db_for_read(Trade), 'default')
+            with mock.patch.object(connections['default'], 'in_atomic_block', False):
+                self.assertEqual(router.db_for_read(Trade), 'analytics')
+                self.assertIsNone(router.db_for_write(Trade))
+        self.assertFalse(router.allow_migrate('analytics', 'dashboard'))
+        self.assertTrue(router.allow_migrate('default', 'dashboard'))
+
+
+class AnalyticsRoutingQueryTests(TransactionTestCase):
+    # No wrapping transaction on 'default', so reads really are routed
+    databases = {'default', 'analytics'}
+
+    def test_reads_run_on_the_analytics_mirror(self):
+        trade = Trade.objects.create(symbol='BTC/USDT', action='BUY', price=Decimal('100'), amount=Decimal('1'))
+
+        with CaptureQueriesContext(connections['analytics']) as analytics, \
+                CaptureQueriesContext(connections['default']) as default:
+            with analytics_reads():
+                self.assertEqual(list(Trade.objects.values_list('id', flat=True)), [trade.pk])
+            response = self.client.get('/order-history/', {'symbol': 'BTC/USDT'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '100')
+        self.assertGreaterEqual(len(analytics), 2)
+        self.assertFalse([q for q in default if 'dashboard_trade' in q['sql']])
+
+
+class TradePairingTests(TestCase):
+
+    def setUp(self):
+        self.start = timezone.now() - timedelta(days=1)
+
+    def trade(self, action, amount, price, hours, fee='0', **extra):
+        return Trade.objects.create(
+            symbol='BTC/USDT', action=action, amount=Decimal(amount), price=Decimal(price),
+            fee_paid=Decimal(fee), timestamp=self.start + timedelta(hours=hours), **extra,
+        )
+
+    def test_fifo_lots_with_partial_fills(self):
+        self.trade('BUY', '1', '100', 0, fee='0.1')
+        self.trade('BUY', '1', '110', 1, fee='0.1')
+        first = self.trade('SELL', '1.5', '120', 2, fee='0.3')
+        call_command('pair_trades', stdout=io.StringIO())
+
+        first.refresh_from_db()
+        self.assertEqual(first.entry_price, Decimal('103.33'))
+        self.assertEqual(first.exit_price, Decimal('120'))
+        self.assertEqual(first.net_pnl, Decimal('24.55'))
+        self.assertEqual(first.profit_loss_pct, Decimal('16.13'))
+        self.assertEqual(first.duration_minutes, 100)
+        self.assertEqual(first.result, 'WIN')
+        lots = TradePairingState.objects.get(symbol='BTC/USDT').open_lots
+        self.assertEqual([Decimal(value) for value in lots[0][:2]], [Decimal('0.5'), Decimal('110')])
+
+        # Only the rest of the second lot is left to close
+        second = self.trade('SELL', '1', '90', 3)
+        engine, updated = pairing.pair_trades()
+        second.refresh_from_db()
+        self.assertEqual((updated, engine.matched), (1, 1))
+        self.assertEqual(second.entry_price, Decimal('110'))
+        self.assertEqual(second.net_pnl, Decimal('-10.05'))
+        self.assertEqual(second.duration_minutes, 120)
+        self.assertEqual(second.result, 'LOSS')
+        # bulk_update skips the signals, so the rollups are recomputed
+        hour = TradeRollup.objects.get(granularity='hour', bucket_start=rollups.bucket_start(second.timestamp, 'hour'))
+        self.assertEqual((hour.net_pnl, hour.losses), (Decimal('-10.05'), 1))
+
+    def test_reported_values_are_kept_and_watermark_is_respected(self):
+        self.trade('BUY', '1', '100', 0)
+        sell = self.trade('SELL', '1', '105', 1, net_pnl=Decimal('4.00'))
+        pairing.pair_trades()
+        sell.refresh_from_db()
+        self.assertEqual(sell.net_pnl, Decimal('4.00'))
+        self.assertEqual(sell.entry_price, Decimal('100'))
+
+        Trade.objects.filter(pk=sell.pk).update(entry_price=None)
+        self.assertEqual(pairing.pair_trades()[1], 0)
+        self.assertEqual(pairing.pair_trades(full=True)[1], 1)
+        sell.refresh_from_db()
+        self.assertEqual(sell.entry_price, Decimal('100'))
+
+    def test_trades_stored_behind_the_watermark_are_paired(self):
+        self.trade('BUY', '1', '100', 0)
+        later = self.trade('SELL', '1', '120', 5)
+        pairing.pair_trades()
+
+        # A backfill stores an older round trip after the run
+        self.trade('BUY', '1', '90', 1)
+        backfilled = self.trade('SELL', '1', '95', 2)
+        with CaptureQueriesContext(connection) as queries:
+            engine, updated = pairing.pair_trades()
+
+        # The run row is written first, so runs queue behind each other
+        statements = [q['sql'] for q in queries if 'SAVEPOINT' not in q['sql']]
+        self.assertTrue(statements[0].startswith('UPDATE "dashboard_tradepairingrun"'))
+        backfilled.refresh_from_db()
+        later.refresh_from_db()
+        # The backfilled BUY and SELL, and the later SELL paired again
+        self.assertEqual(updated, 3)
+        self.assertEqual((backfilled.entry_price, backfilled.net_pnl), (Decimal('100'), Decimal('-5.00')))
+        # Replayed from the first trade, the later SELL closes the backfilled lot
+        self.assertEqual((later.entry_price, later.net_pnl, later.duration_minutes), (Decimal('90'), Decimal('30.00'), 240))
+        self.assertEqual(TradePairingState.objects.get(symbol='BTC/USDT').open_lots, [])
+        self.assertEqual(pairing.pair_trades()[1], 0)
+
+    def test_late_buy_repairs_the_values_pairing_filled(self):
+        self.trade('BUY', '1', '100', 0)
+        sell = self.trade('SELL', '1', '110', 2)
+        pairing.pair_trades()
+        sell.refresh_from_db()
+        self.assertEqual((sell.entry_price, sell.net_pnl), (Decimal('100'), Decimal('10.00')))
+        self.assertEqual(sell.paired_fields, pairing.PAIRED_FIELDS)
+
+        # An earlier BUY arrives late, so FIFO now closes it first
+        self.trade('BUY', '1', '50', -1)
+        for full in (False, True):
+            pairing.pair_trades(full=full)
+            sell.refresh_from_db()
+            self.assertEqual((sell.entry_price, sell.net_pnl), (Decimal('50'), Decimal('60.00')))
+            self.assertEqual(sell.profit_loss_pct, Decimal('120.00'))
+        hour = TradeRollup.objects.get(granularity='hour', bucket_start=rollups.bucket_start(sell.timestamp, 'hour'))
+        self.assertEqual(hour.net_pnl, Decimal('60.00'))
+
+    def test_sell_without_open_buy_is_left_alone(self):
+        sell = self.trade('SELL', '1', '105', 0)
+        engine, updated = pairing.pair_trades()
+
+        self.assertEqual((updated, engine.unmatched), (0, 1))
+        sell.refresh_from_db()
+        self.assertIsNone(sell.net_pnl)
+
+
+class PnLSeriesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        series_store.clear()
+
+    def test_downsampling_keeps_extremes(self):
+        rng = np.random.default_rng(0)
+        x = np.arange(100000, dtype=float)
+        y = np.cumsum(rng.normal(size=len(x)))
+        y[54321] = 1000
+        y[12345] = -1000
+
+        picked = lttb(x, y, 200)
+        self.assertEqual(len(picked), 200)
+        self.assertTrue(np.all(np.diff(picked) > 0))
+        self.assertIn(54321, picked)
+        self.assertIn(12345, picked)
+        reduced_x, reduced_y = minmax_reduce(x, y, 8)
+        self.assertLess(len(reduced_x), len(x) / 3)
+        self.assertEqual((reduced_y.max(), reduced_y.min()), (1000, -1000))
+
+        levels = SeriesLevels(x, y)
+        self.assertGreater(len(levels.levels), 3)
+        whole = levels.query(points=500)
+        self.assertEqual(len(whole['time']), 500)
+        self.assertGreater(whole['level'], 0)
+        self.assertEqual(whole['total'], 100000)
+        self.assertIn(1000, whole['value'])
+        zoomed = levels.query(50000, 50999, points=2000)
+        self.assertEqual((zoomed['level'], zoomed['total'], len(zoomed['time'])), (0, 1000, 1000))
+
+    def test_endpoint_follows_new_trades(self):
+        start = (timezone.now() - timedelta(days=5)).replace(microsecond=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            for day, pnl in enumerate(['5', '-2', '4']):
+                Trade.objects.create(
+                    symbol='BTC/USDT', action='SELL', price=Decimal('1'), amount=Decimal('1'),
+                    net_pnl=Decimal(pnl), timestamp=start + timedelta(days=day),
+                )
+
+        data = self.client.get('/api/series/', {'symbol': 'BTC/USDT'}).json()
+        self.assertEqual(data['value'], [5, 3, 7])
+        self.assertEqual(data['time'][0], int(start.timestamp() * 1000))
+        data = self.client.get('/api/series/', {'kind': 'pnl', 'start': int(start.timestamp()) + 3600}).json()
+        self.assertEqual(data['value'], [-2, 4])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Trade.objects.create(symbol='BTC/USDT', action='SELL', price=Decimal('1'), amount=Decimal('1'),
+                                 net_pnl=Decimal('1'))
+        data = self.client.get('/api/series/', {'symbol': 'BTC/USDT'}).json()
+        self.assertEqual(data['value'], [5, 3, 7, 8])
+        self.assertEqual(self.client.get('/api/series/', {'kind': 'ohlc'}).status_code, 400)
+
+    def test_new_trades_are_appended_and_edits_reload(self):
+        start = timezone.now() - timedelta(days=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Trade.objects.create(symbol='BTC/USDT', action='SELL', price=Decimal('1'), amount=Decimal('1'),
+                                         net_pnl=Decimal('5'), timestamp=start)
+        self.assertEqual(series_store.get('BTC/USDT', 'equity').query()['value'], [5])
+
+        with mock.patch('dashboard.series.load_columns', wraps=series.load_columns) as load:
+            with self.captureOnCommitCallbacks(execute=True):
+                Trade.objects.create(symbol='BTC/USDT', action='SELL', price=Decimal('1'), amount=Decimal('1'),
+                                     net_pnl=Decimal('2'), timestamp=start + timedelta(days=1))
+            self.assertEqual(series_store.get('BTC/USDT', 'equity').query()['value'], [5, 7])
+            # Only the new trade was read
+            self.assertEqual(load.call_args.args[0].count(), 1)
+            # Unchanged generation: served from memory
+            series_store.get('BTC/USDT', 'pnl')
+            self.assertEqual(load.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                first.net_pnl = Decimal('1')
+                first.save()
+            self.assertEqual(series_store.get('BTC/USDT', 'equity').query()['value'], [1, 3])
+            self.assertEqual(load.call_args.args[0].count(), 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                first.delete()
+            self.assertEqual(series_store.get('BTC/USDT', 'pnl').query()['value'], [2])
+
+
+class SeedAndBenchViewsTests(TestCase):
+    databases = {'default', 'analytics'}
+
+    def test_seed_trades_pairs_buys_and_sells(self):
+        call_command('seed_trades', rows=200, symbols=['BTC/USDT', 'ETH/USDT'], stdout=io.StringIO())
+
+        self.assertEqual(Trade.objects.count(), 200)
+        sells = Trade.objects.filter(action='SELL')
+        self.assertTrue(sells.exists())
+        self.assertFalse(sells.filter(Q(entry_price=None) | Q(exit_price=None) | Q(result=None)).exists())
+        self.assertEqual(TradeRollup.objects.filter(granularity='day').aggregate(n=Sum('trade_count'))['n'], 200)
+
+    def test_bench_views_writes_results_and_rolls_back(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'results.json')
+            call_command('bench_views', sizes=[100], repeat=1, output=output, stdout=io.StringIO())
+            with open(output) as f:
+                report = json.load(f)
+
+        cases = {r['case']: r for r in report['results']}
+        self.assertEqual(cases['order_history_csv']['queries'], 1)
+        self.assertGreater(cases['order_history']['bytes'], 0)
+        self.assertFalse(Trade.objects.exists())
+
+
+class MetricsTests(TestCase):
+
+    def test_histogram_text_format(self):
+        histogram = metrics.Histogram('x_seconds', 'X', ['view'], buckets=(0.1, 1))
+        histogram.observe(0.05, 'a"b')
+        histogram.observe(5, 'a"b')
+
+        self.assertEqual(histogram.render(), [
+            '# HELP x_seconds X',
+            '# TYPE x_seconds histogram',
+            'x_seconds_bucket{view="a\\"b",le="0.1"} 1',
+            'x_seconds_bucket{view="a\\"b",le="1"} 1',
+            'x_seconds_bucket{view="a\\"b",le="+Inf"} 2',
+            'x_seconds_sum{view="a\\"b"} 5.05',
+            'x_seconds_count{view="a\\"b"} 2',
+        ])
+
+    def test_views_record_latency_queries_and_templates(self):
+        make_trades(3)
+        requests_before = metrics.http_requests.value('api_trades', 'GET', '200')
+        queries_before = metrics.request_db_queries.count('order_history')
+        self.client.get('/api/trades/')
+        self.client.get('/order-history/')
+
+        self.assertEqual(metrics.http_requests.value('api_trades', 'GET', '200'), requests_before + 1)
+        self.assertEqual(metrics.request_db_queries.count('order_history'), queries_before + 1)
+        series = metrics.request_db_queries._values[('order_history',)]
+        self.assertGreater(series[1], 0)  # sum of queries
+        self.assertGreater(metrics.template_render_time.count('order_history.html'), 0)
+
+        # Streamed exports are recorded once the body has been sent
+        exports_before = metrics.request_db_queries.count('order_history')
+        sum_before = metrics.request_db_queries._values[('order_history',)][1]
+        response = self.client.get('/order-history/', {'export': 'csv'})
+        self.assertEqual(metrics.request_db_queries.count('order_history'), exports_before)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+        self.assertEqual(metrics.request_db_queries.count('order_history'), exports_before + 1)
+        self.assertGreater(metrics.request_db_queries._values[('order_history',)][1], sum_before)
+        response.close()
+        self.assertEqual(metrics.request_db_queries.count('order_history'), exports_before + 1)
+
+        response = self.client.get('/metrics')
+        body = response.content.decode()
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('dashboard_http_requests_total{view="api_trades",method="GET",status="200"}', body)
+        self.assertIn('# TYPE dashboard_request_db_seconds histogram', body)
+        self.assertIn('dashboard_relay_peak_depth', body)
@@ -9,8 +9,14 @@ urlpatterns = [
     path('controls/', views.controls_view, name='controls'),
     path('logs/', views.logs_view, name='logs'),
     path('terminal/', views.trading_terminal_view, name='trading_terminal'),
+    path('metrics', views.metrics_view, name='metrics'),
     
     # API endpoints
     path('api/status/', views.api_status, name='api_status'),
     path('api/logs/', views.api_logs, name='api_logs'),
+    path('api/relay-stats/', views.api_relay_stats, name='api_relay_stats'),
+    path('api/trades/', views.api_trades, name='api_trades'),
+    path('api/analytics/', views.api_analytics, name='api_analytics'),
+    path('api/series/', views.api_series, name='api_series'),
+    path('api/candles/<str:symbol>/<str:timeframe>/', views.api_candles, name='api_candles'),
 ]
\ No newline at end of file
@@ -1,113 +1,124 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.db.models import Q, Sum, Avg, Count, Max, Min
+from django.conf import settings
+from django.db.models import Q, F, Sum, Avg, Count, Max, Min, Window, Case, When, FloatField
+from django.db.models.functions import Cast, Round, RowNumber
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from datetime import datetime, timedelta
 from decimal import Decimal
-from .api_client import BotAPIClient
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from . import analytics, rollups
+from .api_client import AsyncBotAPIClient, BotAPIClient, fetch_concurrently
+from .candles import TIMEFRAMES, candle_store, normalize_timeframe
+from .db_routers import uses_analytics_db
 import csv
+from .log_tail import filter_log_lines, find_latest_log, log_tailer
+from .metrics import registry
 from .models import Trade, BotSettings
-import os
-import re
+from .relay import relay_metrics
+from .series import SERIES_KINDS, series_store
+from .state import dashboard_state
+from .pagination import KeysetPaginator, cached_count
 import json
 
 
-def dashboard_view(request):
+def parse_date_range(from_date, to_date):
+    """Turn YYYY-MM-DD strings into a half-open [start, end) datetime range.
+    
+    Either end is None when missing or invalid.
+    """
+    current_tz = timezone.get_current_timezone()
+    start = end = None
+    
+    if from_date:
+        try:
+            start = timezone.make_aware(datetime.strptime(from_date, '%Y-%m-%d'), current_tz)
+        except ValueError:
+            pass
+    
+    if to_date:
+        try:
+            end = datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)
+            end = timezone.make_aware(end, current_tz)
+        except ValueError:
+            pass
+    
+    return start, end
+
+
+def filter_date_range(trades_qs, from_date, to_date):
+    """Filter trades to whole days given as YYYY-MM-DD strings.
+    
+    Days become half-open timestamp ranges rather than ``timestamp__date``
+    lookups, which wrap the column in a function and defeat its indexes.
+    Invalid dates are ignored.
+    """
+    start, end = parse_date_range(from_date, to_date)
+    
+    if start is not None:
+        trades_qs = trades_qs.filter(timestamp__gte=start)
+    
+    if end is not None:
+        trades_qs = trades_qs.filter(timestamp__lt=end)
+    
+    return trades_qs
+
+
+async def dashboard_view(request):
     """Main dashboard view"""
-    api_client = BotAPIClient()
+    api_client = AsyncBotAPIClient()
+    deadline = getattr(settings, 'BOT_API_PAGE_DEADLINE', 5)
     
-    # Fetch data from bot API
-    bot_status = api_client.get_status()
-    stats = api_client.get_stats()
-    recent_trades_api = api_client.get_recent_trades()
+    # Fetch data from bot API concurrently; slow calls fall back to empty
+    results = await fetch_concurrently({
+        'bot_status': (api_client.get_status(timeout=deadline), None),
+        'stats': (api_client.get_stats(timeout=deadline), None),
+        'recent_trades': (api_client.get_recent_trades(timeout=deadline), []),
+    }, deadline)
     
     # Get recent trades from API (last 5)
+    recent_trades_api = results['recent_trades']
     recent_trades = recent_trades_api[:5] if recent_trades_api else []
     
     context = {
-        'bot_status': bot_status,
-        'stats': stats,
+        'bot_status': results['bot_status'],
+        'stats': results['stats'],
         'recent_trades': recent_trades,
         'page_title': 'Dashboard',
     }
     
-    return render(request, 'dashboard.html', context)
+    return await sync_to_async(render)(request, 'dashboard.html', context)
 
 
 def trades_view(request):
-    """Trade history view with filtering"""
-    # Start with all trades (last 100)
-    trades = Trade.objects.all()[:100]
-    
-    # Apply filters if provided
-    from_date = request.GET.get('from_date')
-    to_date = request.GET.get('to_date')
-    action = request.GET.get('action')
-    result = request.GET.get('result')
-    
-    if from_date:
-        try:
-            from_date_obj = datetime.strptime(from_date, '%Y-%m-%d').date()
-            trades = trades.filter(timestamp__date__gte=from_date_obj)
-        except ValueError:
-            pass
-    
-    if to_date:
-        try:
-            to_date_obj = datetime.strptime(to_date, '%Y-%m-%d').date()
-            trades = trades.filter(timestamp__date__lte=to_date_obj)
-        except ValueError:
-            pass
-    
-    if action and action in ['BUY', 'SELL']:
-        trades = trades.filter(action=action)
-    
-    if result and result in ['WIN', 'LOSS']:
-        trades = trades.filter(result=result)
+    """Trade history view with filtering.
     
+    Renders the filter form only; the table is loaded page by page from
+    api_trades so any depth of history is reachable.
+    """
     context = {
-        'trades': trades,
-        'total_trades': trades.count(),
         'page_title': 'Trade History',
         'filters': {
-            'from_date': from_date,
-            'to_date': to_date,
-            'action': action,
-            'result': result,
+            'from_date': request.GET.get('from_date'),
+            'to_date': request.GET.get('to_date'),
+            'action': request.GET.get('action'),
+            'result': request.GET.get('result'),
         }
     }
     
     return render(request, 'trades.html', context)
 
 
-def order_history_view(request):
-    """Detailed order history view with advanced filtering and statistics"""
-    # Get filter parameters
-    from_date = request.GET.get('from_date')
-    to_date = request.GET.get('to_date')
-    trade_type = request.GET.get('trade_type')  # BUY or SELL
-    result = request.GET.get('result')  # WIN or LOSS
-    symbol = request.GET.get('symbol', 'BTC/USDT')
-    
+def order_history_queryset(symbol, from_date=None, to_date=None, trade_type=None, result=None):
+    """Filtered, newest-first trades; a falsy symbol means all symbols"""
     # Start with all trades for the symbol
-    trades_qs = Trade.objects.filter(symbol=symbol)
+    trades_qs = Trade.objects.filter(symbol=symbol) if symbol else Trade.objects.all()
     
     # Apply date filters
-    if from_date:
-        try:
-            from_date_obj = datetime.strptime(from_date, '%Y-%m-%d').date()
-            trades_qs = trades_qs.filter(timestamp__date__gte=from_date_obj)
-        except ValueError:
-            pass
-    
-    if to_date:
-        try:
-            to_date_obj = datetime.strptime(to_date, '%Y-%m-%d').date()
-            trades_qs = trades_qs.filter(timestamp__date__lte=to_date_obj)
-        except ValueError:
-            pass
+    trades_qs = filter_date_range(trades_qs, from_date, to_date)
     
     # Apply type and result filters
     if trade_type and trade_type in ['BUY', 'SELL']:
@@ -117,11 +128,152 @@ def order_history_view(request):
         trades_qs = trades_qs.filter(result=result)
     
     # Order by timestamp descending
-    trades_qs = trades_qs.order_by('-timestamp')
+    return trades_qs.order_by('-timestamp')
+
+
+def order_history_summary(trades_qs, top=5, totals=None):
+    """Summary statistics plus the top best/worst trades in two queries.
+    
+    Totals and averages come from a single aggregate, or from ``totals``
+    when the caller already has them (e.g. from the rollups); the best and
+    worst trades by net P&L come from one ranked query (two row-number
+    windows) instead of separate ordered lookups.
+    
+    Returns (summary_stats, best_trades, worst_trades).
+    """
+    agg = totals
+    if agg is None:
+        agg = trades_qs.aggregate(
+            total_trades=Count('id'),
+            total_volume=Sum('amount'),
+            total_fees=Sum('fee_paid'),
+            net_pnl=Sum('net_pnl'),
+            avg_duration=Avg('duration_minutes'),
+        )
+    
+    summary_stats = {
+        'total_trades': agg['total_trades'],
+        'total_volume': agg['total_volume'] or Decimal('0.00'),
+        'total_fees_paid': agg['total_fees'] or Decimal('0.00'),
+        'net_pnl': agg['net_pnl'] or Decimal('0.00'),
+        'avg_trade_duration': int(agg['avg_duration']) if agg['avg_duration'] else None,
+        'best_trade': None,
+        'worst_trade': None,
+    }
+    
+    if not agg['total_trades']:
+        return summary_stats, [], []
+    
+    ranked = list(
+        trades_qs.filter(net_pnl__isnull=False)
+        .annotate(
+            best_rank=Window(RowNumber(), order_by=[F('net_pnl').desc(), F('timestamp').desc()]),
+            worst_rank=Window(RowNumber(), order_by=[F('net_pnl').asc(), F('timestamp').desc()]),
+        )
+        .filter(Q(best_rank__lte=top) | Q(worst_rank__lte=top))
+    )
+    best_trades = sorted((t for t in ranked if t.best_rank <= top), key=lambda t: t.best_rank)
+    worst_trades = sorted((t for t in ranked if t.worst_rank <= top), key=lambda t: t.worst_rank)
+    
+    summary_stats['best_trade'] = best_trades[0] if best_trades else None
+    summary_stats['worst_trade'] = worst_trades[0] if worst_trades else None
+    
+    return summary_stats, best_trades, worst_trades
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() returns the row instead of storing it"""
+    
+    def write(self, value):
+        return value
+
+
+ORDER_HISTORY_CSV_HEADER = [
+    'ID', 'Timestamp', 'Symbol', 'Type', 'Entry Price', 'Exit Price', 'Amount', 'Fee Paid',
+    'Duration (min)', 'Net PnL ($)', 'ROI (%)', 'Status', 'Result', 'Notes'
+]
+
+
+def order_history_csv_chunks(trades_qs, chunk_size=2000):
+    """Yield the order history CSV in chunks of rows.
+    
+    Rows are fetched from a server-side iterator as plain tuples with ROI
+    computed in SQL, so memory stays flat regardless of the export size.
+    """
+    entry = Cast('entry_price', FloatField())
+    roi = Case(
+        When(
+            Q(entry_price__isnull=False) & Q(exit_price__isnull=False) & ~Q(entry_price=0),
+            then=Round((Cast('exit_price', FloatField()) - entry) * 100.0 / entry, 2),
+        ),
+        default=None,
+        output_field=FloatField(),
+    )
+    rows = trades_qs.annotate(roi=roi).values_list(
+        'id', 'timestamp', 'symbol', 'action', 'entry_price', 'exit_price', 'amount',
+        'fee_paid', 'duration_minutes', 'net_pnl', 'roi', 'result', 'notes',
+    ).iterator(chunk_size=chunk_size)
+    
+    writer = csv.writer(Echo())
+    chunk = [writer.writerow(ORDER_HISTORY_CSV_HEADER)]
+    for (trade_id, timestamp, symbol, action, entry_price, exit_price, amount,
+         fee_paid, duration, net_pnl, roi, result, notes) in rows:
+        chunk.append(writer.writerow([
+            trade_id,
+            timestamp.strftime('%Y-%m-%d %H:%M:%S') if timestamp else '',
+            symbol,
+            action,
+            entry_price,
+            exit_price,
+            amount,
+            fee_paid,
+            duration,
+            net_pnl,
+            f'{roi:.2f}' if roi is not None else '',
+            'CLOSED' if exit_price is not None else 'OPEN',
+            result,
+            (notes or '').replace('\n', ' ').strip(),
+        ]))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream_csv_response(request, chunks):
+    """Stream CSV chunks to the client as they are produced.
+    
+    Under ASGI, Django buffers sync iterators into a list before sending, so
+    the chunks are pulled one at a time through sync_to_async instead.
+    """
+    if isinstance(request, ASGIRequest):
+        async def async_chunks():
+            while True:
+                chunk = await sync_to_async(next, thread_sensitive=True)(chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        content = async_chunks()
+    else:
+        content = chunks
+    return StreamingHttpResponse(content, content_type='text/csv')
+
+
+@uses_analytics_db
+def order_history_view(request):
+    """Detailed order history view with advanced filtering and statistics"""
+    # Get filter parameters
+    from_date = request.GET.get('from_date')
+    to_date = request.GET.get('to_date')
+    trade_type = request.GET.get('trade_type')  # BUY or SELL
+    result = request.GET.get('result')  # WIN or LOSS
+    symbol = request.GET.get('symbol', 'BTC/USDT')
+    
+    trades_qs = order_history_queryset(symbol, from_date, to_date, trade_type, result)
 
     # CSV export of all filtered trades
     if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
         filename_parts = [
             'order_history',
             (from_date or 'start'),
@@ -130,78 +282,28 @@ def order_history_view(request):
             (result or 'ALL').lower() if result else 'all',
             (symbol or 'all').replace('/', '-')
         ]
+        # Rows are read after the view returns; pin the analytics database now
+        response = stream_csv_response(request, order_history_csv_chunks(trades_qs.using(trades_qs.db)))
         response['Content-Disposition'] = f"attachment; filename={'_'.join(filename_parts)}.csv"
-        writer = csv.writer(response)
-        writer.writerow([
-            'ID', 'Timestamp', 'Symbol', 'Type', 'Entry Price', 'Exit Price', 'Amount', 'Fee Paid',
-            'Duration (min)', 'Net PnL ($)', 'ROI (%)', 'Status', 'Result', 'Notes'
-        ])
-        for t in trades_qs:
-            try:
-                roi = t.calculate_roi()
-            except Exception:
-                roi = None
-            status = getattr(t, 'status', 'UNKNOWN')
-            writer.writerow([
-                getattr(t, 'id', ''),
-                t.timestamp.strftime('%Y-%m-%d %H:%M:%S') if getattr(t, 'timestamp', None) else '',
-                getattr(t, 'symbol', ''),
-                getattr(t, 'action', ''),
-                getattr(t, 'entry_price', ''),
-                getattr(t, 'exit_price', ''),
-                getattr(t, 'amount', ''),
-                getattr(t, 'fee_paid', ''),
-                getattr(t, 'duration_minutes', ''),
-                getattr(t, 'net_pnl', ''),
-                round(roi, 4) if roi is not None else '',
-                status,
-                getattr(t, 'result', ''),
-                (getattr(t, 'notes', '') or '').replace('\n', ' ').strip(),
-            ])
         return response
     
-    # Calculate summary statistics
-    total_trades = trades_qs.count()
-    
-    summary_stats = {
-        'total_trades': total_trades,
-        'total_volume': Decimal('0.00'),
-        'total_fees_paid': Decimal('0.00'),
-        'net_pnl': Decimal('0.00'),
-        'avg_trade_duration': None,
-        'best_trade': None,
-        'worst_trade': None,
-    }
-    
-    if total_trades > 0:
-        # Aggregate statistics
-        agg = trades_qs.aggregate(
-            total_volume=Sum('amount'),
-            total_fees=Sum('fee_paid'),
-            net_pnl=Sum('net_pnl'),
-            avg_duration=Avg('duration_minutes'),
-        )
-        
-        summary_stats['total_volume'] = agg['total_volume'] or Decimal('0.00')
-        summary_stats['total_fees_paid'] = agg['total_fees'] or Decimal('0.00')
-        summary_stats['net_pnl'] = agg['net_pnl'] or Decimal('0.00')
-        summary_stats['avg_trade_duration'] = int(agg['avg_duration']) if agg['avg_duration'] else None
-        
-        # Find best and worst trades (by net P&L)
-        best = trades_qs.filter(net_pnl__isnull=False).order_by('-net_pnl').first()
-        worst = trades_qs.filter(net_pnl__isnull=False).order_by('net_pnl').first()
-        
-        summary_stats['best_trade'] = best
-        summary_stats['worst_trade'] = worst
+    # Symbol + date range summaries can be answered from the rollups
+    totals = None
+    if not trade_type and not result:
+        totals = rollups.summary_totals(symbol, *parse_date_range(from_date, to_date))
     
-    # Top 5 best/worst from current filters
-    best_trades = list(trades_qs.filter(net_pnl__isnull=False).order_by('-net_pnl')[:5])
-    worst_trades = list(trades_qs.filter(net_pnl__isnull=False).order_by('net_pnl')[:5])
+    # Summary statistics and top 5 best/worst from current filters
+    summary_stats, best_trades, worst_trades = order_history_summary(trades_qs, totals=totals)
 
-    # Paginate trades (50 per page)
-    paginator = Paginator(trades_qs, 50)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Paginate trades (50 per page) with (timestamp, id) cursors
+    paginator = KeysetPaginator(trades_qs, 50)
+    page_obj = paginator.get_page(request.GET.get('cursor'), total=summary_stats['total_trades'])
+    filter_query = urlencode({
+        key: value for key, value in [
+            ('from_date', from_date), ('to_date', to_date), ('trade_type', trade_type),
+            ('result', result), ('symbol', symbol),
+        ] if value
+    })
     
     context = {
         'trades': page_obj,
@@ -213,6 +315,7 @@ def order_history_view(request):
             'result': result,
             'symbol': symbol,
         },
+        'filter_query': filter_query,
         'best_trades': best_trades,
         'worst_trades': worst_trades,
         'page_title': 'Order History',
@@ -291,21 +394,24 @@ def controls_view(request):
     return render(request, 'controls.html', context)
 
 
-def trading_terminal_view(request):
+async def trading_terminal_view(request):
     """Professional trading terminal view"""
-    api_client = BotAPIClient()
+    api_client = AsyncBotAPIClient()
+    deadline = getattr(settings, 'BOT_API_PAGE_DEADLINE', 5)
     
-    # Fetch data from bot API
-    bot_status = api_client.get_status()
-    stats = api_client.get_stats()
+    # Fetch data from bot API concurrently
+    results = await fetch_concurrently({
+        'bot_status': (api_client.get_status(timeout=deadline), None),
+        'stats': (api_client.get_stats(timeout=deadline), None),
+    }, deadline)
     
     context = {
-        'bot_status': bot_status,
-        'stats': stats,
+        'bot_status': results['bot_status'],
+        'stats': results['stats'],
         'page_title': 'Trading Terminal',
     }
     
-    return render(request, 'trading_terminal.html', context)
+    return await sync_to_async(render)(request, 'trading_terminal.html', context)
 
 
 def logs_view(request):
@@ -313,20 +419,13 @@ def logs_view(request):
     log_lines = []
     
     try:
-        # Read from the most recent log file
-        log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'crypto-trading-bot', 'logs')
-        log_files = [f for f in os.listdir(log_dir) if f.endswith('.log')]
+        # Read the tail of the most recent log file
+        log_path = find_latest_log()
         
-        if log_files:
-            latest_log = max(log_files, key=lambda f: os.path.getctime(os.path.join(log_dir, f)))
-            log_path = os.path.join(log_dir, latest_log)
-            
-            with open(log_path, 'r', encoding='utf-8') as f:
-                all_lines = f.readlines()
-                # Get last 100 lines
-                log_lines = all_lines[-100:] if len(all_lines) > 100 else all_lines
-                # Reverse to show newest first
-                log_lines.reverse()
+        if log_path:
+            # Get last 100 lines, newest first
+            log_lines = [line.raw for line in log_tailer.tail(log_path, 100)]
+            log_lines.reverse()
     except Exception as e:
         log_lines = [f"Error reading log files: {str(e)}"]
     
@@ -340,10 +439,10 @@ def logs_view(request):
 
 # API Endpoints for AJAX calls
 
-def api_status(request):
+async def api_status(request):
     """API endpoint for bot status"""
-    api_client = BotAPIClient()
-    status = api_client.get_status()
+    api_client = AsyncBotAPIClient()
+    status = await api_client.get_status() or {}
     
     return JsonResponse({
         'bot_running': status.get('bot_running', False),
@@ -353,9 +452,23 @@ def api_status(request):
     })
 
 
+def api_relay_stats(request):
+    """API endpoint for the dashboard WebSocket send-queue and snapshot metrics"""
+    return JsonResponse({**relay_metrics.snapshot(), **dashboard_state.counters()})
+
+
+async def metrics_view(request):
+    """Prometheus text-format metrics (async, so a scrape never waits for a worker thread)"""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def api_logs(request):
     """API endpoint for bot logs"""
-    lines_count = int(request.GET.get('lines', 100))
+    try:
+        lines_count = int(request.GET.get('lines', 100))
+    except ValueError:
+        lines_count = 100
+    lines_count = max(1, min(lines_count, getattr(settings, 'BOT_LOG_MAX_LINES', 5000)))
     level_filter = request.GET.get('level', '')
     search_filter = request.GET.get('search', '')
     
@@ -363,68 +476,16 @@ def api_logs(request):
     stats = {'total': 0, 'info': 0, 'warning': 0, 'error': 0}
     
     try:
-        # Read from the most recent log file
-        log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'crypto-trading-bot', 'logs')
+        # Read the tail of the most recent log file
+        log_path = find_latest_log()
         
-        if os.path.exists(log_dir):
-            log_files = [f for f in os.listdir(log_dir) if f.endswith('.log')]
+        if log_path:
+            logs, stats = filter_log_lines(
+                log_tailer.tail(log_path, lines_count), level_filter, search_filter
+            )
             
-            if log_files:
-                latest_log = max(log_files, key=lambda f: os.path.getctime(os.path.join(log_dir, f)))
-                log_path = os.path.join(log_dir, latest_log)
-                
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    all_lines = f.readlines()
-                    
-                    # Get last N lines
-                    recent_lines = all_lines[-lines_count:] if len(all_lines) > lines_count else all_lines
-                    
-                    for line in recent_lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                            
-                        # Parse log line (assuming format: YYYY-MM-DD HH:MM:SS - LEVEL - MESSAGE)
-                        log_match = re.match(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ - (\w+) - (.+)', line)
-                        
-                        if log_match:
-                            timestamp, level, message = log_match.groups()
-                            
-                            # Apply level filter
-                            if level_filter and level != level_filter:
-                                continue
-                                
-                            # Apply search filter
-                            if search_filter and search_filter.lower() not in message.lower():
-                                continue
-                            
-                            logs.append({
-                                'time': timestamp,
-                                'level': level,
-                                'message': message
-                            })
-                            
-                            # Update stats
-                            stats['total'] += 1
-                            if level == 'INFO':
-                                stats['info'] += 1
-                            elif level == 'WARNING':
-                                stats['warning'] += 1
-                            elif level in ['ERROR', 'CRITICAL']:
-                                stats['error'] += 1
-                        else:
-                            # Fallback for lines that don't match the expected format
-                            if not level_filter and (not search_filter or search_filter.lower() in line.lower()):
-                                logs.append({
-                                    'time': 'Unknown',
-                                    'level': 'INFO',
-                                    'message': line
-                                })
-                                stats['total'] += 1
-                                stats['info'] += 1
-                    
-                    # Reverse to show newest first
-                    logs.reverse()
+            # Reverse to show newest first
+            logs.reverse()
     
     except Exception as e:
         logs = [{
@@ -438,3 +499,134 @@ def api_logs(request):
         'logs': logs,
         'stats': stats
     })
+
+
+# Compact row layout for api_trades: one array per trade, in this order
+API_TRADE_FIELDS = ['id', 'timestamp', 'symbol', 'action', 'price', 'amount', 'profit_loss_pct', 'result']
+
+
+@uses_analytics_db
+def api_trades(request):
+    """API endpoint for filtered, cursor-paginated trade history.
+    
+    Filters run in the database and only the listed columns are fetched.
+    Each page returns ``rows`` as arrays ordered like ``fields`` (timestamps
+    in epoch milliseconds) plus a ``next`` cursor. Pass ``count=1`` for a
+    cached total.
+    """
+    trades_qs = order_history_queryset(
+        request.GET.get('symbol'),
+        request.GET.get('from_date'),
+        request.GET.get('to_date'),
+        request.GET.get('action'),
+        request.GET.get('result'),
+    )
+    
+    try:
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        limit = 50
+    limit = max(1, min(limit, 200))
+    
+    paginator = KeysetPaginator(trades_qs.values(*API_TRADE_FIELDS), limit)
+    page = paginator.get_page(request.GET.get('cursor'))
+    
+    rows = [
+        [
+            trade['id'],
+            int(trade['timestamp'].timestamp() * 1000),
+            trade['symbol'],
+            trade['action'],
+            float(trade['price']),
+            float(trade['amount']),
+            float(trade['profit_loss_pct']) if trade['profit_loss_pct'] is not None else None,
+            trade['result'],
+        ]
+        for trade in page
+    ]
+    
+    return JsonResponse({
+        'fields': API_TRADE_FIELDS,
+        'rows': rows,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+        'total': cached_count(trades_qs) if request.GET.get('count') == '1' else None,
+    })
+
+
+@uses_analytics_db
+def api_analytics(request):
+    """API endpoint for performance analytics over the filtered closed trades.
+    
+    Takes the order history filters (symbol, from_date, to_date), plus
+    ``window`` trades for the rolling win rate and ``points`` for the
+    length of the returned curves. Results are cached until trades change.
+    """
+    trades_qs = order_history_queryset(
+        request.GET.get('symbol'),
+        request.GET.get('from_date'),
+        request.GET.get('to_date'),
+    )
+    
+    try:
+        window = int(request.GET.get('window', 20))
+    except ValueError:
+        window = 20
+    window = max(1, min(window, 1000))
+    
+    try:
+        points = int(request.GET.get('points', 500))
+    except ValueError:
+        points = 500
+    points = max(2, min(points, 5000))
+    
+    return JsonResponse(analytics.trade_analytics(trades_qs, window, points))
+
+
+@uses_analytics_db
+def api_series(request):
+    """API endpoint for net P&L over time: cumulative (``kind=equity``) or per trade (``kind=pnl``).
+    
+    Returns at most ``points`` points (about the chart's width in pixels)
+    of closed trades within ``start``..``end`` (epoch seconds), picked from
+    precomputed min/max levels with LTTB so zooming in stays cheap. Times
+    are epoch milliseconds.
+    """
+    kind = request.GET.get('kind', 'equity')
+    if kind not in SERIES_KINDS:
+        return JsonResponse({'error': f"Unsupported kind; use one of {', '.join(SERIES_KINDS)}"}, status=400)
+    
+    params = {}
+    for name in ('start', 'end', 'points'):
+        try:
+            params[name] = int(request.GET[name]) if request.GET.get(name) else None
+        except ValueError:
+            return JsonResponse({'error': f'Invalid {name}'}, status=400)
+    points = max(3, min(params['points'] or 1000, 5000))
+    
+    symbol = request.GET.get('symbol') or None
+    series = series_store.get(symbol, kind).query(params['start'], params['end'], points)
+    return JsonResponse({'kind': kind, 'symbol': symbol, **series})
+
+
+async def api_candles(request, symbol, timeframe):
+    """API endpoint for OHLCV candles, served from the server-side candle store.
+    
+    Returns the latest ``limit`` candles, or those opening within
+    ``start``..``end`` (epoch seconds), oldest first in the bot's format.
+    Only candles the store doesn't already hold are fetched from the bot.
+    """
+    timeframe = normalize_timeframe(timeframe)
+    if timeframe is None:
+        return JsonResponse({'error': f"Unsupported timeframe; use one of {', '.join(TIMEFRAMES)}"}, status=400)
+    
+    params = {}
+    for name in ('limit', 'start', 'end'):
+        try:
+            params[name] = int(request.GET[name]) if request.GET.get(name) else None
+        except ValueError:
+            return JsonResponse({'error': f'Invalid {name}'}, status=400)
+    limit = max(1, min(params['limit'] or 100, candle_store.max_fetch))
+    
+    candles = await candle_store.get_candles(symbol, timeframe, limit, params['start'], params['end'])
+    return JsonResponse(candles, safe=False)